@@ -0,0 +1,101 @@
+"""
+Benchmark de Bulkhead - costo por llamada de cada modo
+
+Mide cuánto agrega el bulkhead a una llamada trivial (sin I/O):
+- directo: sin bulkhead
+- thread: la tarea salta al thread pool del bulkhead y el que llama espera
+- semaforo: la tarea corre en el thread del que llama, solo se limita la concurrencia
+- async: BulkheadAsync con una corrutina
+
+Para los modos sync se mide con 1 thread y con varios threads llamando a la
+vez (como el threadpool de FastAPI). El límite de concurrencia es igual a la
+cantidad de threads, así no hay rechazos y solo se mide el overhead.
+
+Ejecuta:
+    python examples/bulkhead_benchmark.py [llamadas]
+"""
+import sys
+import os
+
+# Esto agrega la carpeta TFU_3 al path de Python
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import time
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from patrones.bulkhead import Bulkhead, BulkheadAsync
+
+logging.getLogger("patrones.bulkhead").setLevel(logging.WARNING)
+
+THREADS = [1, 8]
+
+
+def operacion():
+    return 1
+
+
+async def operacion_async():
+    return 1
+
+
+def medir_sync(llamar, llamadas, threads):
+    """Microsegundos por llamada (tiempo total / llamadas)"""
+    por_thread = llamadas // threads
+
+    def trabajo():
+        for _ in range(por_thread):
+            llamar(operacion)
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        inicio = time.perf_counter()
+        for f in [executor.submit(trabajo) for _ in range(threads)]:
+            f.result()
+        total = time.perf_counter() - inicio
+    return total / (por_thread * threads) * 1e6
+
+
+def medir_async(llamadas, concurrentes):
+    bulkhead = BulkheadAsync("bench-async", max_workers=concurrentes, max_queue=concurrentes)
+    por_tarea = llamadas // concurrentes
+
+    async def trabajo():
+        for _ in range(por_tarea):
+            await bulkhead.execute(operacion_async)
+
+    async def correr():
+        inicio = time.perf_counter()
+        await asyncio.gather(*(trabajo() for _ in range(concurrentes)))
+        return time.perf_counter() - inicio
+
+    total = asyncio.run(correr())
+    return total / (por_tarea * concurrentes) * 1e6
+
+
+def main():
+    llamadas = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+
+    print("\n" + "="*60)
+    print(" BENCHMARK Bulkhead: overhead por llamada")
+    print("="*60)
+    print(f"\n{llamadas} llamadas por caso\n")
+    print(f"{'modo':>10} {'threads':>8} {'us/llamada':>12}")
+
+    for threads in THREADS:
+        thread = Bulkhead("bench-thread", max_workers=threads, max_queue=threads)
+        semaforo = Bulkhead("bench-semaforo", max_workers=threads, max_queue=threads, modo="semaforo")
+        casos = [
+            ("directo", lambda f: f()),
+            ("thread", thread.execute),
+            ("semaforo", semaforo.execute),
+        ]
+        for nombre, llamar in casos:
+            print(f"{nombre:>10} {threads:>8} {medir_sync(llamar, llamadas, threads):>12.2f}")
+        print(f"{'async':>10} {threads:>8} {medir_async(llamadas, threads):>12.2f}")
+        thread.shutdown()
+        semaforo.shutdown()
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Benchmark de OrdenRepo.save - inserción por item vs inserción por lotes
+
+Compara la implementación anterior (un INSERT y un UPDATE por cada item)
+con la actual (un INSERT multi-fila y un UPDATE por conjunto) para carritos
+de 1, 10 y 100 items, midiendo latencia media, p50 y p99.
+
+Requiere una base de datos con el esquema de persistencia/init.sql
+(DATABASE_URL). Crea su propio cliente y productos de prueba.
+
+Ejecuta:
+    python examples/order_save_benchmark.py [iteraciones]
+"""
+import sys
+import os
+
+# Esto agrega la carpeta TFU_3 al path de Python
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import time
+import uuid
+import random
+import statistics
+from persistencia.db import get_conn
+from persistencia.order_repo import OrdenRepo
+
+TAMANIOS_CARRITO = [1, 10, 100]
+CANTIDAD_PRODUCTOS = 200
+
+
+def guardar_orden_por_item(orden_data):
+    """Implementación anterior de OrdenRepo.save: dos sentencias por item"""
+    with get_conn() as conn, conn.cursor() as cur:
+        cur.execute(
+            "INSERT INTO orders (client_id) VALUES (%s) RETURNING id",
+            (orden_data["client_id"],)
+        )
+        orden_id = cur.fetchone()["id"]
+        for item in orden_data["items"]:
+            cur.execute(
+                "INSERT INTO order_items (order_id, product_id, quantity) VALUES (%s, %s, %s)",
+                (orden_id, item["product_id"], item["quantity"])
+            )
+            cur.execute(
+                "UPDATE products SET stock = stock - %s WHERE id = %s",
+                (item["quantity"], item["product_id"])
+            )
+        conn.commit()
+        return {"id": orden_id, "client_id": orden_data["client_id"], "items": orden_data["items"]}
+
+
+def preparar_datos():
+    """Crea un cliente y productos con stock de sobra para el benchmark"""
+    with get_conn() as conn, conn.cursor() as cur:
+        cur.execute(
+            "INSERT INTO clients (name, email, password) VALUES (%s, %s, %s) RETURNING id",
+            ("benchmark", f"bench-{uuid.uuid4().hex}@ejemplo.com", "bench")
+        )
+        cliente_id = cur.fetchone()["id"]
+        cur.execute(
+            """
+            INSERT INTO products (name, price, stock)
+            SELECT 'bench-' || g, 10, 1000000000 FROM generate_series(1, %s) AS g
+            RETURNING id
+            """,
+            (CANTIDAD_PRODUCTOS,)
+        )
+        producto_ids = [row["id"] for row in cur.fetchall()]
+        conn.commit()
+    return cliente_id, producto_ids
+
+
+def armar_carrito(cliente_id, producto_ids, tamanio):
+    elegidos = random.sample(producto_ids, tamanio)
+    return {
+        "client_id": cliente_id,
+        "items": [{"product_id": pid, "quantity": 1} for pid in elegidos],
+    }
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    indice = min(len(ordenados) - 1, int(round(p / 100.0 * (len(ordenados) - 1))))
+    return ordenados[indice]
+
+
+def medir(guardar, cliente_id, producto_ids, tamanio, iteraciones):
+    # una vuelta de calentamiento (conexiones del pool, caches de Postgres)
+    guardar(armar_carrito(cliente_id, producto_ids, tamanio))
+    latencias = []
+    for _ in range(iteraciones):
+        carrito = armar_carrito(cliente_id, producto_ids, tamanio)
+        inicio = time.perf_counter()
+        guardar(carrito)
+        latencias.append((time.perf_counter() - inicio) * 1000)
+    return {
+        "media": statistics.mean(latencias),
+        "p50": percentil(latencias, 50),
+        "p99": percentil(latencias, 99),
+    }
+
+
+def main():
+    iteraciones = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+    print("\n" + "="*70)
+    print(" BENCHMARK OrdenRepo.save: por item vs por lotes")
+    print("="*70)
+
+    cliente_id, producto_ids = preparar_datos()
+    repo = OrdenRepo()
+    implementaciones = [
+        ("por item", guardar_orden_por_item),
+        ("por lotes", repo.save),
+    ]
+
+    print(f"\n{iteraciones} ordenes por caso\n")
+    print(f"{'items':>6} {'implementacion':>15} {'media ms':>10} {'p50 ms':>10} {'p99 ms':>10}")
+    for tamanio in TAMANIOS_CARRITO:
+        for nombre, guardar in implementaciones:
+            r = medir(guardar, cliente_id, producto_ids, tamanio, iteraciones)
+            print(f"{tamanio:>6} {nombre:>15} {r['media']:>10.2f} {r['p50']:>10.2f} {r['p99']:>10.2f}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
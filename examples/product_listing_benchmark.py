@@ -0,0 +1,134 @@
+"""
+Benchmark del listado de productos - lista completa vs páginas por keyset
+
+Carga el catálogo hasta 10k, 100k y 1M productos y, en cada tamaño, mide la
+latencia de ProductoRepo.findAll (la lista completa que devolvía /productos)
+contra ProductoRepo.findPage con distintos filtros y órdenes: primera página,
+una página profunda (siguiendo el cursor), rango de precio, prefijo del nombre
+orden por precio descendente y la búsqueda de /productos/search (texto
+completo, prefijo y con un error de tipeo).
+
+Requiere una base de datos con el esquema de persistencia/init.sql
+(DATABASE_URL). Los productos de prueba se borran al terminar.
+
+Ejecuta:
+    python examples/product_listing_benchmark.py [iteraciones]
+"""
+import sys
+import os
+
+# Esto agrega la carpeta TFU_3 al path de Python
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import time
+import statistics
+from persistencia.db import get_conn
+from persistencia.product_repo import ProductoRepo
+
+TAMANIOS_CATALOGO = [10_000, 100_000, 1_000_000]
+PREFIJO = "benchlist "
+# la lista completa con 1M filas tarda demasiado para repetirla muchas veces
+MAX_ITERACIONES_LISTA_COMPLETA = 5
+
+
+def cargar_hasta(cantidad):
+    """Agrega productos de prueba hasta que haya `cantidad`"""
+    with get_conn() as conn, conn.cursor() as cur:
+        cur.execute("SELECT count(*) AS n FROM products WHERE name LIKE %s", (PREFIJO + "%",))
+        actuales = cur.fetchone()["n"]
+        if actuales < cantidad:
+            cur.execute(
+                """
+                INSERT INTO products (name, price, stock)
+                SELECT %s || (ARRAY['zapatilla', 'remera', 'campera', 'pantalon', 'mochila',
+                                     'gorra', 'media', 'buzo', 'short', 'bolso'])[1 + g %% 10]
+                          || ' ' || (ARRAY['roja', 'azul', 'negra', 'blanca', 'verde',
+                                           'gris', 'amarilla'])[1 + (g / 10) %% 7]
+                          || ' ' || left(md5(g::text), 8),
+                       round((random() * 1000)::numeric, 2), (random() * 500)::int
+                FROM generate_series(%s, %s) AS g
+                """,
+                (PREFIJO, actuales + 1, cantidad)
+            )
+        conn.commit()
+        cur.execute("ANALYZE products")
+        conn.commit()
+
+
+def borrar_productos_de_prueba():
+    with get_conn() as conn, conn.cursor() as cur:
+        cur.execute("DELETE FROM products WHERE name LIKE %s", (PREFIJO + "%",))
+        conn.commit()
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    indice = min(len(ordenados) - 1, int(round(p / 100.0 * (len(ordenados) - 1))))
+    return ordenados[indice]
+
+
+def medir(funcion, iteraciones):
+    funcion()  # calentamiento
+    latencias = []
+    for _ in range(iteraciones):
+        inicio = time.perf_counter()
+        funcion()
+        latencias.append((time.perf_counter() - inicio) * 1000)
+    return {
+        "media": statistics.mean(latencias),
+        "p50": percentil(latencias, 50),
+        "p99": percentil(latencias, 99),
+    }
+
+
+def cursor_profundo(repo, paginas):
+    """Cursor de la página número `paginas` (ordenando por id)"""
+    cursor = None
+    for _ in range(paginas):
+        cursor = repo.findPage(cursor=cursor, limit=200)["siguiente"]
+    return cursor
+
+
+def main():
+    iteraciones = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+
+    print("\n" + "="*78)
+    print(" BENCHMARK listado de productos: lista completa vs keyset")
+    print("="*78)
+
+    repo = ProductoRepo()
+    casos = [
+        ("primera pagina", lambda: repo.findPage()),
+        ("pagina profunda", None),  # se arma por tamaño
+        ("rango de precio", lambda: repo.findPage({"min_price": 100, "max_price": 120})),
+        ("prefijo nombre", lambda: repo.findPage({"q": PREFIJO + "mochila a"}, orden="name")),
+        ("precio desc", lambda: repo.findPage(orden="-price")),
+        ("con stock", lambda: repo.findPage({"min_stock": 490}, orden="price")),
+        ("busqueda", lambda: repo.search("campera negra", 20)),
+        ("busqueda prefijo", lambda: repo.search("zapat", 20)),
+        ("busqueda typo", lambda: repo.search("mochlia verd", 20)),
+    ]
+
+    try:
+        for cantidad in TAMANIOS_CATALOGO:
+            print(f"\nCargando {cantidad:,} productos...")
+            cargar_hasta(cantidad)
+            profundo = cursor_profundo(repo, 20)
+
+            print(f"{'caso':>18} {'filas':>8} {'media ms':>10} {'p50 ms':>10} {'p99 ms':>10}")
+            completa = medir(repo.findAll, min(iteraciones, MAX_ITERACIONES_LISTA_COMPLETA))
+            filas = len(repo.findAll())
+            print(f"{'lista completa':>18} {filas:>8} {completa['media']:>10.2f} {completa['p50']:>10.2f} {completa['p99']:>10.2f}")
+            for nombre, funcion in casos:
+                if funcion is None:
+                    funcion = lambda: repo.findPage(cursor=profundo)
+                resultado = funcion()
+                filas = len(resultado["productos"] if isinstance(resultado, dict) else resultado)
+                r = medir(funcion, iteraciones)
+                print(f"{nombre:>18} {filas:>8} {r['media']:>10.2f} {r['p50']:>10.2f} {r['p99']:>10.2f}")
+    finally:
+        borrar_productos_de_prueba()
+
+
+if __name__ == "__main__":
+    main()
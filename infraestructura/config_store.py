@@ -1,7 +1,9 @@
 import os
 import time
 import json
-from typing import Any, Optional
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterable, Optional
 
 try:
     import consul
@@ -11,6 +13,8 @@ except Exception:
 DEFAULT_CONSUL_HOST = os.getenv("CONSUL_HOST", "consul")
 DEFAULT_CONSUL_PORT = int(os.getenv("CONSUL_PORT", "8500"))
 
+logger = logging.getLogger(__name__)
+
 
 class ConfigStore:
     """Simple configuration store wrapper.
@@ -88,6 +92,148 @@ class ConfigStore:
         self._last[key] = now
         return v_cast
 
+    def invalidate(self, keys: Iterable[str]):
+        """Drop cached values so the next get() reads them again."""
+        for key in keys:
+            self._cache.pop(key, None)
+            self._last.pop(key, None)
+
+
+class ConfigWatcher:
+    """Watches ConfigStore keys by prefix and calls back when their values change.
+
+    Only Consul values can change at runtime (environment variables win over
+    Consul and are fixed for the process), so without Consul start() is a
+    no-op. The watcher waits on a Consul blocking query over the whole KV,
+    which returns as soon as any key changes (or after `wait` seconds).
+    Callbacks run on the watcher thread and receive {key: new value} for the
+    changed keys under their prefix; the store's cache for those keys is
+    dropped first, so cfg.get() inside the callback already sees the new
+    values. A callback that raises is logged and does not stop the watcher.
+    """
+
+    def __init__(self, store: ConfigStore, interval: float = 5.0, wait: int = 30):
+        self.store = store
+        self.interval = interval  # pause after a failed query
+        self.wait = wait
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._watches = []  # [(prefix, callback)]
+        self._snapshot: Dict[str, Optional[str]] = {}
+        self._index = None
+        self.checks = 0
+        self.changes = 0
+        self.errors = 0
+        self.last_change = None
+
+    def watch(self, prefix: str, callback: Callable[[Dict[str, Optional[str]]], None]):
+        """Call `callback` whenever keys starting with `prefix` change."""
+        with self._lock:
+            self._watches.append((prefix, callback))
+
+    def _fetch(self, block: bool) -> Optional[Dict[str, Optional[str]]]:
+        """All KV values, or None if a blocking query timed out without changes."""
+        index, data = self.store.consul.kv.get(
+            "", recurse=True, index=self._index if block else None, wait=f"{self.wait}s"
+        )
+        if block and index == self._index:
+            return None
+        self._index = index
+        return {
+            item["Key"]: item["Value"].decode("utf-8") if item.get("Value") is not None else None
+            for item in data or []
+        }
+
+    def check(self, values: Dict[str, Optional[str]]) -> Dict[str, Optional[str]]:
+        """Compare `values` with the last snapshot and fire the callbacks of the changed keys."""
+        with self._lock:
+            watches = list(self._watches)
+            previous, self._snapshot = self._snapshot, values
+        self.checks += 1
+        changed = {
+            key: values.get(key)
+            for key in set(previous) | set(values)
+            if previous.get(key) != values.get(key) and os.getenv(key) is None
+        }
+        if not changed:
+            return changed
+
+        self.store.invalidate(changed)
+        self.changes += len(changed)
+        self.last_change = time.time()
+        logger.info(f"[ConfigWatcher] Changed: {changed}")
+        for prefix, callback in watches:
+            mine = {k: v for k, v in changed.items() if k.startswith(prefix)}
+            if not mine:
+                continue
+            try:
+                callback(mine)
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"[ConfigWatcher] Callback for {sorted(mine)} failed: {e}")
+        return changed
+
+    def start(self):
+        if self.store.consul is None:
+            logger.info("[ConfigWatcher] No Consul client: configuration is fixed for this process")
+            return
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="config-watcher", daemon=True)
+            self._thread.start()
+            logger.info("[ConfigWatcher] Started")
+
+    def stop(self, timeout: float = 1.0):
+        self._stop.set()
+        if self._thread is not None:
+            # a Consul blocking query can't be interrupted; the thread is a daemon
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        baseline = True
+        while not self._stop.is_set():
+            try:
+                values = self._fetch(block=not baseline)
+                if baseline:
+                    # values read at startup are already applied
+                    with self._lock:
+                        self._snapshot = values
+                    baseline = False
+                elif values is not None and not self._stop.is_set():
+                    self.check(values)
+            except Exception as e:
+                self.errors += 1
+                logger.warning(f"[ConfigWatcher] Consul query failed: {e}")
+                self._stop.wait(self.interval)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            watched = [prefix for prefix, _ in self._watches]
+        return {
+            "running": self._thread is not None and self._thread.is_alive(),
+            "consul": self.store.consul is not None,
+            "prefixes": watched,
+            "checks": self.checks,
+            "changes": self.changes,
+            "errors": self.errors,
+            "last_change": self.last_change,
+        }
+
 
 # global instance for convenience
 cfg = ConfigStore()
+
+_watcher: Optional[ConfigWatcher] = None
+
+
+def get_watcher() -> ConfigWatcher:
+    global _watcher
+    if _watcher is None:
+        _watcher = ConfigWatcher(
+            cfg,
+            interval=cfg.get("CONFIG_WATCH_INTERVAL", default=5, as_type=float),
+            wait=cfg.get("CONFIG_WATCH_WAIT", default=30, as_type=int),
+        )
+    return _watcher
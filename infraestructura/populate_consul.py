@@ -12,8 +12,63 @@ DEFAULTS = {
     "ORDER_QUEUE": "orders",
     "BULKHEAD_PRODUCTOS_WORKERS": "5",
     "BULKHEAD_PRODUCTOS_TIMEOUT": "30",
+    "BULKHEAD_PRODUCTOS_QUEUE": "10",
+    "BULKHEAD_PRODUCTOS_MAX_WAIT": "1.0",
+    "BULKHEAD_PRODUCTOS_MODO": "semaforo",
+    "BULKHEAD_PRODUCTOS_ASYNC_MAX": "20",
+    "BULKHEAD_PRODUCTOS_LIMITE": "fijo",
+    "BULKHEAD_PRODUCTOS_LIMITE_MIN": "2",
+    "BULKHEAD_PRODUCTOS_LIMITE_MAX": "20",
+    "BULKHEAD_PRODUCTOS_LATENCIA_OBJETIVO": "0.5",
     "BULKHEAD_CLIENTES_WORKERS": "5",
     "BULKHEAD_ORDENES_WORKERS": "3",
+    "CB_PAGOS_MAX_FALLOS": "3",
+    "CB_PAGOS_TIMEOUT_ABIERTO": "60",
+    "CB_PAGOS_TIMEOUT_SEMI": "30",
+    "CB_PAGOS_MAX_PRUEBAS": "1",
+    "CB_PAGOS_BACKOFF": "2.0",
+    "CB_PAGOS_TIMEOUT_ABIERTO_MAX": "600",
+    "CB_PAGOS_TIMEOUT_LLAMADA": "10",
+    "CB_PAGOS_MODO": "consecutivos",
+    "CB_PAGOS_TASA_FALLOS": "50",
+    "CB_PAGOS_TASA_LENTAS": "100",
+    "CB_PAGOS_UMBRAL_LENTA": "5",
+    "CB_PAGOS_MIN_LLAMADAS": "20",
+    "CB_PAGOS_VENTANA_TIPO": "conteo",
+    "CB_PAGOS_VENTANA": "100",
+    "RETRY_PAGOS_MAX_INTENTOS": "3",
+    "RETRY_PAGOS_ESPERA_BASE": "0.1",
+    "RETRY_PAGOS_ESPERA_MAX": "2.0",
+    "RETRY_PAGOS_PRESUPUESTO": "10",
+    "RETRY_PAGOS_MIN_POR_SEGUNDO": "1",
+    "CONFIG_WATCH_WAIT": "30",
+    "DB_POOL_MIN": "2",
+    "DB_POOL_MAX": "20",
+    "DB_POOL_TIMEOUT": "10",
+    "DB_POOL_MAX_IDLE": "300",
+    "DB_ASYNC_POOL_MIN": "2",
+    "DB_ASYNC_POOL_MAX": "20",
+    "STOCK_HOT_BUCKETS": "8",
+    "STOCK_HOT_REINTENTOS": "5",
+    "ORDENES_BULK_CHUNK": "500",
+    "OUTBOX_BATCH": "100",
+    "OUTBOX_POLL_INTERVAL": "0.5",
+    "WORKER_PREFETCH": "50",
+    "WORKER_CONCURRENCY": "4",
+    "WORKER_BATCH_SIZE": "20",
+    "WORKER_REQUEUE_DELAY": "5",
+    "CACHE_PRODUCTOS_MAX": "1000",
+    "CACHE_PRODUCTOS_TTL": "30",
+    "CACHE_CLIENTES_MAX": "1000",
+    "CACHE_CLIENTES_TTL": "30",
+    "CACHE_PROVEEDORES_MAX": "500",
+    "CACHE_PROVEEDORES_TTL": "60",
+    "CACHE_INVALIDATION_ENABLED": "true",
+    "PRODUCTOS_PAGE_SIZE": "50",
+    "PRODUCTOS_MAX_PAGE_SIZE": "200",
+    "BUSQUEDA_MAX_RESULTADOS": "50",
+    "BUSQUEDA_MAX_CANDIDATOS": "1000",
+    "BUSQUEDA_SIMILITUD_MIN": "0.4",
 }
 
 
@@ -1,28 +1,79 @@
-from persistencia.client_repo import ClienteRepo
-from patrones.circuit_breaker import GestorCircuitBreakers, CircuitBreakerError
+from persistencia.client_repo import ClienteRepo, ClienteRepoAsync
+from patrones.circuit_breaker import GestorCircuitBreakers, CircuitBreakerError, LlamadaTimeoutError
 from logica.payment_service import ServicioPagos, ErrorProcesamiento
+from patrones.cache import GestorCaches
+from patrones.retry import GestorReintentos
+
+# errores del servicio de pagos que se informan al cliente en vez de propagarse
+ERRORES_PAGO = (CircuitBreakerError, LlamadaTimeoutError, ErrorProcesamiento)
+
+
+def clave_cliente(cliente_id):
+    return ("id", cliente_id)
+
+
+def invalidar_cache_clientes(cliente_ids=()):
+    """Invalida los clientes indicados (None = toda la cache)"""
+    cache = GestorCaches().caches.get("clientes")
+    if cache is None:
+        return
+    if cliente_ids is None:
+        cache.limpiar()
+        return
+    cache.invalidar(*(clave_cliente(cliente_id) for cliente_id in cliente_ids))
 
 
 class ClienteService:
     def __init__(self):
         self.repo = ClienteRepo()
+        self.repo_async = ClienteRepoAsync()
         self.servicio_pagos = ServicioPagos(tasa_fallo=0.0, latencia_ms=100)
+        self.cache = GestorCaches().obtener_cache("clientes")
         
         # obtener el circuit breaker para proteger llamadas a pagos
         gestor = GestorCircuitBreakers()
         self.circuit_breaker_pagos = gestor.obtener_circuit_breaker("servicio_pagos")
+        # los fallos transitorios se reintentan por fuera del circuit breaker
+        self.reintentos_pagos = GestorReintentos().obtener_politica("servicio_pagos")
 
     def registrarCliente(self, cliente_data):
-        return self.repo.save(cliente_data)
+        cliente = self.repo.save(cliente_data)
+        invalidar_cache_clientes([cliente["id"]] if cliente else [])
+        return cliente
 
     def loginCliente(self, email, password):
         return self.repo.login(email, password)
 
     def actualizarCliente(self, cliente_id, cliente_data):
-        return self.repo.update(cliente_id, cliente_data)
+        try:
+            return self.repo.update(cliente_id, cliente_data)
+        finally:
+            invalidar_cache_clientes([cliente_id])
 
     def obtenerCliente(self, cliente_id):
-        return self.repo.findById(cliente_id)
+        return self.cache.obtener(clave_cliente(cliente_id), self.repo.findById, cliente_id)
+
+    def clientesExistentes(self, cliente_ids):
+        return self.repo.findExistingIds(cliente_ids)
+
+    # versiones async para los handlers `async def`
+
+    async def registrarClienteAsync(self, cliente_data):
+        cliente = await self.repo_async.save(cliente_data)
+        invalidar_cache_clientes([cliente["id"]] if cliente else [])
+        return cliente
+
+    async def loginClienteAsync(self, email, password):
+        return await self.repo_async.login(email, password)
+
+    async def actualizarClienteAsync(self, cliente_id, cliente_data):
+        try:
+            return await self.repo_async.update(cliente_id, cliente_data)
+        finally:
+            invalidar_cache_clientes([cliente_id])
+
+    async def obtenerClienteAsync(self, cliente_id):
+        return await self.cache.obtener_async(clave_cliente(cliente_id), self.repo_async.findById, cliente_id)
     
     def realizar_pago(self, cliente_id, monto, metodo_pago="tarjeta"):
         """
@@ -32,6 +83,9 @@ class ClienteService:
         - Si el servicio falla muchas veces, el circuito se abre
         - Cuando esta abierto, las llamadas fallan inmediatamente
         - Despues de un tiempo, permite probar si el servicio se recupero
+        - Si no responde dentro del timeout, el request no se queda esperando
+        - Un fallo transitorio se reintenta con backoff, dentro del presupuesto
+          de reintentos del servicio de pagos
         
         Args:
             cliente_id: ID del cliente
@@ -48,38 +102,61 @@ class ClienteService:
         print(f"\n[Cliente Service] Procesando pago de ${monto} para cliente {cliente_id}")
         
         try:
-            # usamos el circuit breaker para proteger la llamada
-            resultado = self.circuit_breaker_pagos.llamar(
+            # usamos el circuit breaker para proteger cada intento
+            resultado = self.reintentos_pagos.ejecutar(
+                self.circuit_breaker_pagos.llamar,
                 self.servicio_pagos.procesar_pago,
                 cliente_id,
                 monto,
                 metodo_pago
             )
-            
-            print(f"[Cliente Service] Pago completado exitosamente")
-            return {
-                "exito": True,
-                "mensaje": "Pago procesado correctamente",
-                "datos": resultado
-            }
-            
-        except CircuitBreakerError as error:
+        except ERRORES_PAGO as error:
+            return self._pago_fallido(error)
+        return self._pago_exitoso(resultado)
+
+    async def realizar_pago_async(self, cliente_id, monto, metodo_pago="tarjeta"):
+        """Igual que realizar_pago, esperando al servicio sin ocupar un thread"""
+        print(f"\n[Cliente Service] Procesando pago de ${monto} para cliente {cliente_id}")
+
+        try:
+            resultado = await self.reintentos_pagos.ejecutar_async(
+                self.circuit_breaker_pagos.llamar_async,
+                self.servicio_pagos.procesar_pago_async,
+                cliente_id,
+                monto,
+                metodo_pago
+            )
+        except ERRORES_PAGO as error:
+            return self._pago_fallido(error)
+        return self._pago_exitoso(resultado)
+
+    def _pago_exitoso(self, resultado):
+        print(f"[Cliente Service] Pago completado exitosamente")
+        return {
+            "exito": True,
+            "mensaje": "Pago procesado correctamente",
+            "datos": resultado
+        }
+
+    def _pago_fallido(self, error):
+        if isinstance(error, CircuitBreakerError):
             # el circuito esta abierto por lo que el servicio no está disponible
             print(f"[Cliente Service] Pago rechazado - Circuit breaker abierto")
-            return {
-                "exito": False,
-                "mensaje": "Servicio de pagos temporalmente no disponible. Intente mas tarde.",
-                "error": str(error)
-            }
-            
-        except ErrorProcesamiento as error:
+            mensaje = "Servicio de pagos temporalmente no disponible. Intente mas tarde."
+        elif isinstance(error, LlamadaTimeoutError):
+            # el proveedor no respondio a tiempo; el pago puede haberse
+            # procesado igual, por eso se sugiere verificarlo antes de reintentar
+            print(f"[Cliente Service] Pago sin respuesta - {str(error)}")
+            mensaje = "El servicio de pagos no respondio a tiempo. Verifique el pago antes de reintentar."
+        else:
             # falló el procesamiento del pago
             print(f"[Cliente Service] Error al procesar pago: {str(error)}")
-            return {
-                "exito": False,
-                "mensaje": "Error al procesar el pago. Intente nuevamente.",
-                "error": str(error)
-            }
+            mensaje = "Error al procesar el pago. Intente nuevamente."
+        return {
+            "exito": False,
+            "mensaje": mensaje,
+            "error": str(error)
+        }
     
     def verificar_estado_pago(self, transaccion_id):
         """
@@ -92,35 +169,45 @@ class ClienteService:
             dict: Estado del pago
         """
         try:
-            resultado = self.circuit_breaker_pagos.llamar(
+            resultado = self.reintentos_pagos.ejecutar(
+                self.circuit_breaker_pagos.llamar,
                 self.servicio_pagos.verificar_pago,
                 transaccion_id
             )
-            
-            return {
-                "exito": True,
-                "datos": resultado
-            }
-            
-        except CircuitBreakerError as error:
-            return {
-                "exito": False,
-                "mensaje": "No se puede verificar el pago en este momento",
-                "error": str(error)
-            }
-            
-        except ErrorProcesamiento as error:
-            return {
-                "exito": False,
-                "mensaje": "Error al verificar el pago",
-                "error": str(error)
-            }
+        except ERRORES_PAGO as error:
+            return self._verificacion_fallida(error)
+        return {"exito": True, "datos": resultado}
+
+    async def verificar_estado_pago_async(self, transaccion_id):
+        try:
+            resultado = await self.reintentos_pagos.ejecutar_async(
+                self.circuit_breaker_pagos.llamar_async,
+                self.servicio_pagos.verificar_pago_async,
+                transaccion_id
+            )
+        except ERRORES_PAGO as error:
+            return self._verificacion_fallida(error)
+        return {"exito": True, "datos": resultado}
+
+    def _verificacion_fallida(self, error):
+        if isinstance(error, CircuitBreakerError):
+            mensaje = "No se puede verificar el pago en este momento"
+        elif isinstance(error, LlamadaTimeoutError):
+            mensaje = "El servicio de pagos no respondio a tiempo"
+        else:
+            mensaje = "Error al verificar el pago"
+        return {
+            "exito": False,
+            "mensaje": mensaje,
+            "error": str(error)
+        }
     
     def obtener_estadisticas_pagos(self):
-        """Retorna estadisticas del servicio de pagos y del circuit breaker"""
+        """Retorna estadisticas del servicio de pagos, del circuit breaker y de los reintentos"""
         return {
             "servicio_pagos": self.servicio_pagos.obtener_estadisticas(),
-            "circuit_breaker": self.circuit_breaker_pagos.obtener_estadisticas()
+            "circuit_breaker": self.circuit_breaker_pagos.obtener_estadisticas(),
+            "reintentos": self.reintentos_pagos.obtener_estadisticas()
         }
     
     def simular_fallos_pagos(self, tasa_fallo):
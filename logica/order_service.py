@@ -1,14 +1,57 @@
-from persistencia.order_repo import OrdenRepo
+from persistencia.order_repo import OrdenRepo, OrdenRepoAsync
+from logica.product_service import invalidar_cache_productos
+from infraestructura.config_store import cfg
+
+# tamaño de cada página al recorrer las ordenes en streaming
+ORDENES_PAGE_SIZE = cfg.get("ORDENES_PAGE_SIZE", default=500, as_type=int)
 
 class OrdenService:
     def __init__(self):
         self.repo = OrdenRepo()
+        self.repo_async = OrdenRepoAsync()
 
     def crearOrden(self, orden_data):
-        return self.repo.save(orden_data)
+        orden = self.repo.save(orden_data)
+        # la orden descontó stock: los productos cacheados quedaron viejos
+        invalidar_cache_productos({item["product_id"] for item in orden_data["items"]})
+        return orden
+
+    def crearOrdenesBulk(self, ordenes):
+        resultados = self.repo.saveBulk(ordenes)
+        invalidar_cache_productos({
+            item["product_id"]
+            for r in resultados if r["ok"]
+            for item in r["orden"]["items"]
+        })
+        return resultados
 
     def obtenerOrden(self, orden_id):
         return self.repo.findById(orden_id)
 
     def listarOrdenes(self):
-        return self.repo.findAll()
\ No newline at end of file
+        return self.repo.findAll()
+
+    # versiones async para los handlers `async def`
+
+    async def obtenerOrdenAsync(self, orden_id):
+        return await self.repo_async.findById(orden_id)
+
+    async def listarOrdenesAsync(self):
+        return await self.repo_async.findAll()
+
+    async def iterarOrdenesAsync(self, after_id=0, limit=None):
+        """
+        Recorre las ordenes con id > after_id página por página (keyset),
+        sin cargar todo el resultado en memoria. `limit` = None recorre todas.
+        """
+        restantes = limit
+        while restantes is None or restantes > 0:
+            tam = ORDENES_PAGE_SIZE if restantes is None else min(ORDENES_PAGE_SIZE, restantes)
+            pagina = await self.repo_async.findPage(after_id, tam)
+            for orden in pagina:
+                yield orden
+            if len(pagina) < tam:
+                break
+            after_id = pagina[-1]["id"]
+            if restantes is not None:
+                restantes -= len(pagina)
\ No newline at end of file
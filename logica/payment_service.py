@@ -1,12 +1,17 @@
 """
 Servicio de Pagos - Simula un sistema de procesamiento de pagos externo
 
-Este servicio puede fallar aleatoriamente para demostrar el Circuit Breaker
+Este servicio puede fallar aleatoriamente para demostrar el Circuit Breaker.
+Las versiones *_async simulan la latencia con asyncio.sleep, para llamarlas
+desde handlers `async def` sin ocupar un thread.
 """
 
+import asyncio
 import time
 import random
 
+from patrones.metricas import ContadorStriped
+
 # error durante el procesamiento del pago
 class ErrorProcesamiento(Exception):
     pass
@@ -26,8 +31,8 @@ class ServicioPagos:
         """
         self.tasa_fallo = tasa_fallo
         self.latencia_ms = latencia_ms
-        self.pagos_procesados = 0
-        self.pagos_fallidos = 0
+        self.pagos_procesados = ContadorStriped()
+        self.pagos_fallidos = ContadorStriped()
         
         print(f"[Servicio Pagos] Inicializado")
         print(f"  - Tasa de fallo: {tasa_fallo*100}%")
@@ -50,10 +55,17 @@ class ServicioPagos:
         """
         # simular latencia del servicio
         time.sleep(self.latencia_ms / 1000.0)
+        return self._resolver_pago(cliente_id, monto, metodo_pago)
+
+    async def procesar_pago_async(self, cliente_id, monto, metodo_pago="tarjeta"):
+        """Igual que procesar_pago, sin bloquear el event loop"""
+        await asyncio.sleep(self.latencia_ms / 1000.0)
+        return self._resolver_pago(cliente_id, monto, metodo_pago)
 
+    def _resolver_pago(self, cliente_id, monto, metodo_pago):
         # simular fallo aleatorio
         if random.random() < self.tasa_fallo:
-            self.pagos_fallidos += 1
+            self.pagos_fallidos.incrementar()
             print(f"[Servicio Pagos] ERROR - Fallo al procesar pago de ${monto}")
             raise ErrorProcesamiento(
                 f"No se pudo procesar el pago. "
@@ -61,7 +73,7 @@ class ServicioPagos:
             )
         
         # pago exitoso
-        self.pagos_procesados += 1
+        self.pagos_procesados.incrementar()
         transaccion_id = f"TXN-{int(time.time())}-{random.randint(1000, 9999)}"
         
         resultado = {
@@ -80,7 +92,13 @@ class ServicioPagos:
         """Verifica el estado de un pago"""
         # simulacion simple
         time.sleep(0.05)
-        
+        return self._resolver_verificacion(transaccion_id)
+
+    async def verificar_pago_async(self, transaccion_id):
+        await asyncio.sleep(0.05)
+        return self._resolver_verificacion(transaccion_id)
+
+    def _resolver_verificacion(self, transaccion_id):
         if random.random() < self.tasa_fallo:
             raise ErrorProcesamiento("No se pudo verificar el pago")
         
@@ -91,14 +109,16 @@ class ServicioPagos:
     
     def obtener_estadisticas(self):
         """Retorna estadisticas del servicio"""
-        total = self.pagos_procesados + self.pagos_fallidos
+        procesados = self.pagos_procesados.valor
+        fallidos = self.pagos_fallidos.valor
+        total = procesados + fallidos
         tasa_exito = 0
         if total > 0:
-            tasa_exito = (self.pagos_procesados / total) * 100
+            tasa_exito = (procesados / total) * 100
         
         return {
-            "pagos_procesados": self.pagos_procesados,
-            "pagos_fallidos": self.pagos_fallidos,
+            "pagos_procesados": procesados,
+            "pagos_fallidos": fallidos,
             "tasa_exito": round(tasa_exito, 2)
         }
     
@@ -1,23 +1,58 @@
-from persistencia.product_repo import ProductoRepo
+from persistencia.product_repo import ProductoRepo, ProductoRepoAsync
 from patrones.bulkhead import BulkheadManager
+from patrones.cache import GestorCaches
 import logging
 
 logger = logging.getLogger(__name__)
 
+# claves de la cache de productos
+CLAVE_LISTA = ("lista",)
+CLAVE_VERSION = ("version",)
+
+
+def clave_producto(producto_id):
+    return ("id", producto_id)
+
+
+def clave_pagina(filtros, orden, cursor, limit):
+    """Clave de una página del listado; empieza con "lista" para invalidarse con los listados"""
+    filtros = tuple(sorted((k, v) for k, v in (filtros or {}).items() if v is not None))
+    return ("lista", "pagina", orden, cursor, limit, filtros)
+
+
+def invalidar_cache_productos(producto_ids=()):
+    """
+    Invalida los productos indicados y todos los listados.
+    Se llama después de cualquier escritura que cambie productos (incluido el stock),
+    y desde el bus de invalidación cuando escribe otro proceso (None = toda la cache).
+    """
+    cache = GestorCaches().caches.get("productos")
+    if cache is None:
+        return
+    if producto_ids is None:
+        cache.limpiar()
+        return
+    claves = {clave_producto(producto_id) for producto_id in producto_ids}
+    cache.invalidar_si(lambda clave: clave[0] in ("lista", "version") or clave in claves)
+
 
 class ProductoService:
     def __init__(self):
         self.repo = ProductoRepo()
+        self.repo_async = ProductoRepoAsync()
         # con la instancia de BulkheadManager, se crean recursos que serán llamados desde afuera
         # internamente implementan bulkhead y llaman al metodo interno que se encarga
         # de realizar la logica del servicio, pero que, en caso de sobrecarga,
         # no afectarán a otros servicios :)
         self.bulkhead = BulkheadManager().get_bulkhead("productos")
+        self.bulkhead_async = BulkheadManager().get_bulkhead("productos_async")
+        # cache read-through delante del repo; un hit no ocupa un thread del bulkhead
+        self.cache = GestorCaches().obtener_cache("productos")
 
     # listar productos con bulkhead
     def listarProductos(self):
         logger.info("Listando productos con protección Bulkhead")
-        return self.bulkhead.execute(self._listar_productos_interno)
+        return self.cache.obtener(CLAVE_LISTA, self.bulkhead.execute, self._listar_productos_interno)
     
     def _listar_productos_interno(self):
         """Método interno que ejecuta la lógica real"""
@@ -26,18 +61,58 @@ class ProductoService:
     # obtener producto con bulkhead
     def obtenerProducto(self, producto_id):
         logger.info(f"Obteniendo producto {producto_id} con protección Bulkhead")
-        return self.bulkhead.execute(self._obtener_producto_interno, producto_id)
+        return self.cache.obtener(
+            clave_producto(producto_id), self.bulkhead.execute, self._obtener_producto_interno, producto_id
+        )
     
     def _obtener_producto_interno(self, producto_id):
         return self.repo.findById(producto_id)
 
+    # lecturas async del catálogo: no ocupan threads; en un cache miss pasan por
+    # el bulkhead async, que acota las corrutinas que esperan al pool async
+    async def listarProductosAsync(self):
+        return await self.cache.obtener_async(CLAVE_LISTA, self.bulkhead_async.execute, self.repo_async.findAll)
+
+    async def obtenerProductoAsync(self, producto_id):
+        return await self.cache.obtener_async(
+            clave_producto(producto_id), self.bulkhead_async.execute, self.repo_async.findById, producto_id
+        )
+
+    # versión del catálogo para ETags: con la cache caliente un If-None-Match
+    # se responde sin ir a la BD
+    async def versionProductosAsync(self):
+        return await self.cache.obtener_async(CLAVE_VERSION, self.repo_async.version)
+
+    async def listarProductosPaginaAsync(self, filtros=None, orden="id", cursor=None, limit=None):
+        """
+        Página del listado: {"version": v, "productos": [...], "siguiente": cursor}.
+
+        Raises:
+            ValueError: Si el orden o el cursor no son válidos
+        """
+        return await self.cache.obtener_async(
+            clave_pagina(filtros, orden, cursor, limit),
+            self.bulkhead_async.execute, self.repo_async.findPage, filtros, orden, cursor, limit
+        )
+
+    async def buscarProductosAsync(self, texto, limit=None):
+        """Búsqueda por nombre ordenada por relevancia (ver ProductoRepo.search)"""
+        clave = ("lista", "busqueda", " ".join(texto.lower().split()), limit)
+        return await self.cache.obtener_async(clave, self.bulkhead_async.execute, self.repo_async.search, texto, limit)
+
+    async def cambiosProductosAsync(self, since):
+        return await self.bulkhead_async.execute(self.repo_async.findChanges, since)
+
     # agregar producto con bulkhead
     def agregarProducto(self, producto_data):
         logger.info("Agregando producto con protección Bulkhead")
         return self.bulkhead.execute(self._agregar_producto_interno, producto_data)
     
     def _agregar_producto_interno(self, producto_data):
-        return self.repo.save(producto_data)
+        producto = self.repo.save(producto_data)
+        # el id nuevo pudo haber quedado cacheado como "no encontrado"
+        invalidar_cache_productos([producto["id"]] if producto else [])
+        return producto
 
     # update de producto con bulkhead
     def actualizarProducto(self, producto_id, producto_data):
@@ -47,7 +122,10 @@ class ProductoService:
         )
     
     def _actualizar_producto_interno(self, producto_id, producto_data):
-        return self.repo.update(producto_id, producto_data)
+        try:
+            return self.repo.update(producto_id, producto_data)
+        finally:
+            invalidar_cache_productos([producto_id])
 
     # eliminar producto con bulkhead
     def eliminarProducto(self, producto_id):
@@ -55,4 +133,18 @@ class ProductoService:
         return self.bulkhead.execute(self._eliminar_producto_interno, producto_id)
     
     def _eliminar_producto_interno(self, producto_id):
-        return self.repo.delete(producto_id)
\ No newline at end of file
+        try:
+            return self.repo.delete(producto_id)
+        finally:
+            invalidar_cache_productos([producto_id])
+
+    # marcar/desmarcar producto hot (stock repartido en buckets) con bulkhead
+    def marcarProductoHot(self, producto_id, hot, buckets=None):
+        logger.info(f"Marcando producto {producto_id} hot={hot} con protección Bulkhead")
+        return self.bulkhead.execute(self._marcar_producto_hot_interno, producto_id, hot, buckets)
+
+    def _marcar_producto_hot_interno(self, producto_id, hot, buckets):
+        try:
+            return self.repo.marcarHot(producto_id, hot, buckets)
+        finally:
+            invalidar_cache_productos([producto_id])
\ No newline at end of file
@@ -1,20 +1,84 @@
-from persistencia.proveedor_repo import ProveedorRepo
+from persistencia.proveedor_repo import ProveedorRepo, ProveedorRepoAsync
+from patrones.cache import GestorCaches
+
+# claves de la cache de proveedores
+CLAVE_LISTA = ("lista",)
+CLAVE_LISTA_VERSIONADA = ("lista", "versionada")
+CLAVE_VERSION = ("version",)
+
+
+def clave_proveedor(proveedor_id):
+    return ("id", proveedor_id)
+
+
+def invalidar_cache_proveedores(proveedor_ids=()):
+    """Invalida los proveedores indicados y el listado (None = toda la cache)"""
+    cache = GestorCaches().caches.get("proveedores")
+    if cache is None:
+        return
+    if proveedor_ids is None:
+        cache.limpiar()
+        return
+    claves = {clave_proveedor(proveedor_id) for proveedor_id in proveedor_ids}
+    cache.invalidar_si(lambda clave: clave[0] in ("lista", "version") or clave in claves)
+
 
 class ProveedorService:
     def __init__(self):
         self.repo = ProveedorRepo()
+        self.repo_async = ProveedorRepoAsync()
+        self.cache = GestorCaches().obtener_cache("proveedores")
 
     def listarProveedores(self):
-        return self.repo.findAll()
+        return self.cache.obtener(CLAVE_LISTA, self.repo.findAll)
 
     def obtenerProveedor(self, proveedor_id):
-        return self.repo.findById(proveedor_id)
+        return self.cache.obtener(clave_proveedor(proveedor_id), self.repo.findById, proveedor_id)
 
     def agregarProveedor(self, proveedor_data):
-        return self.repo.save(proveedor_data)
+        proveedor = self.repo.save(proveedor_data)
+        invalidar_cache_proveedores([proveedor["id"]] if proveedor else [])
+        return proveedor
 
     def actualizarProveedor(self, proveedor_id, proveedor_data):
-        return self.repo.update(proveedor_id, proveedor_data)
+        try:
+            return self.repo.update(proveedor_id, proveedor_data)
+        finally:
+            invalidar_cache_proveedores([proveedor_id])
 
     def eliminarProveedor(self, proveedor_id):
-        return self.repo.delete(proveedor_id)
\ No newline at end of file
+        try:
+            return self.repo.delete(proveedor_id)
+        finally:
+            invalidar_cache_proveedores([proveedor_id])
+
+    # versiones async para los handlers `async def`
+
+    async def listarProveedoresAsync(self):
+        return await self.cache.obtener_async(CLAVE_LISTA, self.repo_async.findAll)
+
+    async def obtenerProveedorAsync(self, proveedor_id):
+        return await self.cache.obtener_async(clave_proveedor(proveedor_id), self.repo_async.findById, proveedor_id)
+
+    async def versionProveedoresAsync(self):
+        return await self.cache.obtener_async(CLAVE_VERSION, self.repo_async.version)
+
+    async def listarProveedoresVersionadoAsync(self):
+        return await self.cache.obtener_async(CLAVE_LISTA_VERSIONADA, self.repo_async.findAllVersionado)
+
+    async def agregarProveedorAsync(self, proveedor_data):
+        proveedor = await self.repo_async.save(proveedor_data)
+        invalidar_cache_proveedores([proveedor["id"]] if proveedor else [])
+        return proveedor
+
+    async def actualizarProveedorAsync(self, proveedor_id, proveedor_data):
+        try:
+            return await self.repo_async.update(proveedor_id, proveedor_data)
+        finally:
+            invalidar_cache_proveedores([proveedor_id])
+
+    async def eliminarProveedorAsync(self, proveedor_id):
+        try:
+            return await self.repo_async.delete(proveedor_id)
+        finally:
+            invalidar_cache_proveedores([proveedor_id])
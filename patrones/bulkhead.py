@@ -3,17 +3,68 @@ Patrón Bulkhead - Aislamiento de recursos mediante thread pools
 
 Este patrón previene que un servicio que falle o se sobrecargue afecte a otros servicios
 mediante el aislamiento de recursos (thread pools separados).
+
+Cada bulkhead admite como máximo `max_workers` tareas en ejecución y una cola
+acotada de `max_queue` llamadas esperando, cada una como mucho `max_wait`
+segundos. Si la cola está llena (o se agota la espera) la llamada se rechaza
+enseguida con BulkheadFullException en lugar de acumularse.
+
+Modos (BulkheadManager.create_bulkhead(..., modo=...)):
+- "thread": la tarea corre en el thread pool propio del bulkhead; el timeout
+  corta la espera del que llama.
+- "semaforo": la tarea corre en el thread del que llama; solo se limita la
+  concurrencia (sin saltar de thread). El timeout no se puede aplicar: hay que
+  acotar la duración en la dependencia (timeouts de BD, de red, etc.).
+- "async": BulkheadAsync, para corrutinas de handlers `async def`.
+
+Con `limite` (un LimiteAdaptativo, ver patrones/limite_adaptativo.py) la
+cantidad de tareas en ejecución no es max_workers fijo sino un límite que se
+ajusta con la latencia observada, entre su piso y su techo.
+
+reconfigure() cambia tamaño, cola, esperas y timeout en caliente (lo usa el
+watcher de ConfigStore): lo que está en ejecución termina normalmente y, si
+el límite baja, las llamadas nuevas esperan a que haya lugar.
 """
 
+from collections import deque
 from concurrent.futures import ThreadPoolExecutor, TimeoutError
-from typing import Callable, Any
+from typing import Callable, Any, Awaitable
+import asyncio
 import logging
+import math
+import threading
+import time
 from functools import wraps
 
+from patrones.metricas import ContadorStriped, Histograma
+from patrones.limite_adaptativo import LimiteAdaptativo
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+class BulkheadFullException(Exception):
+    """El bulkhead no tiene lugar (concurrencia y cola llenas, o se agotó la espera en cola)"""
+
+    def __init__(self, name: str, mensaje: str, retry_after: int = 1):
+        super().__init__(mensaje)
+        self.name = name
+        # segundos sugeridos al cliente antes de reintentar (header Retry-After)
+        self.retry_after = retry_after
+
+
+# límites de los histogramas de get_stats
+LIMITES_ESPERA_MS = [1, 5, 10, 50, 100, 500, 1000, 5000]
+LIMITES_COLA = [0, 1, 2, 5, 10, 20, 50, 100]
+
+# asyncio.timeout existe desde Python 3.11
+_timeout_async = getattr(asyncio, "timeout", None)
+
+MODO_THREAD = "thread"
+MODO_SEMAFORO = "semaforo"
+MODO_ASYNC = "async"
+
+
 class Bulkhead:
     """
     Implementa el patrón Bulkhead usando thread pools separados para aislar recursos.
@@ -22,31 +73,150 @@ class Bulkhead:
     sobrecargado o fallido en otros servicios.
     """
     
-    def __init__(self, name: str, max_workers: int = 5, timeout: int = 30):
+    def __init__(self, name: str, max_workers: int = 5, timeout: int = 30,
+                 max_queue: int = None, max_wait: float = 1.0, modo: str = MODO_THREAD,
+                 limite: LimiteAdaptativo = None):
         """
         Args:
             name: Nombre del bulkhead (ej: "productos", "clientes")
             max_workers: Número máximo de threads concurrentes permitidos
             timeout: Tiempo máximo de espera en segundos para una operación
+            max_queue: Llamadas que pueden esperar un lugar (por defecto max_workers; 0 = no esperar)
+            max_wait: Segundos máximos que una llamada espera en la cola
+            modo: "thread" (thread pool propio) o "semaforo" (en el thread del que llama)
+            limite: Límite adaptativo; si se pasa, reemplaza a max_workers como límite
         """
+        if modo not in (MODO_THREAD, MODO_SEMAFORO):
+            raise ValueError(f"Modo de bulkhead inválido: {modo}")
         self.name = name
+        self.modo = modo
         self.max_workers = max_workers
         self.timeout = timeout
-        self.executor = ThreadPoolExecutor(
-            max_workers=max_workers,
-            thread_name_prefix=f"bulkhead-{name}-"
-        )
+        self.max_queue = max_workers if max_queue is None else max_queue
+        self.max_wait = max_wait
+        self._adaptativo = limite
+        # tareas en ejecución permitidas ahora mismo
+        self.limite = limite.valor if limite is not None else max_workers
+        self.executor = None
+        self._tamano_pool = 0
+        if modo == MODO_THREAD:
+            # el pool se dimensiona para el techo del límite
+            self._tamano_pool = limite.maximo if limite is not None else max_workers
+            self.executor = ThreadPoolExecutor(
+                max_workers=self._tamano_pool,
+                thread_name_prefix=f"bulkhead-{name}-"
+            )
+
+        # admisión: como mucho `limite` tareas enviadas al executor, así su
+        # cola interna (sin límite) nunca crece. Un lugar se libera cuando la
+        # tarea termina de verdad, no cuando el que llamó deja de esperarla
+        self._lock = threading.Lock()
+        self._lugar_libre = threading.Condition(self._lock)
+        self._cerrado = False
         self.active_tasks = 0
-        self.total_requests = 0
-        self.rejected_requests = 0
+        self.queued = 0
+        self.max_queued = 0
+
+        # contadores por thread (ver patrones/metricas.py): se actualizan sin lock
+        self.total_requests = ContadorStriped()
+        self.rejected_requests = ContadorStriped()  # rechazadas por bulkhead lleno
+        self.timeouts = ContadorStriped()
+        self.errors = ContadorStriped()
+        self.abandoned_running = 0  # tareas con timeout que siguen ocupando un thread
+        self._duracion_media = None  # segundos, media móvil exponencial
+
+        self.espera_ms = Histograma(LIMITES_ESPERA_MS)
+        self.cola_al_llegar = Histograma(LIMITES_COLA)
         
         logger.info(
-            f"Bulkhead '{name}' creado con {max_workers} workers y timeout de {timeout}s"
+            f"Bulkhead '{name}' ({modo}) creado con {max_workers} workers, cola de {self.max_queue} "
+            f"(espera máx. {max_wait}s) y timeout de {timeout}s"
+            + (f"; límite {limite.algoritmo} entre {limite.minimo} y {limite.maximo}" if limite else "")
+        )
+
+    def _retry_after(self) -> int:
+        """Estimación de cuánto tardará en liberarse lugar (se llama con el lock tomado)"""
+        duracion = self._duracion_media or self.max_wait or 1
+        turnos = (self.queued + 1) / max(1, self.limite)
+        return max(1, math.ceil(duracion * turnos))
+
+    def _rechazar(self, motivo: str):
+        """Se llama con el lock tomado"""
+        self.rejected_requests.incrementar()
+        logger.warning(f"[{self.name}] Rechazada: {motivo}")
+        raise BulkheadFullException(
+            self.name, f"Bulkhead '{self.name}' lleno: {motivo}", self._retry_after()
         )
+
+    def _adquirir(self):
+        """
+        Toma un lugar o espera en la cola acotada. Las llamadas nuevas no se
+        adelantan a las que ya esperan.
+
+        Raises:
+            BulkheadFullException: Si la cola está llena o se agota max_wait
+        """
+        self.total_requests.incrementar()
+        inicio = time.monotonic()
+        profundidad = None
+        try:
+            with self._lock:
+                profundidad = self.queued
+                self._esperar_lugar(inicio)
+        finally:
+            # los histogramas se registran fuera del lock
+            if profundidad is not None:
+                self.cola_al_llegar.registrar(profundidad)
+        self.espera_ms.registrar((time.monotonic() - inicio) * 1000)
+
+    def _esperar_lugar(self, inicio: float):
+        """Se llama con el lock tomado"""
+        if self._cerrado:
+            self._rechazar("bulkhead cerrado")
+        if self.active_tasks < self.limite and self.queued == 0:
+            self.active_tasks += 1
+            return
+        if self.queued >= self.max_queue:
+            self._rechazar(f"{self.active_tasks} en ejecución y {self.queued} en cola")
+
+        vence = inicio + self.max_wait
+        self.queued += 1
+        self.max_queued = max(self.max_queued, self.queued)
+        try:
+            while self.active_tasks >= self.limite:
+                if self._cerrado:
+                    self._rechazar("bulkhead cerrado")
+                restante = vence - time.monotonic()
+                if restante <= 0:
+                    self._rechazar(f"sin lugar después de esperar {self.max_wait}s en cola")
+                self._lugar_libre.wait(restante)
+            self.active_tasks += 1
+        finally:
+            self.queued -= 1
+
+    def _liberar(self, inicio: float, abandonada: bool = False, fallo: bool = False):
+        duracion = time.monotonic() - inicio
+        with self._lock:
+            en_vuelo = self.active_tasks
+            self.active_tasks -= 1
+            if abandonada:
+                self.abandoned_running -= 1
+            if self._duracion_media is None:
+                self._duracion_media = duracion
+            else:
+                self._duracion_media = 0.8 * self._duracion_media + 0.2 * duracion
+            despertar = 1
+            if self._adaptativo is not None:
+                anterior = self.limite
+                self.limite = self._adaptativo.registrar(duracion, en_vuelo, fallo or abandonada)
+                # si el límite subió hay más de un lugar para los que esperan
+                despertar += max(0, self.limite - anterior)
+            self._lugar_libre.notify(despertar)
     
     def execute(self, func: Callable, *args, **kwargs) -> Any:
         """
-        Ejecuta una función en el thread pool del bulkhead.
+        Ejecuta una función en el thread pool del bulkhead (o en el thread
+        actual, en modo semáforo).
         
         Args:
             func: Función a ejecutar
@@ -57,58 +227,357 @@ class Bulkhead:
             
         Raises:
             BulkheadFullException: Si el bulkhead está lleno
-            TimeoutError: Si la operación excede el timeout
+            TimeoutError: Si la operación excede el timeout (solo modo thread)
         """
-        self.total_requests += 1
-        
+        self._adquirir()
+        if self.modo == MODO_SEMAFORO:
+            return self._ejecutar_en_lugar(func, *args, **kwargs)
+        inicio = time.monotonic()
+        estado = {"abandonada": False}
         try:
-            self.active_tasks += 1
-            logger.info(
-                f"[{self.name}] Ejecutando tarea. Activas: {self.active_tasks}/{self.max_workers}"
-            )
-            
             future = self.executor.submit(func, *args, **kwargs)
-            result = future.result(timeout=self.timeout)
-            
-            logger.info(f"[{self.name}] Tarea completada exitosamente")
-            return result
+        except Exception:
+            self._liberar(inicio)
+            raise
+        future.add_done_callback(
+            lambda f: self._liberar(
+                inicio, estado["abandonada"], f.cancelled() or f.exception() is not None
+            )
+        )
+
+        logger.debug(
+            f"[{self.name}] Ejecutando tarea. Activas: {self.active_tasks}/{self.limite}"
+        )
+        try:
+            return future.result(timeout=self.timeout)
             
         except TimeoutError:
-            self.rejected_requests += 1
-            logger.error(
-                f"[{self.name}] Timeout después de {self.timeout}s. "
-                f"Rechazadas: {self.rejected_requests}/{self.total_requests}"
-            )
+            self.timeouts.incrementar()
+            # cancel() fuera del lock: si cancela, corre el callback (_liberar)
+            # en este mismo thread, y _liberar toma el lock
+            if not future.cancel():
+                with self._lock:
+                    # si todavía corre, sigue contando como activa hasta que
+                    # termine; su callback todavía no corrió y va a ver la marca
+                    if not future.done():
+                        estado["abandonada"] = True
+                        self.abandoned_running += 1
+            logger.error(f"[{self.name}] Timeout después de {self.timeout}s")
             raise TimeoutError(
                 f"La operación en '{self.name}' excedió el timeout de {self.timeout}s"
             )
             
         except Exception as e:
-            self.rejected_requests += 1
+            self.errors.incrementar()
             logger.error(f"[{self.name}] Error en ejecución: {str(e)}")
             raise
-            
-        finally:
-            self.active_tasks -= 1
     
+    def _ejecutar_en_lugar(self, func: Callable, *args, **kwargs) -> Any:
+        """Modo semáforo: el lugar ya está tomado, se ejecuta sin cambiar de thread"""
+        inicio = time.monotonic()
+        fallo = False
+        try:
+            return func(*args, **kwargs)
+        except Exception as e:
+            fallo = True
+            self.errors.incrementar()
+            logger.error(f"[{self.name}] Error en ejecución: {str(e)}")
+            raise
+        finally:
+            self._liberar(inicio, fallo=fallo)
+
+    def reconfigure(self, max_workers: int = None, timeout: int = None, max_queue: int = None,
+                    max_wait: float = None, limite_min: int = None, limite_max: int = None):
+        """
+        Cambia la configuración en caliente sin cortar lo que está en ejecución.
+        Con límite adaptativo, max_workers no cambia el límite: lo acotan
+        limite_min y limite_max.
+        """
+        with self._lock:
+            if timeout is not None:
+                self.timeout = timeout
+            if max_wait is not None:
+                self.max_wait = max_wait
+            if max_queue is not None:
+                self.max_queue = max_queue
+            if max_workers is not None:
+                self.max_workers = max_workers
+            if self._adaptativo is not None:
+                self._adaptativo.ajustar_rango(limite_min, limite_max)
+                self.limite = self._adaptativo.valor
+                necesario = self._adaptativo.maximo
+            else:
+                self.limite = self.max_workers
+                necesario = self.max_workers
+
+            if self.executor is not None and necesario > self._tamano_pool:
+                # ThreadPoolExecutor no se puede agrandar: las tareas nuevas van a
+                # un pool nuevo. El viejo no se cierra: quien ya tiene la
+                # referencia puede seguir enviándole, y sus threads terminan
+                # solos cuando se libera (lo que está corriendo no se corta)
+                self.executor = ThreadPoolExecutor(
+                    max_workers=necesario,
+                    thread_name_prefix=f"bulkhead-{self.name}-"
+                )
+                self._tamano_pool = necesario
+            # si hay más lugar, los que esperan en cola lo toman; si la cola se
+            # achicó, los que ya esperan siguen esperando
+            self._lugar_libre.notify_all()
+        logger.info(
+            f"Bulkhead '{self.name}' reconfigurado: límite {self.limite}, cola de {self.max_queue} "
+            f"(espera máx. {self.max_wait}s) y timeout de {self.timeout}s"
+        )
+
     def get_stats(self) -> dict:
         """Retorna estadísticas del bulkhead"""
+        total = self.total_requests.valor
+        rechazadas = self.rejected_requests.valor
+        timeouts = self.timeouts.valor
+        errores = self.errors.valor
+        fallidas = rechazadas + timeouts + errores
+        with self._lock:
+            return {
+                "name": self.name,
+                "mode": self.modo,
+                "max_workers": self.max_workers,
+                "current_limit": self.limite,
+                "adaptive_limit": self._adaptativo.to_dict() if self._adaptativo is not None else None,
+                "max_queue": self.max_queue,
+                "max_wait": self.max_wait,
+                "active_tasks": self.active_tasks,
+                "queued": self.queued,
+                "max_queued": self.max_queued,
+                "abandoned_running": self.abandoned_running,
+                "total_requests": total,
+                "rejected_requests": rechazadas,
+                "timeouts": timeouts,
+                "errors": errores,
+                "success_rate": ((total - fallidas) / total * 100) if total > 0 else 100.0,
+                "wait_ms_histogram": self.espera_ms.to_dict(),
+                "queue_depth_histogram": self.cola_al_llegar.to_dict(),
+            }
+    
+    def shutdown(self, wait: bool = True):
+        """Cierra el thread pool del bulkhead"""
+        logger.info(f"Cerrando bulkhead '{self.name}'")
+        with self._lock:
+            # las llamadas en cola dejan de esperar
+            self._cerrado = True
+            self._lugar_libre.notify_all()
+        if self.executor is not None:
+            self.executor.shutdown(wait=wait)
+
+
+class BulkheadAsync:
+    """
+    Bulkhead para corrutinas: limita cuántas se ejecutan a la vez en el event
+    loop, con la misma cola acotada, rechazo y estadísticas que Bulkhead.
+    No usa threads; el timeout cancela la corrutina.
+    """
+
+    modo = MODO_ASYNC
+
+    def __init__(self, name: str, max_workers: int = 5, timeout: float = 30,
+                 max_queue: int = None, max_wait: float = 1.0, limite: LimiteAdaptativo = None):
+        self.name = name
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.max_queue = max_workers if max_queue is None else max_queue
+        self.max_wait = max_wait
+        self._adaptativo = limite
+        self.limite = limite.valor if limite is not None else max_workers
+
+        # todo corre en el mismo event loop: no hace falta lock. Un lugar que se
+        # libera pasa directo al primero de la cola (sin asyncio.Semaphore, para
+        # que el límite pueda cambiar)
+        self._esperando = deque()  # futures de las llamadas en cola, en orden
+        self._loop = None  # el event loop que lo usa (para reconfigure desde otro thread)
+        self._cerrado = False
+        self.active_tasks = 0
+        self.queued = 0
+        self.max_queued = 0
+
+        self.total_requests = 0
+        self.rejected_requests = 0
+        self.timeouts = 0
+        self.errors = 0
+        self._duracion_media = None
+
+        self.espera_ms = Histograma(LIMITES_ESPERA_MS)
+        self.cola_al_llegar = Histograma(LIMITES_COLA)
+
+        logger.info(
+            f"Bulkhead '{name}' (async) creado con {max_workers} lugares, cola de {self.max_queue} "
+            f"(espera máx. {max_wait}s) y timeout de {timeout}s"
+            + (f"; límite {limite.algoritmo} entre {limite.minimo} y {limite.maximo}" if limite else "")
+        )
+
+    def _retry_after(self) -> int:
+        duracion = self._duracion_media or self.max_wait or 1
+        turnos = (self.queued + 1) / max(1, self.limite)
+        return max(1, math.ceil(duracion * turnos))
+
+    def _rechazar(self, motivo: str):
+        self.rejected_requests += 1
+        logger.warning(
+            f"[{self.name}] Rechazada: {motivo}. Rechazadas: {self.rejected_requests}/{self.total_requests}"
+        )
+        raise BulkheadFullException(
+            self.name, f"Bulkhead '{self.name}' lleno: {motivo}", self._retry_after()
+        )
+
+    def _despertar(self):
+        """Pasa los lugares libres a las llamadas en cola, en orden de llegada"""
+        while self._esperando and self.active_tasks < self.limite:
+            lugar = self._esperando.popleft()
+            if not lugar.done():
+                self.active_tasks += 1
+                lugar.set_result(None)
+
+    def _soltar(self):
+        self.active_tasks -= 1
+        self._despertar()
+
+    async def _adquirir(self):
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+        self.total_requests += 1
+        self.cola_al_llegar.registrar(self.queued)
+        if self._cerrado:
+            self._rechazar("bulkhead cerrado")
+        if self.queued == 0 and self.active_tasks < self.limite:
+            self.active_tasks += 1
+            self.espera_ms.registrar(0)
+            return
+        if self.queued >= self.max_queue:
+            self._rechazar(f"{self.active_tasks} en ejecución y {self.queued} en cola")
+
+        inicio = time.monotonic()
+        lugar = asyncio.get_running_loop().create_future()
+        self._esperando.append(lugar)
+        self.queued += 1
+        self.max_queued = max(self.max_queued, self.queued)
+        try:
+            await asyncio.wait_for(lugar, self.max_wait)
+        except BaseException as e:
+            if lugar.done() and not lugar.cancelled():
+                # el lugar llegó justo cuando vencía la espera: se devuelve
+                self._soltar()
+            elif lugar in self._esperando:
+                self._esperando.remove(lugar)
+            if isinstance(e, asyncio.TimeoutError):
+                self._rechazar(f"sin lugar después de esperar {self.max_wait}s en cola")
+            if self._cerrado and lugar.cancelled():
+                self._rechazar("bulkhead cerrado")
+            raise
+        finally:
+            self.queued -= 1
+        self.espera_ms.registrar((time.monotonic() - inicio) * 1000)
+
+    async def execute(self, func: Callable[..., Awaitable], *args, **kwargs) -> Any:
+        """
+        Ejecuta await func(*args, **kwargs) dentro del bulkhead.
+
+        Raises:
+            BulkheadFullException: Si el bulkhead está lleno
+            TimeoutError: Si la corrutina excede el timeout (se cancela)
+        """
+        await self._adquirir()
+        inicio = time.monotonic()
+        fallo = False
+        try:
+            if _timeout_async is not None:
+                # asyncio.timeout no crea una tarea nueva por llamada (wait_for sí)
+                async with _timeout_async(self.timeout):
+                    return await func(*args, **kwargs)
+            return await asyncio.wait_for(func(*args, **kwargs), self.timeout)
+        except asyncio.TimeoutError:
+            fallo = True
+            self.timeouts += 1
+            logger.error(f"[{self.name}] Timeout después de {self.timeout}s")
+            raise TimeoutError(
+                f"La operación en '{self.name}' excedió el timeout de {self.timeout}s"
+            )
+        except Exception as e:
+            fallo = True
+            self.errors += 1
+            logger.error(f"[{self.name}] Error en ejecución: {str(e)}")
+            raise
+        finally:
+            duracion = time.monotonic() - inicio
+            if self._duracion_media is None:
+                self._duracion_media = duracion
+            else:
+                self._duracion_media = 0.8 * self._duracion_media + 0.2 * duracion
+            if self._adaptativo is not None:
+                self.limite = self._adaptativo.registrar(duracion, self.active_tasks, fallo)
+            self._soltar()
+
+    def reconfigure(self, max_workers: int = None, timeout: float = None, max_queue: int = None,
+                    max_wait: float = None, limite_min: int = None, limite_max: int = None):
+        """Igual que Bulkhead.reconfigure; se llama desde otro thread, así que se aplica en el event loop si hay uno"""
+        if self._loop is not None and self._loop.is_running():
+            self._loop.call_soon_threadsafe(
+                self._reconfigurar, max_workers, timeout, max_queue, max_wait, limite_min, limite_max
+            )
+        else:
+            self._reconfigurar(max_workers, timeout, max_queue, max_wait, limite_min, limite_max)
+
+    def _reconfigurar(self, max_workers, timeout, max_queue, max_wait, limite_min, limite_max):
+        if timeout is not None:
+            self.timeout = timeout
+        if max_wait is not None:
+            self.max_wait = max_wait
+        if max_queue is not None:
+            self.max_queue = max_queue
+        if max_workers is not None:
+            self.max_workers = max_workers
+        if self._adaptativo is not None:
+            self._adaptativo.ajustar_rango(limite_min, limite_max)
+            self.limite = self._adaptativo.valor
+        else:
+            self.limite = self.max_workers
+        self._despertar()
+        logger.info(
+            f"Bulkhead '{self.name}' reconfigurado: límite {self.limite}, cola de {self.max_queue} "
+            f"(espera máx. {self.max_wait}s) y timeout de {self.timeout}s"
+        )
+
+    def get_stats(self) -> dict:
+        fallidas = self.rejected_requests + self.timeouts + self.errors
         return {
             "name": self.name,
+            "mode": self.modo,
             "max_workers": self.max_workers,
+            "current_limit": self.limite,
+            "adaptive_limit": self._adaptativo.to_dict() if self._adaptativo is not None else None,
+            "max_queue": self.max_queue,
+            "max_wait": self.max_wait,
             "active_tasks": self.active_tasks,
+            "queued": self.queued,
+            "max_queued": self.max_queued,
+            "abandoned_running": 0,
             "total_requests": self.total_requests,
             "rejected_requests": self.rejected_requests,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
             "success_rate": (
-                ((self.total_requests - self.rejected_requests) / self.total_requests * 100)
+                ((self.total_requests - fallidas) / self.total_requests * 100)
                 if self.total_requests > 0 else 100.0
-            )
+            ),
+            "wait_ms_histogram": self.espera_ms.to_dict(),
+            "queue_depth_histogram": self.cola_al_llegar.to_dict(),
         }
-    
+
     def shutdown(self, wait: bool = True):
-        """Cierra el thread pool del bulkhead"""
+        """Las llamadas nuevas se rechazan; las que están corriendo terminan normalmente"""
         logger.info(f"Cerrando bulkhead '{self.name}'")
-        self.executor.shutdown(wait=wait)
+        self._cerrado = True
+        # las que esperan en cola se rechazan como si se les agotara la espera
+        while self._esperando:
+            lugar = self._esperando.popleft()
+            if not lugar.done():
+                lugar.cancel()
 
 
 class BulkheadManager:
@@ -125,13 +594,25 @@ class BulkheadManager:
             cls._instance.bulkheads = {}
         return cls._instance
     
-    def create_bulkhead(self, name: str, max_workers: int = 5, timeout: int = 30) -> Bulkhead:
-        """Crea un nuevo bulkhead si no existe"""
+    def create_bulkhead(self, name: str, max_workers: int = 5, timeout: int = 30,
+                        max_queue: int = None, max_wait: float = 1.0, modo: str = MODO_THREAD,
+                        limite: LimiteAdaptativo = None):
+        """
+        Crea un nuevo bulkhead si no existe (modo "thread", "semaforo" o "async").
+        Con `limite` la concurrencia se adapta a la latencia en lugar de ser max_workers.
+        """
         if name not in self.bulkheads:
-            self.bulkheads[name] = Bulkhead(name, max_workers, timeout)
+            if modo == MODO_ASYNC:
+                self.bulkheads[name] = BulkheadAsync(name, max_workers, timeout, max_queue, max_wait, limite)
+            else:
+                self.bulkheads[name] = Bulkhead(name, max_workers, timeout, max_queue, max_wait, modo, limite)
             logger.info(f"Bulkhead '{name}' registrado en el gestor")
         return self.bulkheads[name]
     
+    def reconfigure_bulkhead(self, name: str, **cambios):
+        """Aplica cambios de configuración en caliente a un bulkhead existente"""
+        self.get_bulkhead(name).reconfigure(**cambios)
+
     def get_bulkhead(self, name: str) -> Bulkhead:
         """Obtiene un bulkhead existente"""
         if name not in self.bulkheads:
@@ -159,8 +640,19 @@ def bulkhead_protected(bulkhead_name: str):
         @bulkhead_protected("productos")
         def obtener_producto(id):
             # ... código ...
+
+    Si la función es una corrutina el bulkhead tiene que ser de modo "async".
     """
     def decorator(func: Callable) -> Callable:
+        if asyncio.iscoroutinefunction(func):
+            @wraps(func)
+            async def wrapper_async(*args, **kwargs):
+                bulkhead = BulkheadManager().get_bulkhead(bulkhead_name)
+                if not isinstance(bulkhead, BulkheadAsync):
+                    raise TypeError(f"El bulkhead '{bulkhead_name}' no es async; no puede proteger una corrutina")
+                return await bulkhead.execute(func, *args, **kwargs)
+            return wrapper_async
+
         @wraps(func)
         def wrapper(*args, **kwargs):
             manager = BulkheadManager()
@@ -0,0 +1,238 @@
+"""
+Patron Cache-Aside - Cache en memoria con LRU + TTL
+
+Guarda en memoria los resultados de lecturas frecuentes para no ir a la base
+de datos en cada llamada:
+- LRU: si se llena, se descartan las entradas usadas hace mas tiempo
+- TTL: cada entrada vence despues de `ttl` segundos
+- Single-flight: si muchas llamadas piden a la vez una clave que no esta,
+  solo una va a la base de datos y las demas esperan su resultado
+- Invalidacion: las escrituras eliminan las claves afectadas
+"""
+
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+
+class Cache:
+    """
+    Cache LRU/TTL thread-safe con proteccion contra estampidas (single-flight).
+    Sirve tanto para codigo sync (obtener) como async (obtener_async).
+    """
+
+    def __init__(self, nombre, max_entradas=1000, ttl=30):
+        """
+        Args:
+            nombre: Nombre descriptivo de la cache
+            max_entradas: Cantidad maxima de claves guardadas
+            ttl: Segundos que vive cada entrada
+        """
+        self.nombre = nombre
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+
+        self._lock = threading.Lock()
+        self._datos = OrderedDict()  # clave -> (valor, vence_en)
+        self._en_vuelo = {}  # clave -> Future de la carga sync en curso
+        self._en_vuelo_async = {}  # clave -> asyncio.Future de la carga async en curso
+        # cada invalidacion incrementa la generacion; una carga que empezo
+        # antes de una invalidacion no guarda su resultado (podria estar viejo)
+        self._generacion = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.cargas = 0
+        self.esperas = 0  # llamadas que esperaron la carga de otra (single-flight)
+        self.evictions = 0
+        self.expiradas = 0
+        self.invalidaciones = 0
+
+    def _buscar(self, clave):
+        """Busca una entrada vigente (se llama con el lock tomado)"""
+        entrada = self._datos.get(clave)
+        if entrada is None:
+            return False, None
+        valor, vence_en = entrada
+        if time.time() >= vence_en:
+            del self._datos[clave]
+            self.expiradas += 1
+            return False, None
+        self._datos.move_to_end(clave)
+        return True, valor
+
+    def _guardar(self, clave, valor, generacion):
+        """Guarda el resultado de una carga (se llama con el lock tomado)"""
+        if generacion != self._generacion:
+            return
+        self._datos[clave] = (valor, time.time() + self.ttl)
+        self._datos.move_to_end(clave)
+        while len(self._datos) > self.max_entradas:
+            self._datos.popitem(last=False)
+            self.evictions += 1
+
+    def obtener(self, clave, cargador, *args, **kwargs):
+        """
+        Retorna el valor de `clave`; si no esta, lo carga con cargador(*args, **kwargs).
+        Si otra llamada ya lo esta cargando, espera ese resultado.
+        """
+        with self._lock:
+            encontrado, valor = self._buscar(clave)
+            if encontrado:
+                self.hits += 1
+                return valor
+            self.misses += 1
+            future = self._en_vuelo.get(clave)
+            if future is not None:
+                self.esperas += 1
+                propia = False
+            else:
+                future = Future()
+                self._en_vuelo[clave] = future
+                generacion = self._generacion
+                self.cargas += 1
+                propia = True
+
+        if not propia:
+            return future.result()
+
+        try:
+            valor = cargador(*args, **kwargs)
+        except BaseException as error:
+            with self._lock:
+                if self._en_vuelo.get(clave) is future:
+                    del self._en_vuelo[clave]
+            future.set_exception(error)
+            raise
+
+        with self._lock:
+            self._guardar(clave, valor, generacion)
+            if self._en_vuelo.get(clave) is future:
+                del self._en_vuelo[clave]
+        future.set_result(valor)
+        return valor
+
+    async def obtener_async(self, clave, cargador, *args, **kwargs):
+        """Igual que obtener, pero con un cargador async (await cargador(*args, **kwargs))"""
+        with self._lock:
+            encontrado, valor = self._buscar(clave)
+            if encontrado:
+                self.hits += 1
+                return valor
+            self.misses += 1
+            future = self._en_vuelo_async.get(clave)
+            if future is not None:
+                self.esperas += 1
+                propia = False
+            else:
+                future = asyncio.get_running_loop().create_future()
+                self._en_vuelo_async[clave] = future
+                generacion = self._generacion
+                self.cargas += 1
+                propia = True
+
+        if not propia:
+            # shield: si se cancela esta espera no se cancela la carga compartida
+            return await asyncio.shield(future)
+
+        try:
+            valor = await cargador(*args, **kwargs)
+        except BaseException as error:
+            with self._lock:
+                if self._en_vuelo_async.get(clave) is future:
+                    del self._en_vuelo_async[clave]
+            if isinstance(error, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(error)
+                # evita el warning de "exception never retrieved" si nadie esperaba
+                future.exception()
+            raise
+
+        with self._lock:
+            self._guardar(clave, valor, generacion)
+            if self._en_vuelo_async.get(clave) is future:
+                del self._en_vuelo_async[clave]
+        future.set_result(valor)
+        return valor
+
+    def invalidar(self, *claves):
+        """Elimina las claves indicadas"""
+        self.invalidar_si(lambda clave: clave in claves)
+
+    def invalidar_si(self, predicado):
+        """Elimina todas las claves para las que predicado(clave) es True"""
+        with self._lock:
+            self._generacion += 1
+            self.invalidaciones += 1
+            for clave in [c for c in self._datos if predicado(c)]:
+                del self._datos[clave]
+            # las cargas en curso ya no se comparten: las nuevas llamadas cargan de nuevo
+            for en_vuelo in (self._en_vuelo, self._en_vuelo_async):
+                for clave in [c for c in en_vuelo if predicado(c)]:
+                    del en_vuelo[clave]
+
+    def limpiar(self):
+        """Elimina todas las entradas"""
+        self.invalidar_si(lambda clave: True)
+
+    def obtener_estadisticas(self):
+        """Retorna estadisticas de la cache"""
+        with self._lock:
+            consultas = self.hits + self.misses
+            return {
+                "nombre": self.nombre,
+                "entradas": len(self._datos),
+                "max_entradas": self.max_entradas,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "tasa_hits": round(self.hits / consultas * 100, 2) if consultas else 0.0,
+                "cargas": self.cargas,
+                "esperas_single_flight": self.esperas,
+                "evictions": self.evictions,
+                "expiradas": self.expiradas,
+                "invalidaciones": self.invalidaciones,
+            }
+
+
+class GestorCaches:
+    """
+    Gestor central de las caches del sistema.
+    Patron Singleton para tener una unica instancia.
+    """
+
+    _instancia = None
+
+    def __new__(cls):
+        if cls._instancia is None:
+            cls._instancia = super().__new__(cls)
+            cls._instancia.caches = {}
+        return cls._instancia
+
+    def crear_cache(self, nombre, max_entradas=1000, ttl=30):
+        """Crea y registra una cache si no existe"""
+        if nombre not in self.caches:
+            self.caches[nombre] = Cache(nombre, max_entradas, ttl)
+            print(f"[Gestor] Cache '{nombre}' registrada (max={max_entradas}, ttl={ttl}s)")
+        return self.caches[nombre]
+
+    def obtener_cache(self, nombre):
+        """Obtiene una cache existente"""
+        if nombre not in self.caches:
+            raise ValueError(f"Cache '{nombre}' no existe")
+        return self.caches[nombre]
+
+    def obtener_todas_estadisticas(self):
+        """Retorna estadisticas de todas las caches"""
+        return {
+            nombre: cache.obtener_estadisticas()
+            for nombre, cache in self.caches.items()
+        }
+
+    def limpiar_todas(self):
+        """Vacia todas las caches"""
+        for cache in self.caches.values():
+            cache.limpiar()
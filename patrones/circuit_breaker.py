@@ -6,10 +6,31 @@ sobrecarguen el sistema. Funciona como un interruptor electrico:
 - CERRADO: Las llamadas pasan normalmente
 - ABIERTO: Las llamadas fallan inmediatamente sin intentar
 - SEMI_ABIERTO: Permite algunas llamadas de prueba
+
+Modos (GestorCircuitBreakers.crear_circuit_breaker(..., modo=...)):
+- "consecutivos": abre despues de `max_fallos` fallos seguidos.
+- "ventana": abre cuando, sobre las ultimas llamadas (ventana de N llamadas o
+  de N segundos), la tasa de fallos o la de llamadas lentas supera su umbral,
+  con un minimo de llamadas para decidir. Con mucho trafico un 40% de fallos
+  intercalados con exitos nunca junta `max_fallos` seguidos; la tasa si lo ve.
+
+El mismo circuit breaker protege codigo sync (llamar) y corrutinas
+(llamar_async): el estado es compartido, asi que los fallos de una ruta abren
+el circuito para la otra. `circuit_breaker_protegido` elige segun la funcion.
 """
 
 import time
+import asyncio
+import inspect
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
 from enum import Enum
+from functools import wraps
+
+from patrones.metricas import ContadorStriped
+
+logger = logging.getLogger(__name__)
 
 # estados posibles del circuit breaker
 class EstadoCircuito(Enum):
@@ -21,6 +42,19 @@ class EstadoCircuito(Enum):
 class CircuitBreakerError(Exception):
     pass
 
+# la llamada protegida no termino dentro de timeout_llamada (cuenta como fallo)
+class LlamadaTimeoutError(TimeoutError):
+    pass
+
+# asyncio.timeout existe desde Python 3.11
+_timeout_async = getattr(asyncio, "timeout", None)
+
+
+MODO_CONSECUTIVOS = "consecutivos"
+MODO_VENTANA = "ventana"
+VENTANA_CONTEO = "conteo"
+VENTANA_TIEMPO = "tiempo"
+
 
 class CircuitBreaker:
     """
@@ -29,33 +63,85 @@ class CircuitBreaker:
     El circuito se abre cuando hay muchos fallos consecutivos,
     se mantiene abierto por un tiempo, y luego permite probar
     si el servicio se recupero.
+
+    En SEMI_ABIERTO solo pasan `max_pruebas` llamadas de prueba a la vez; el
+    resto se rechaza como si estuviera abierto, asi el servicio que se esta
+    recuperando no recibe toda la carga de golpe. Si las pruebas no avanzan
+    en `timeout_semi_abierto` segundos, o una falla, vuelve a ABIERTO; cada
+    reapertura seguida multiplica el tiempo abierto por `factor_backoff`
+    (hasta `timeout_abierto_max`).
+
+    Con `timeout_llamada` la funcion corre en un pool chico de threads propio
+    y el que llama deja de esperarla al vencer el plazo: la llamada cuenta
+    como fallo y el thread del request queda libre aunque la dependencia
+    siga colgada. Como mucho `hilos_llamada` llamadas pueden estar corriendo
+    (o colgadas) a la vez; las siguientes fallan enseguida.
     """
+
+    modo = MODO_CONSECUTIVOS
     
-    def __init__(self, nombre, max_fallos=3, timeout_abierto=60, timeout_semi_abierto=30):
+    def __init__(self, nombre, max_fallos=3, timeout_abierto=60, timeout_semi_abierto=30,
+                 max_pruebas=1, exitos_para_cerrar=2, factor_backoff=2.0, timeout_abierto_max=None,
+                 timeout_llamada=None, hilos_llamada=10, umbral_lenta=5.0):
         """
         Args:
             nombre: Nombre descriptivo del circuit breaker
             max_fallos: Numero de fallos antes de abrir el circuito
             timeout_abierto: Segundos que el circuito permanece abierto
-            timeout_semi_abierto: Segundos para probar en estado semi-abierto
+            timeout_semi_abierto: Segundos que puede pasar en semi-abierto sin que termine una prueba
+            max_pruebas: Llamadas de prueba concurrentes permitidas en semi-abierto
+            exitos_para_cerrar: Pruebas exitosas necesarias para cerrar
+            factor_backoff: Multiplicador del tiempo abierto en cada reapertura seguida
+            timeout_abierto_max: Tope del tiempo abierto (por defecto 8 veces timeout_abierto)
+            timeout_llamada: Segundos maximos de cada llamada (None = sin limite)
+            hilos_llamada: Threads para las llamadas sync con timeout
+            umbral_lenta: Segundos a partir de los cuales una llamada cuenta como lenta
         """
         self.nombre = nombre
         self.max_fallos = max_fallos
         self.timeout_abierto = timeout_abierto
         self.timeout_semi_abierto = timeout_semi_abierto
+        self.max_pruebas = max_pruebas
+        self.exitos_para_cerrar = exitos_para_cerrar
+        self.factor_backoff = factor_backoff
+        self.timeout_abierto_max = timeout_abierto_max if timeout_abierto_max is not None else timeout_abierto * 8
+        self.timeout_llamada = timeout_llamada or None  # 0 = sin limite
+        self.hilos_llamada = hilos_llamada
+        self.umbral_lenta = umbral_lenta
+        self._ejecutor = None  # se crea con la primera llamada con timeout
+        self._en_ejecutor = 0
         
-        # estado interno
+        # estado interno: las transiciones (y los contadores consecutivos que
+        # las disparan) se hacen con el lock tomado; una llamada exitosa con el
+        # circuito cerrado no lo toma
+        self._lock = threading.Lock()
         self.estado = EstadoCircuito.CERRADO
         self.contador_fallos = 0
         self.contador_exitos = 0
         self.tiempo_ultimo_fallo = None
-        self.total_llamadas = 0
-        self.total_exitos = 0
-        self.total_fallos = 0
+        self.timeout_abierto_actual = timeout_abierto  # con backoff
+        self.aperturas_seguidas = 0  # aperturas sin un cierre en el medio
+        self._abierto_desde = None
+        self._ultimo_avance = None  # entrada a semi-abierto o ultima prueba terminada
+        self._pruebas_en_curso = 0
+        # cada periodo semi-abierto tiene su generacion: el resultado de una
+        # prueba de un periodo anterior no cuenta
+        self._generacion = 0
+        # totales por thread (ver patrones/metricas.py)
+        self.total_llamadas = ContadorStriped()
+        self.total_llamadas_async = ContadorStriped()
+        self.total_exitos = ContadorStriped()
+        self.total_fallos = ContadorStriped()
+        self.total_rechazadas = ContadorStriped()
+        self.total_lentas = ContadorStriped()
+        self.total_timeouts = ContadorStriped()
         
         print(f"[Circuit Breaker] '{nombre}' inicializado")
         print(f"  - Max fallos permitidos: {max_fallos}")
-        print(f"  - Timeout abierto: {timeout_abierto}s")
+        print(f"  - Timeout abierto: {timeout_abierto}s (backoff x{factor_backoff}, max {self.timeout_abierto_max}s)")
+        print(f"  - Semi-abierto: {max_pruebas} prueba(s) a la vez, timeout {timeout_semi_abierto}s")
+        if timeout_llamada:
+            print(f"  - Timeout por llamada: {timeout_llamada}s")
     
     def llamar(self, funcion, *args, **kwargs):
         """
@@ -69,102 +155,528 @@ class CircuitBreaker:
             Resultado de la funcion
             
         Raises:
-            CircuitBreakerError: Si el circuito esta abierto
+            CircuitBreakerError: Si el circuito esta abierto (o semi-abierto sin lugar para otra prueba)
             Exception: Si la funcion falla
         """
-        self.total_llamadas += 1
+        self.total_llamadas.incrementar()
 
-        # verificar si debemos cambiar de estado
-        self._verificar_estado()
-        
-        # si el circuito esta abierto => rechazar inmediatamente
-        if self.estado == EstadoCircuito.ABIERTO:
-            self.total_fallos += 1
-            print(f"[{self.nombre}] RECHAZADO - Circuito ABIERTO")
-            raise CircuitBreakerError(
-                f"Circuit breaker '{self.nombre}' esta ABIERTO. "
-                f"Servicio temporalmente no disponible."
-            )
+        # verificar si debemos cambiar de estado y si la llamada pasa
+        prueba = self._admitir()
         
         # intentar ejecutar la funcion
+        inicio = time.monotonic()
         try:
-            print(f"[{self.nombre}] Ejecutando llamada (Estado: {self.estado.value})")
-            resultado = funcion(*args, **kwargs)
+            logger.debug(f"[{self.nombre}] Ejecutando llamada (prueba: {prueba is not None})")
+            if self.timeout_llamada:
+                resultado = self._llamar_con_timeout(funcion, args, kwargs)
+            else:
+                resultado = funcion(*args, **kwargs)
             
             # la llamada fue exitosa
-            self._registrar_exito()
+            self._registrar_exito(self._duracion(inicio), prueba)
             return resultado
             
         except Exception as error:
             # la llamada fallo
-            self._registrar_fallo()
+            self._registrar_fallo(self._duracion(inicio), prueba)
             raise error
+
+    async def llamar_async(self, funcion, *args, **kwargs):
+        """
+        Igual que llamar, desde un handler async. Si `funcion` es una corrutina
+        se la espera (el timeout la cancela); si es sync corre en el pool del
+        circuit breaker para no bloquear el event loop.
+        """
+        self.total_llamadas.incrementar()
+        self.total_llamadas_async.incrementar()
+        prueba = self._admitir()
+
+        inicio = time.monotonic()
+        try:
+            logger.debug(f"[{self.nombre}] Ejecutando llamada async (prueba: {prueba is not None})")
+            if inspect.iscoroutinefunction(funcion):
+                resultado = await self._esperar_con_timeout(funcion(*args, **kwargs))
+            else:
+                futuro = asyncio.wrap_future(self._enviar_al_ejecutor(funcion, args, kwargs))
+                # shield: al vencer el plazo se deja de esperar, no se cancela el thread
+                resultado = await self._esperar_con_timeout(asyncio.shield(futuro))
+
+            self._registrar_exito(self._duracion(inicio), prueba)
+            return resultado
+
+        except Exception as error:
+            self._registrar_fallo(self._duracion(inicio), prueba)
+            raise error
+
+    def _duracion(self, inicio):
+        duracion = time.monotonic() - inicio
+        if duracion >= self.umbral_lenta:
+            self.total_lentas.incrementar()
+        return duracion
+
+    def _timeout_vencido(self):
+        self.total_timeouts.incrementar()
+        logger.warning(f"[{self.nombre}] TIMEOUT - la llamada supero {self.timeout_llamada}s")
+        return LlamadaTimeoutError(
+            f"La llamada de '{self.nombre}' supero el timeout de {self.timeout_llamada}s"
+        )
+
+    def _enviar_al_ejecutor(self, funcion, args, kwargs):
+        """Envia la funcion al pool propio; falla enseguida si todos los threads estan ocupados"""
+        with self._lock:
+            if self._en_ejecutor >= self.hilos_llamada:
+                raise CircuitBreakerError(
+                    f"Circuit breaker '{self.nombre}': {self._en_ejecutor} llamadas en curso o colgadas"
+                )
+            if self._ejecutor is None:
+                self._ejecutor = ThreadPoolExecutor(
+                    max_workers=self.hilos_llamada, thread_name_prefix=f"cb-{self.nombre}-"
+                )
+            self._en_ejecutor += 1
+        futuro = self._ejecutor.submit(funcion, *args, **kwargs)
+        futuro.add_done_callback(self._liberar_hilo)
+        return futuro
+
+    def _liberar_hilo(self, futuro):
+        with self._lock:
+            self._en_ejecutor -= 1
+        if not futuro.cancelled():
+            # si nadie la espero (timeout), que su excepcion no quede sin leer
+            futuro.exception()
+
+    def _llamar_con_timeout(self, funcion, args, kwargs):
+        futuro = self._enviar_al_ejecutor(funcion, args, kwargs)
+        try:
+            return futuro.result(timeout=self.timeout_llamada)
+        except FuturesTimeoutError:
+            # si todavia no empezo no va a correr; si esta corriendo sigue en su thread
+            futuro.cancel()
+            raise self._timeout_vencido()
+
+    async def _esperar_con_timeout(self, esperable):
+        if not self.timeout_llamada:
+            return await esperable
+        try:
+            if _timeout_async is not None:
+                async with _timeout_async(self.timeout_llamada):
+                    return await esperable
+            return await asyncio.wait_for(esperable, self.timeout_llamada)
+        except asyncio.TimeoutError:
+            raise self._timeout_vencido()
     
-    def _verificar_estado(self):
-        """Verifica y actualiza el estado del circuito si es necesario"""
-        
-        if self.estado == EstadoCircuito.ABIERTO:
-            # Verificar si ya paso el tiempo de timeout
-            tiempo_transcurrido = time.time() - self.tiempo_ultimo_fallo
-            
-            if tiempo_transcurrido >= self.timeout_abierto:
+    def _admitir(self):
+        """
+        Actualiza el estado si corresponde y decide si la llamada pasa.
+
+        Returns:
+            None para una llamada normal, o la generacion si es una prueba en semi-abierto
+
+        Raises:
+            CircuitBreakerError: Si el circuito esta abierto o no hay lugar para otra prueba
+        """
+        if self.estado == EstadoCircuito.CERRADO:
+            return None
+
+        with self._lock:
+            ahora = time.monotonic()
+            # Verificar si ya paso el tiempo abierto (otro thread pudo haber
+            # hecho la transicion mientras esperabamos el lock)
+            if self.estado == EstadoCircuito.ABIERTO and ahora - self._abierto_desde >= self.timeout_abierto_actual:
                 print(f"[{self.nombre}] Cambiando a SEMI_ABIERTO para probar recuperacion")
                 self.estado = EstadoCircuito.SEMI_ABIERTO
                 self.contador_exitos = 0
+                self._pruebas_en_curso = 0
+                self._ultimo_avance = ahora
+                self._generacion += 1
+
+            if (self.estado == EstadoCircuito.SEMI_ABIERTO and self._pruebas_en_curso > 0
+                    and ahora - self._ultimo_avance >= self.timeout_semi_abierto):
+                self._abrir(f"las pruebas no terminaron en {self.timeout_semi_abierto}s")
+
+            if self.estado == EstadoCircuito.CERRADO:
+                return None
+            if self.estado == EstadoCircuito.SEMI_ABIERTO and self._pruebas_en_curso < self.max_pruebas:
+                self._pruebas_en_curso += 1
+                return self._generacion
+            estado = self.estado
+
+        # si el circuito esta abierto (o ya hay pruebas en curso) => rechazar inmediatamente
+        self.total_fallos.incrementar()
+        self.total_rechazadas.incrementar()
+        logger.debug(f"[{self.nombre}] RECHAZADO - Circuito {estado.value}")
+        raise CircuitBreakerError(
+            f"Circuit breaker '{self.nombre}' esta {estado.value}. "
+            f"Servicio temporalmente no disponible."
+        )
+
+    def _abrir(self, motivo):
+        """Pasa a ABIERTO; si venia de semi-abierto el tiempo abierto crece (se llama con el lock tomado)"""
+        if self.estado == EstadoCircuito.SEMI_ABIERTO:
+            self.aperturas_seguidas += 1
+        else:
+            self.aperturas_seguidas = 1
+        self.timeout_abierto_actual = min(
+            self.timeout_abierto * self.factor_backoff ** (self.aperturas_seguidas - 1),
+            self.timeout_abierto_max,
+        )
+        print(f"[{self.nombre}] ABRIENDO CIRCUITO - {motivo} (por {self.timeout_abierto_actual}s)")
+        self.estado = EstadoCircuito.ABIERTO
+        self._abierto_desde = time.monotonic()
+        self.contador_exitos = 0
+        self._pruebas_en_curso = 0
+        self._generacion += 1
+
+    def _cerrar(self):
+        """Se llama con el lock tomado"""
+        print(f"[{self.nombre}] Servicio recuperado - Cambiando a CERRADO")
+        self.estado = EstadoCircuito.CERRADO
+        self.contador_fallos = 0
+        self.aperturas_seguidas = 0
+        self.timeout_abierto_actual = self.timeout_abierto
+
+    def _resultado_prueba(self, prueba, exito):
+        """
+        Anota el resultado de una prueba de semi-abierto (se llama con el lock
+        tomado). Retorna False si la llamada no era una prueba vigente.
+        """
+        if prueba is None or prueba != self._generacion or self.estado != EstadoCircuito.SEMI_ABIERTO:
+            return False
+        self._pruebas_en_curso -= 1
+        self._ultimo_avance = time.monotonic()
+        if not exito:
+            self._abrir("Fallo una llamada de prueba")
+            return True
+        self.contador_exitos += 1
+        if self.contador_exitos >= self.exitos_para_cerrar:
+            self._cerrar()
+        return True
     
-    def _registrar_exito(self):
+    def _registrar_exito(self, duracion=0.0, prueba=None):
         """Registra una llamada exitosa"""
-        self.contador_exitos += 1
-        self.contador_fallos = 0  # resetear contador de fallos
-        self.total_exitos += 1
-        
-        print(f"[{self.nombre}] EXITO (exitos consecutivos: {self.contador_exitos})")
-        
-        # si estabamos en semi-abierto y tuvimos exito, cerrar el circuito
-        if self.estado == EstadoCircuito.SEMI_ABIERTO:
-            if self.contador_exitos >= 2:  # necesitamos al menos 2 exitos
-                print(f"[{self.nombre}] Servicio recuperado - Cambiando a CERRADO")
-                self.estado = EstadoCircuito.CERRADO
-                self.contador_fallos = 0
+        self.total_exitos.incrementar()
+
+        # camino rapido: cerrado y sin fallos pendientes, no hay nada que cambiar
+        if prueba is None and self.estado == EstadoCircuito.CERRADO and self.contador_fallos == 0:
+            return
+
+        with self._lock:
+            if self._resultado_prueba(prueba, True):
+                return
+            if self.estado == EstadoCircuito.CERRADO:
+                self.contador_fallos = 0  # resetear contador de fallos
     
-    def _registrar_fallo(self):
+    def _registrar_fallo(self, duracion=0.0, prueba=None):
         """Registra una llamada fallida"""
-        self.contador_fallos += 1
-        self.contador_exitos = 0  # resetear contador de exitos
-        self.total_fallos += 1
-        self.tiempo_ultimo_fallo = time.time()
-        
-        print(f"[{self.nombre}] FALLO (fallos consecutivos: {self.contador_fallos}/{self.max_fallos})")
-        
-        # si alcanzamos el maximo de fallos, abrir el circuito
-        if self.contador_fallos >= self.max_fallos:
-            print(f"[{self.nombre}] ABRIENDO CIRCUITO - Demasiados fallos")
-            self.estado = EstadoCircuito.ABIERTO
+        self.total_fallos.incrementar()
+
+        with self._lock:
+            self.tiempo_ultimo_fallo = time.time()
+            if self._resultado_prueba(prueba, False):
+                return
+            # las llamadas que empezaron antes de abrir no cuentan
+            if self.estado != EstadoCircuito.CERRADO:
+                return
+            self.contador_fallos += 1
+            print(f"[{self.nombre}] FALLO (fallos consecutivos: {self.contador_fallos}/{self.max_fallos})")
+
+            # si alcanzamos el maximo de fallos, abrir el circuito
+            if self.contador_fallos >= self.max_fallos:
+                self._abrir("Demasiados fallos")
     
+    def reconfigurar(self, max_fallos=None, timeout_abierto=None, timeout_semi_abierto=None,
+                     max_pruebas=None, exitos_para_cerrar=None, factor_backoff=None, timeout_abierto_max=None,
+                     timeout_llamada=None, umbral_lenta=None):
+        """
+        Cambia los umbrales en caliente. No cambia el estado: si el circuito
+        esta abierto sigue abierto (el timeout nuevo cuenta desde la proxima
+        apertura) y un max_fallos menor que los fallos consecutivos actuales
+        recien abre con el proximo fallo.
+        """
+        with self._lock:
+            if max_fallos is not None:
+                self.max_fallos = max_fallos
+            if timeout_abierto is not None:
+                self.timeout_abierto = timeout_abierto
+            if timeout_semi_abierto is not None:
+                self.timeout_semi_abierto = timeout_semi_abierto
+            if max_pruebas is not None:
+                self.max_pruebas = max_pruebas
+            if exitos_para_cerrar is not None:
+                self.exitos_para_cerrar = exitos_para_cerrar
+            if factor_backoff is not None:
+                self.factor_backoff = factor_backoff
+            if timeout_abierto_max is not None:
+                self.timeout_abierto_max = timeout_abierto_max
+            if timeout_llamada is not None:
+                # 0 = sin limite
+                self.timeout_llamada = timeout_llamada or None
+            if umbral_lenta is not None:
+                self.umbral_lenta = umbral_lenta
+        print(
+            f"[{self.nombre}] Reconfigurado: max fallos {self.max_fallos}, "
+            f"timeout abierto {self.timeout_abierto}s, {self.max_pruebas} prueba(s) en semi-abierto"
+        )
+
     def obtener_estadisticas(self):
         """Retorna estadisticas del circuit breaker"""
+        total_llamadas = self.total_llamadas.valor
+        total_exitos = self.total_exitos.valor
         tasa_exito = 0
-        if self.total_llamadas > 0:
-            tasa_exito = (self.total_exitos / self.total_llamadas) * 100
+        if total_llamadas > 0:
+            tasa_exito = (total_exitos / total_llamadas) * 100
         
         return {
             "nombre": self.nombre,
+            "modo": self.modo,
             "estado": self.estado.value,
-            "total_llamadas": self.total_llamadas,
-            "total_exitos": self.total_exitos,
-            "total_fallos": self.total_fallos,
+            "total_llamadas": total_llamadas,
+            "total_llamadas_async": self.total_llamadas_async.valor,
+            "total_exitos": total_exitos,
+            "total_fallos": self.total_fallos.valor,
+            "total_rechazadas": self.total_rechazadas.valor,
             "tasa_exito": round(tasa_exito, 2),
             "fallos_consecutivos": self.contador_fallos,
-            "max_fallos_permitidos": self.max_fallos
+            "max_fallos_permitidos": self.max_fallos,
+            "pruebas_en_curso": self._pruebas_en_curso,
+            "max_pruebas": self.max_pruebas,
+            "aperturas_seguidas": self.aperturas_seguidas,
+            "timeout_abierto_actual": self.timeout_abierto_actual,
+            "timeout_llamada": self.timeout_llamada,
+            "umbral_lenta": self.umbral_lenta,
+            "total_lentas": self.total_lentas.valor,
+            "total_timeouts": self.total_timeouts.valor,
+            "llamadas_en_hilos": self._en_ejecutor,
         }
     
     def resetear(self):
         """Resetea el circuit breaker manualmente"""
         print(f"[{self.nombre}] Reseteando circuit breaker manualmente")
-        self.estado = EstadoCircuito.CERRADO
-        self.contador_fallos = 0
-        self.contador_exitos = 0
-        self.tiempo_ultimo_fallo = None
+        with self._lock:
+            self.estado = EstadoCircuito.CERRADO
+            self.contador_fallos = 0
+            self.contador_exitos = 0
+            self.tiempo_ultimo_fallo = None
+            self.aperturas_seguidas = 0
+            self.timeout_abierto_actual = self.timeout_abierto
+            self._pruebas_en_curso = 0
+            self._generacion += 1
+
+
+class VentanaConteo:
+    """
+    Resultados de las ultimas `tamano` llamadas en un buffer circular. Las
+    sumas se mantienen al escribir: registrar y leer son O(1).
+    No es thread-safe (el circuit breaker la usa con su lock tomado).
+    """
+
+    def __init__(self, tamano):
+        self.tamano = tamano
+        self._fallos = [False] * tamano
+        self._lentas = [False] * tamano
+        self._pos = 0
+        self.llamadas = 0
+        self.fallos = 0
+        self.lentas = 0
+
+    def registrar(self, fallo, lenta):
+        if self.llamadas == self.tamano:
+            # se pisa la llamada mas vieja: sale de las sumas
+            self.fallos -= self._fallos[self._pos]
+            self.lentas -= self._lentas[self._pos]
+        else:
+            self.llamadas += 1
+        self._fallos[self._pos] = fallo
+        self._lentas[self._pos] = lenta
+        self.fallos += fallo
+        self.lentas += lenta
+        self._pos = (self._pos + 1) % self.tamano
+
+    def totales(self):
+        return self.llamadas, self.fallos, self.lentas
+
+    def reiniciar(self):
+        self.__init__(self.tamano)
+
+
+class VentanaTiempo:
+    """
+    Resultados de los ultimos `segundos` segundos, en un bucket por segundo
+    (buffer circular). Cada bucket vencido se descuenta de las sumas una sola
+    vez, asi que registrar y leer son O(1) amortizado.
+    No es thread-safe (el circuit breaker la usa con su lock tomado).
+    """
+
+    def __init__(self, segundos):
+        self.tamano = segundos
+        # por bucket: [segundo, llamadas, fallos, lentas]
+        self._buckets = [[0, 0, 0, 0] for _ in range(segundos)]
+        self._ultimo = None  # ultimo segundo hasta el que se vencieron buckets
+        self.llamadas = 0
+        self.fallos = 0
+        self.lentas = 0
+
+    def _avanzar(self, ahora):
+        if self._ultimo is None:
+            self._ultimo = ahora
+            return
+        # vencer los buckets de los segundos que pasaron (como mucho todos)
+        for segundo in range(max(self._ultimo + 1, ahora - self.tamano + 1), ahora + 1):
+            bucket = self._buckets[segundo % self.tamano]
+            self.llamadas -= bucket[1]
+            self.fallos -= bucket[2]
+            self.lentas -= bucket[3]
+            bucket[:] = [segundo, 0, 0, 0]
+        self._ultimo = max(self._ultimo, ahora)
+
+    def registrar(self, fallo, lenta):
+        ahora = int(time.monotonic())
+        self._avanzar(ahora)
+        bucket = self._buckets[ahora % self.tamano]
+        bucket[0] = ahora
+        bucket[1] += 1
+        bucket[2] += fallo
+        bucket[3] += lenta
+        self.llamadas += 1
+        self.fallos += fallo
+        self.lentas += lenta
+
+    def totales(self):
+        self._avanzar(int(time.monotonic()))
+        return self.llamadas, self.fallos, self.lentas
+
+    def reiniciar(self):
+        self.__init__(self.tamano)
+
+
+def crear_ventana(tipo, tamano):
+    if tipo == VENTANA_CONTEO:
+        return VentanaConteo(tamano)
+    if tipo == VENTANA_TIEMPO:
+        return VentanaTiempo(tamano)
+    raise ValueError(f"Tipo de ventana invalido: {tipo}")
+
+
+class CircuitBreakerVentana(CircuitBreaker):
+    """
+    Circuit breaker por tasas sobre una ventana deslizante.
+
+    En CERRADO cada llamada se anota en la ventana; si hay al menos
+    `minimo_llamadas` y el % de fallos llega a `tasa_fallos` (o el % de
+    llamadas mas lentas que `umbral_lenta` llega a `tasa_lentas`), se abre.
+    SEMI_ABIERTO funciona igual que en el modo por consecutivos (pruebas
+    acotadas, backoff); ademas una prueba lenta cuenta como fallida si se
+    vigilan las llamadas lentas (tasa_lentas < 100).
+    """
+
+    modo = MODO_VENTANA
+
+    def __init__(self, nombre, timeout_abierto=60, timeout_semi_abierto=30,
+                 tasa_fallos=50.0, tasa_lentas=100.0, umbral_lenta=5.0, minimo_llamadas=20,
+                 tipo_ventana=VENTANA_CONTEO, tamano_ventana=100, max_fallos=3, **opciones):
+        """
+        Args:
+            tasa_fallos: % de fallos en la ventana que abre el circuito
+            tasa_lentas: % de llamadas lentas que abre el circuito (100 = solo si todas lo son)
+            umbral_lenta: Segundos a partir de los cuales una llamada cuenta como lenta
+            minimo_llamadas: Llamadas en la ventana necesarias para evaluar las tasas
+            tipo_ventana: "conteo" (ultimas N llamadas) o "tiempo" (ultimos N segundos)
+            tamano_ventana: N llamadas o N segundos
+            max_fallos: No se usa para abrir; queda para las estadisticas
+            opciones: Las de semi-abierto de CircuitBreaker (max_pruebas, factor_backoff, ...)
+        """
+        super().__init__(
+            nombre, max_fallos, timeout_abierto, timeout_semi_abierto, umbral_lenta=umbral_lenta, **opciones
+        )
+        self.tasa_fallos = tasa_fallos
+        self.tasa_lentas = tasa_lentas
+        self.minimo_llamadas = minimo_llamadas
+        self.tipo_ventana = tipo_ventana
+        self.ventana = crear_ventana(tipo_ventana, tamano_ventana)
+
+        print(f"  - Ventana: {tamano_ventana} ({tipo_ventana}), minimo {minimo_llamadas} llamadas")
+        print(f"  - Abre con {tasa_fallos}% de fallos o {tasa_lentas}% de llamadas > {umbral_lenta}s")
+
+    def _registrar_exito(self, duracion=0.0, prueba=None):
+        self.total_exitos.incrementar()
+        self._registrar(False, duracion, prueba)
+
+    def _registrar_fallo(self, duracion=0.0, prueba=None):
+        self.total_fallos.incrementar()
+        self._registrar(True, duracion, prueba)
+
+    def _registrar(self, fallo, duracion, prueba):
+        lenta = duracion >= self.umbral_lenta
+        with self._lock:
+            if fallo:
+                self.tiempo_ultimo_fallo = time.time()
+
+            if self._resultado_prueba(prueba, not (fallo or (lenta and self.tasa_lentas < 100))):
+                return
+            if self.estado != EstadoCircuito.CERRADO:
+                return  # termino una llamada que empezo antes de abrir
+            self.ventana.registrar(fallo, lenta)
+            llamadas, fallos, lentas = self.ventana.totales()
+            if llamadas < self.minimo_llamadas:
+                return
+            if fallos * 100 >= self.tasa_fallos * llamadas:
+                self._abrir(f"{fallos}/{llamadas} fallos en la ventana")
+            elif lentas * 100 >= self.tasa_lentas * llamadas:
+                self._abrir(f"{lentas}/{llamadas} llamadas lentas en la ventana")
+
+    def _abrir(self, motivo):
+        """Se llama con el lock tomado"""
+        super()._abrir(motivo)
+        self.ventana.reiniciar()
+
+    def _cerrar(self):
+        """Se llama con el lock tomado"""
+        super()._cerrar()
+        self.ventana.reiniciar()
+
+    def reconfigurar(self, max_fallos=None, timeout_abierto=None, timeout_semi_abierto=None,
+                     tasa_fallos=None, tasa_lentas=None, umbral_lenta=None, minimo_llamadas=None,
+                     tipo_ventana=None, tamano_ventana=None, **opciones):
+        """Como CircuitBreaker.reconfigurar; cambiar el tipo o tamano de la ventana la reinicia"""
+        super().reconfigurar(
+            max_fallos, timeout_abierto, timeout_semi_abierto, umbral_lenta=umbral_lenta, **opciones
+        )
+        with self._lock:
+            if tasa_fallos is not None:
+                self.tasa_fallos = tasa_fallos
+            if tasa_lentas is not None:
+                self.tasa_lentas = tasa_lentas
+            if minimo_llamadas is not None:
+                self.minimo_llamadas = minimo_llamadas
+            tipo = tipo_ventana or self.tipo_ventana
+            tamano = tamano_ventana or self.ventana.tamano
+            if tipo != self.tipo_ventana or tamano != self.ventana.tamano:
+                self.tipo_ventana = tipo
+                self.ventana = crear_ventana(tipo, tamano)
+
+    def obtener_estadisticas(self):
+        estadisticas = super().obtener_estadisticas()
+        with self._lock:
+            llamadas, fallos, lentas = self.ventana.totales()
+        estadisticas.update({
+            "ventana": {
+                "tipo": self.tipo_ventana,
+                "tamano": self.ventana.tamano,
+                "llamadas": llamadas,
+                "fallos": fallos,
+                "lentas": lentas,
+                "tasa_fallos": round(fallos * 100 / llamadas, 2) if llamadas else 0,
+                "tasa_lentas": round(lentas * 100 / llamadas, 2) if llamadas else 0,
+                "umbral_tasa_fallos": self.tasa_fallos,
+                "umbral_tasa_lentas": self.tasa_lentas,
+                "minimo_llamadas": self.minimo_llamadas,
+            },
+        })
+        return estadisticas
+
+    def resetear(self):
+        super().resetear()
+        with self._lock:
+            self.ventana.reiniciar()
 
 
 class GestorCircuitBreakers:
@@ -181,10 +693,25 @@ class GestorCircuitBreakers:
             cls._instancia.circuit_breakers = {}
         return cls._instancia
     
-    def crear_circuit_breaker(self, nombre, max_fallos=3, timeout_abierto=60, timeout_semi_abierto=30):
-        """Crea y registra un nuevo circuit breaker"""
+    def crear_circuit_breaker(self, nombre, max_fallos=3, timeout_abierto=60, timeout_semi_abierto=30,
+                              modo=MODO_CONSECUTIVOS, **opciones):
+        """
+        Crea y registra un nuevo circuit breaker.
+
+        modo "consecutivos" (por defecto) o "ventana". `opciones` son las de
+        semi-abierto (max_pruebas, exitos_para_cerrar, factor_backoff,
+        timeout_abierto_max) y, en modo ventana, las de CircuitBreakerVentana
+        (tasa_fallos, tasa_lentas, umbral_lenta, minimo_llamadas, tipo_ventana, tamano_ventana).
+        """
         if nombre not in self.circuit_breakers:
-            cb = CircuitBreaker(nombre, max_fallos, timeout_abierto, timeout_semi_abierto)
+            if modo == MODO_VENTANA:
+                cb = CircuitBreakerVentana(
+                    nombre, timeout_abierto, timeout_semi_abierto, max_fallos=max_fallos, **opciones
+                )
+            elif modo == MODO_CONSECUTIVOS:
+                cb = CircuitBreaker(nombre, max_fallos, timeout_abierto, timeout_semi_abierto, **opciones)
+            else:
+                raise ValueError(f"Modo de circuit breaker invalido: {modo}")
             self.circuit_breakers[nombre] = cb
             print(f"[Gestor] Circuit breaker '{nombre}' registrado")
         return self.circuit_breakers[nombre]
@@ -195,6 +722,10 @@ class GestorCircuitBreakers:
             raise ValueError(f"Circuit breaker '{nombre}' no existe")
         return self.circuit_breakers[nombre]
     
+    def reconfigurar_circuit_breaker(self, nombre, **cambios):
+        """Aplica cambios de umbrales en caliente a un circuit breaker existente"""
+        self.obtener_circuit_breaker(nombre).reconfigurar(**cambios)
+
     def obtener_todas_estadisticas(self):
         """Retorna estadisticas de todos los circuit breakers"""
         return {
@@ -207,3 +738,30 @@ class GestorCircuitBreakers:
         print("[Gestor] Reseteando todos los circuit breakers")
         for cb in self.circuit_breakers.values():
             cb.resetear()
+
+
+def circuit_breaker_protegido(nombre):
+    """
+    Decorador para proteger funciones con un circuit breaker registrado.
+
+    Uso:
+        @circuit_breaker_protegido("servicio_pagos")
+        async def cobrar(cliente_id, monto):
+            # ... código ...
+
+    Las corrutinas pasan por llamar_async y las funciones sync por llamar.
+    """
+    def decorador(funcion):
+        if inspect.iscoroutinefunction(funcion):
+            @wraps(funcion)
+            async def envoltura_async(*args, **kwargs):
+                cb = GestorCircuitBreakers().obtener_circuit_breaker(nombre)
+                return await cb.llamar_async(funcion, *args, **kwargs)
+            return envoltura_async
+
+        @wraps(funcion)
+        def envoltura(*args, **kwargs):
+            cb = GestorCircuitBreakers().obtener_circuit_breaker(nombre)
+            return cb.llamar(funcion, *args, **kwargs)
+        return envoltura
+    return decorador
@@ -0,0 +1,162 @@
+"""
+Límites de concurrencia adaptativos para los bulkheads
+
+Un límite fijo (max_workers) queda corto con carga normal y sobra cuando la
+base de datos se pone lenta: las llamadas de más solo hacen cola adentro de
+Postgres. LimiteAdaptativo ajusta el límite según la latencia que observa en
+cada llamada que termina, siempre entre `minimo` y `maximo`:
+
+- "aimd": sube de a poco (+1 por cada "ventana" de llamadas exitosas con el
+  límite en uso) y baja multiplicando por `factor_baja` ante un error o una
+  llamada más lenta que `latencia_objetivo`.
+- "gradiente": compara la latencia reciente con la mínima observada (estilo
+  Vegas: la mínima es la latencia sin cola). Si la reciente se aleja más de
+  `tolerancia` veces, hay cola en la dependencia y el límite baja en
+  proporción; si no, crece ~sqrt(límite) por ajuste. La mínima se toma sobre
+  las últimas ~2 ventanas de muestras, así sigue a la dependencia si cambia.
+
+No es thread-safe: el bulkhead lo llama con su lock tomado (o desde el event
+loop, en el async).
+"""
+
+import math
+
+ALGORITMO_FIJO = "fijo"
+ALGORITMO_AIMD = "aimd"
+ALGORITMO_GRADIENTE = "gradiente"
+
+
+class LimiteAdaptativo:
+    """Límite de concurrencia que se recalcula con la duración de cada llamada"""
+
+    def __init__(self, inicial: int, minimo: int = 1, maximo: int = None,
+                 algoritmo: str = ALGORITMO_AIMD, latencia_objetivo: float = 0.5,
+                 factor_baja: float = 0.9, suavizado: float = 0.2, tolerancia: float = 2.0,
+                 ventana: int = 500):
+        """
+        Args:
+            inicial: Límite con el que arranca
+            minimo: Piso del límite
+            maximo: Techo del límite (por defecto 4 veces el inicial)
+            algoritmo: "aimd" o "gradiente"
+            latencia_objetivo: (aimd) segundos por encima de los cuales una llamada cuenta como lenta
+            factor_baja: Factor por el que se multiplica el límite al bajar
+            suavizado: (gradiente) peso de cada ajuste nuevo sobre el límite
+            tolerancia: (gradiente) cuánto puede crecer la latencia reciente sobre la mínima sin bajar
+            ventana: (gradiente) muestras por ventana de la latencia mínima
+        """
+        if algoritmo not in (ALGORITMO_AIMD, ALGORITMO_GRADIENTE):
+            raise ValueError(f"Algoritmo de límite inválido: {algoritmo}")
+        if maximo is None:
+            maximo = max(inicial, 1) * 4
+        if not 1 <= minimo <= maximo:
+            raise ValueError(f"Límites inválidos: minimo={minimo}, maximo={maximo}")
+        self.algoritmo = algoritmo
+        self.minimo = minimo
+        self.maximo = maximo
+        self.latencia_objetivo = latencia_objetivo
+        self.factor_baja = factor_baja
+        self.suavizado = suavizado
+        self.tolerancia = tolerancia
+        self.ventana = ventana
+
+        self._limite = float(min(max(inicial, minimo), maximo))
+        # latencias en segundos: reciente (media móvil exponencial) y mínima
+        # (de la ventana actual y la anterior)
+        self._rtt_corto = None
+        self._rtt_min = None
+        self._min_ventana = None
+        self._min_anterior = None
+        self._muestras = 0
+        self.subidas = 0
+        self.bajadas = 0
+
+    @property
+    def valor(self) -> int:
+        return int(self._limite)
+
+    def registrar(self, duracion: float, en_vuelo: int, fallo: bool = False) -> int:
+        """
+        Registra una llamada terminada y retorna el límite nuevo.
+
+        Args:
+            duracion: Segundos que tardó la llamada
+            en_vuelo: Llamadas en ejecución cuando terminó (incluida ella)
+            fallo: Si la llamada terminó con error o timeout
+        """
+        anterior = self.valor
+        if self.algoritmo == ALGORITMO_AIMD:
+            self._aimd(duracion, en_vuelo, fallo)
+        else:
+            self._gradiente(duracion, en_vuelo, fallo)
+        self._limite = min(max(self._limite, self.minimo), self.maximo)
+
+        nuevo = self.valor
+        if nuevo > anterior:
+            self.subidas += 1
+        elif nuevo < anterior:
+            self.bajadas += 1
+        return nuevo
+
+    def ajustar_rango(self, minimo: int = None, maximo: int = None):
+        """Cambia el piso y/o el techo; el límite actual se acomoda dentro del rango nuevo"""
+        minimo = self.minimo if minimo is None else minimo
+        maximo = self.maximo if maximo is None else maximo
+        if not 1 <= minimo <= maximo:
+            raise ValueError(f"Límites inválidos: minimo={minimo}, maximo={maximo}")
+        self.minimo = minimo
+        self.maximo = maximo
+        self._limite = min(max(self._limite, minimo), maximo)
+
+    def _aimd(self, duracion, en_vuelo, fallo):
+        self._registrar_rtt(duracion)  # solo para las estadísticas
+        if fallo or duracion > self.latencia_objetivo:
+            self._limite *= self.factor_baja
+        elif en_vuelo * 2 >= self._limite:
+            # solo crece si el límite se está usando; +1 cada ~límite llamadas
+            self._limite += 1 / self._limite
+
+    def _gradiente(self, duracion, en_vuelo, fallo):
+        if fallo:
+            self._limite *= self.factor_baja
+            return
+        self._registrar_rtt(duracion)
+        if en_vuelo * 2 < self._limite:
+            # con la mitad del límite sin usar no hay información para crecer
+            return
+        gradiente = max(0.5, min(1.0, self.tolerancia * self._rtt_min / max(self._rtt_corto, 1e-6)))
+        nuevo = self._limite * gradiente + math.sqrt(self._limite)
+        self._limite = (1 - self.suavizado) * self._limite + self.suavizado * nuevo
+
+    def _registrar_rtt(self, duracion):
+        if self._rtt_corto is None:
+            self._rtt_corto = duracion
+        else:
+            self._rtt_corto = 0.8 * self._rtt_corto + 0.2 * duracion
+        if self._min_ventana is None or duracion < self._min_ventana:
+            self._min_ventana = duracion
+        self._muestras += 1
+        if self._muestras >= self.ventana:
+            self._min_anterior, self._min_ventana, self._muestras = self._min_ventana, None, 0
+        candidatos = [m for m in (self._min_ventana, self._min_anterior) if m is not None]
+        self._rtt_min = min(candidatos)
+
+    def to_dict(self) -> dict:
+        return {
+            "algorithm": self.algoritmo,
+            "limit": self.valor,
+            "min_limit": self.minimo,
+            "max_limit": self.maximo,
+            "increases": self.subidas,
+            "decreases": self.bajadas,
+            "rtt_short_ms": round(self._rtt_corto * 1000, 2) if self._rtt_corto is not None else None,
+            "rtt_min_ms": round(self._rtt_min * 1000, 2) if self._rtt_min is not None else None,
+        }
+
+
+def crear_limite(algoritmo: str, inicial: int, minimo: int = 1, maximo: int = None,
+                 latencia_objetivo: float = 0.5):
+    """LimiteAdaptativo para el algoritmo pedido, o None si es "fijo" (se usa max_workers)"""
+    if not algoritmo or algoritmo == ALGORITMO_FIJO:
+        return None
+    return LimiteAdaptativo(inicial, minimo, maximo, algoritmo, latencia_objetivo)
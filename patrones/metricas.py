@@ -0,0 +1,76 @@
+"""
+Metricas thread-safe para las estadisticas de los patrones
+
+Los contadores compartidos con `+=` pierden incrementos cuando muchos threads
+los actualizan a la vez (leer, sumar y guardar no es atomico). Un lock global
+lo arregla, pero todos los threads pasan a competir por el en cada llamada.
+
+ContadorStriped le da a cada thread su propia celda: solo ese thread la
+escribe, asi que no hay incrementos perdidos ni contencion, y la lectura suma
+todas las celdas. Leer es mas caro que escribir, que es lo que conviene para
+estadisticas (se escriben en cada llamada y se leen de vez en cuando).
+"""
+
+import bisect
+import threading
+
+
+class ContadorStriped:
+    """Contador con una celda por thread; el valor es la suma de las celdas"""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()  # solo para registrar celdas nuevas
+        self._celdas = []  # [(thread, celda)]
+        self._base = 0  # lo acumulado por threads que ya terminaron
+
+    def _celda(self):
+        try:
+            return self._local.celda
+        except AttributeError:
+            celda = [0]
+            with self._lock:
+                self._compactar()
+                self._celdas.append((threading.current_thread(), celda))
+            self._local.celda = celda
+            return celda
+
+    def _compactar(self):
+        """Suma a la base las celdas de threads terminados (se llama con el lock tomado)"""
+        vivas = []
+        for thread, celda in self._celdas:
+            if thread.is_alive():
+                vivas.append((thread, celda))
+            else:
+                self._base += celda[0]
+        self._celdas = vivas
+
+    def incrementar(self, n=1):
+        self._celda()[0] += n
+
+    def decrementar(self, n=1):
+        self._celda()[0] -= n
+
+    @property
+    def valor(self):
+        with self._lock:
+            return self._base + sum(celda[0] for _, celda in self._celdas)
+
+    def __int__(self):
+        return self.valor
+
+
+class Histograma:
+    """Histograma de buckets fijos: cuenta cuántos valores caen en cada límite superior"""
+
+    def __init__(self, limites):
+        self.limites = list(limites)
+        # el último bucket es "+inf"
+        self.cuentas = [ContadorStriped() for _ in range(len(self.limites) + 1)]
+
+    def registrar(self, valor):
+        self.cuentas[bisect.bisect_left(self.limites, valor)].incrementar()
+
+    def to_dict(self) -> dict:
+        etiquetas = [f"<={limite}" for limite in self.limites] + [f">{self.limites[-1]}"]
+        return dict(zip(etiquetas, (cuenta.valor for cuenta in self.cuentas)))
@@ -0,0 +1,146 @@
+"""
+Relay del outbox de ordenes
+
+Las ordenes guardan su evento en la tabla order_outbox dentro de la misma
+transacción, así que el evento existe si y solo si la orden existe. Este relay
+corre en un thread de fondo, toma los eventos pendientes en lotes, los publica
+en RabbitMQ esperando las confirmaciones y recién entonces los borra. Si
+RabbitMQ no está disponible, los eventos quedan en la tabla y se reintentan.
+
+Antes de publicar, el relay versiona el stock de esas ordenes en el catálogo
+(persistencia/versiones.versionar_stock), en una transacción propia: una vez
+por lote en vez de una por orden, y aunque RabbitMQ esté caído.
+"""
+
+import threading
+import logging
+
+from infraestructura.config_store import cfg
+from persistencia.db import get_conn
+from persistencia.outbox_repo import OutboxRepo
+from persistencia.versiones import versionar_stock
+from persistencia.invalidacion import notificar
+from patrones.queue import publish_orders
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_BATCH = cfg.get("OUTBOX_BATCH", default=100, as_type=int)
+OUTBOX_POLL_INTERVAL = cfg.get("OUTBOX_POLL_INTERVAL", default=0.5, as_type=float)
+OUTBOX_MAX_BACKOFF = cfg.get("OUTBOX_MAX_BACKOFF", default=30, as_type=float)
+
+
+class OutboxRelay:
+    """Publica en RabbitMQ los eventos pendientes del outbox"""
+
+    def __init__(self, batch_size: int = OUTBOX_BATCH, poll_interval: float = OUTBOX_POLL_INTERVAL):
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.repo = OutboxRepo()
+
+        self._thread = None
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+
+        self.publicados = 0
+        self.versionados = 0
+        self.lotes = 0
+        self.errores = 0
+        self.ultimo_error = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="outbox-relay", daemon=True)
+            self._thread.start()
+            logger.info("Relay de outbox iniciado")
+
+    def stop(self, timeout: float = 10.0):
+        """Detiene el relay después de terminar el lote en curso"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def despertar(self):
+        """Avisa que hay eventos nuevos para no esperar al próximo sondeo"""
+        self._wake.set()
+
+    def _run(self):
+        backoff = self.poll_interval
+        while not self._stop.is_set():
+            try:
+                publicados = self.publicar_pendientes()
+                backoff = self.poll_interval
+                if publicados == self.batch_size:
+                    continue  # probablemente quedan más: seguir sin esperar
+            except Exception as e:
+                self.errores += 1
+                self.ultimo_error = str(e)
+                logger.error(f"[outbox] error publicando eventos: {e}. Reintento en {backoff:.1f}s")
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, OUTBOX_MAX_BACKOFF)
+                continue
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def versionar_pendientes(self) -> int:
+        """Versiona el stock de un lote de ordenes nuevas; retorna cuántas"""
+        with get_conn() as conn, conn.cursor() as cur:
+            eventos = self.repo.claim_sin_versionar(cur, self.batch_size)
+            if not eventos:
+                return 0
+            producto_ids = versionar_stock(cur, [e["order_id"] for e in eventos])
+            if producto_ids:
+                # la versión cacheada del catálogo quedó vieja en todas las instancias
+                notificar(cur, "productos", producto_ids)
+            self.repo.marcar_versionados(cur, [e["id"] for e in eventos])
+            conn.commit()
+        self.versionados += len(eventos)
+        return len(eventos)
+
+    def publicar_pendientes(self) -> int:
+        """Publica un lote de eventos; retorna cuántos se publicaron"""
+        self.versionar_pendientes()
+        with get_conn() as conn, conn.cursor() as cur:
+            eventos = self.repo.claim_batch(cur, self.batch_size)
+            if not eventos:
+                return 0
+            # las filas quedan bloqueadas mientras se espera la confirmación;
+            # si la publicación falla, el rollback las deja pendientes otra vez
+            publish_orders([(e["order_id"], e["payload"]) for e in eventos])
+            self.repo.delete(cur, [e["id"] for e in eventos])
+            conn.commit()
+        self.publicados += len(eventos)
+        self.lotes += 1
+        return len(eventos)
+
+    def get_stats(self) -> dict:
+        """Retorna estadísticas del relay"""
+        try:
+            with get_conn() as conn, conn.cursor() as cur:
+                pendientes = self.repo.count_pending(cur)
+        except Exception:
+            pendientes = None
+        return {
+            "activo": self._thread is not None and self._thread.is_alive(),
+            "publicados": self.publicados,
+            "stock_versionado": self.versionados,
+            "lotes": self.lotes,
+            "errores": self.errores,
+            "ultimo_error": self.ultimo_error,
+            "pendientes": pendientes,
+        }
+
+
+_relay = None
+_relay_lock = threading.Lock()
+
+
+def get_relay() -> OutboxRelay:
+    """Relay compartido por todo el proceso"""
+    global _relay
+    if _relay is None:
+        with _relay_lock:
+            if _relay is None:
+                _relay = OutboxRelay()
+    return _relay
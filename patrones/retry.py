@@ -0,0 +1,263 @@
+"""
+Patron Retry - Reintentos con backoff exponencial, jitter y presupuesto
+
+Un fallo transitorio aislado (el proveedor de pagos tuvo un error puntual) no
+deberia llegar al cliente como 503: reintentar en el servidor lo absorbe. Pero
+reintentar sin control amplifica una caida: si cada request hace 3 intentos,
+el servicio que ya esta mal recibe el triple de carga.
+
+PoliticaReintentos combina tres cosas:
+- Backoff exponencial con "full jitter": antes del reintento n (desde 0) se
+  espera un tiempo al azar entre 0 y min(espera_max, espera_base * 2^n), asi
+  los reintentos de muchos requests no llegan todos juntos.
+- Presupuesto por dependencia (PresupuestoReintentos): los reintentos no
+  pueden superar un porcentaje del trafico (mas un minimo por segundo para
+  cuando hay poco trafico). Con la dependencia caida se agota enseguida y los
+  fallos vuelven a salir de inmediato en vez de multiplicarse.
+- Solo se reintentan los errores indicados: CircuitBreakerError (el circuito
+  ya decidio no llamar) o un timeout de una operacion no idempotente no se
+  reintentan.
+
+Se compone por fuera del circuit breaker, cada intento pasa por el:
+    politica.ejecutar(cb.llamar, funcion, *args)
+    await politica.ejecutar_async(cb.llamar_async, funcion, *args)
+"""
+
+import time
+import random
+import asyncio
+import logging
+import threading
+
+from patrones.metricas import ContadorStriped
+
+logger = logging.getLogger(__name__)
+
+
+class PresupuestoReintentos:
+    """
+    Cupo de reintentos como porcentaje del trafico (token bucket).
+
+    Cada llamada nueva suma `porcentaje`/100 al saldo y el tiempo suma
+    `minimo_por_segundo`; cada reintento gasta 1. El saldo no pasa de
+    `capacidad`, para que un periodo tranquilo no habilite una rafaga.
+    """
+
+    def __init__(self, porcentaje=10.0, minimo_por_segundo=1.0, capacidad=10.0):
+        self.porcentaje = porcentaje
+        self.minimo_por_segundo = minimo_por_segundo
+        self.capacidad = capacidad
+        self._saldo = capacidad
+        self._ultima_recarga = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _recargar(self):
+        # se llama con el lock tomado
+        ahora = time.monotonic()
+        self._saldo = min(
+            self.capacidad,
+            self._saldo + (ahora - self._ultima_recarga) * self.minimo_por_segundo
+        )
+        self._ultima_recarga = ahora
+
+    def registrar_llamada(self):
+        with self._lock:
+            self._recargar()
+            self._saldo = min(self.capacidad, self._saldo + self.porcentaje / 100.0)
+
+    def intentar_retirar(self):
+        """True si hay cupo para un reintento (y lo consume)"""
+        with self._lock:
+            self._recargar()
+            if self._saldo < 1:
+                return False
+            self._saldo -= 1
+            return True
+
+    @property
+    def saldo(self):
+        with self._lock:
+            self._recargar()
+            return self._saldo
+
+
+class PoliticaReintentos:
+    """Reintenta una funcion ante errores transitorios, dentro del presupuesto de su dependencia"""
+
+    def __init__(self, nombre, max_intentos=3, espera_base=0.1, espera_max=2.0,
+                 reintentables=(Exception,), no_reintentables=(),
+                 porcentaje_presupuesto=10.0, minimo_por_segundo=1.0):
+        """
+        Args:
+            nombre: Nombre de la dependencia protegida
+            max_intentos: Intentos totales, contando el primero (1 = sin reintentos)
+            espera_base: Segundos del primer backoff (antes del jitter)
+            espera_max: Tope del backoff en segundos
+            reintentables: Excepciones que se reintentan
+            no_reintentables: Excepciones que nunca se reintentan (tienen prioridad)
+            porcentaje_presupuesto: Reintentos permitidos como % de las llamadas
+            minimo_por_segundo: Reintentos por segundo permitidos aunque haya poco trafico
+        """
+        if max_intentos < 1:
+            raise ValueError(f"max_intentos invalido: {max_intentos}")
+        self.nombre = nombre
+        self.max_intentos = max_intentos
+        self.espera_base = espera_base
+        self.espera_max = espera_max
+        self.reintentables = tuple(reintentables)
+        self.no_reintentables = tuple(no_reintentables)
+        self.presupuesto = PresupuestoReintentos(porcentaje_presupuesto, minimo_por_segundo)
+
+        self.total_llamadas = ContadorStriped()
+        self.total_reintentos = ContadorStriped()
+        self.exitos_con_reintento = ContadorStriped()
+        self.sin_presupuesto = ContadorStriped()
+        self.intentos_agotados = ContadorStriped()
+
+        print(f"[Retry] '{nombre}' inicializado")
+        print(f"  - Max intentos: {max_intentos} (backoff {espera_base}s..{espera_max}s con jitter)")
+        print(f"  - Presupuesto: {porcentaje_presupuesto}% del trafico, minimo {minimo_por_segundo}/s")
+
+    def ejecutar(self, funcion, *args, **kwargs):
+        """
+        Ejecuta la funcion y la reintenta ante errores reintentables.
+
+        Raises:
+            Exception: El ultimo error si no se reintenta (no reintentable,
+                sin presupuesto o sin intentos)
+        """
+        self.total_llamadas.incrementar()
+        self.presupuesto.registrar_llamada()
+        intento = 1
+        while True:
+            try:
+                resultado = funcion(*args, **kwargs)
+            except Exception as error:
+                espera = self._siguiente_espera(error, intento)
+                if espera is None:
+                    raise
+                time.sleep(espera)
+                intento += 1
+                continue
+            if intento > 1:
+                self.exitos_con_reintento.incrementar()
+            return resultado
+
+    async def ejecutar_async(self, funcion, *args, **kwargs):
+        """Igual que ejecutar, con `funcion` async y el backoff con asyncio.sleep"""
+        self.total_llamadas.incrementar()
+        self.presupuesto.registrar_llamada()
+        intento = 1
+        while True:
+            try:
+                resultado = await funcion(*args, **kwargs)
+            except Exception as error:
+                espera = self._siguiente_espera(error, intento)
+                if espera is None:
+                    raise
+                await asyncio.sleep(espera)
+                intento += 1
+                continue
+            if intento > 1:
+                self.exitos_con_reintento.incrementar()
+            return resultado
+
+    def _siguiente_espera(self, error, intento):
+        """Segundos a esperar antes de reintentar, o None si el error se propaga"""
+        if isinstance(error, self.no_reintentables) or not isinstance(error, self.reintentables):
+            return None
+        if intento >= self.max_intentos:
+            self.intentos_agotados.incrementar()
+            return None
+        if not self.presupuesto.intentar_retirar():
+            self.sin_presupuesto.incrementar()
+            logger.debug(f"[{self.nombre}] Sin presupuesto de reintentos, se propaga: {error}")
+            return None
+        self.total_reintentos.incrementar()
+        # full jitter: uniforme entre 0 y el backoff exponencial
+        espera = random.uniform(0, min(self.espera_max, self.espera_base * 2 ** (intento - 1)))
+        logger.info(f"[{self.nombre}] Intento {intento} fallo ({error}); reintento en {espera:.3f}s")
+        return espera
+
+    def reconfigurar(self, max_intentos=None, espera_base=None, espera_max=None,
+                     porcentaje_presupuesto=None, minimo_por_segundo=None):
+        """Cambia los parametros en caliente; el saldo del presupuesto se conserva"""
+        if max_intentos is not None:
+            if max_intentos < 1:
+                raise ValueError(f"max_intentos invalido: {max_intentos}")
+            self.max_intentos = max_intentos
+        if espera_base is not None:
+            self.espera_base = espera_base
+        if espera_max is not None:
+            self.espera_max = espera_max
+        with self.presupuesto._lock:
+            if porcentaje_presupuesto is not None:
+                self.presupuesto.porcentaje = porcentaje_presupuesto
+            if minimo_por_segundo is not None:
+                self.presupuesto.minimo_por_segundo = minimo_por_segundo
+        print(
+            f"[{self.nombre}] Reconfigurado: {self.max_intentos} intentos, "
+            f"presupuesto {self.presupuesto.porcentaje}%"
+        )
+
+    def obtener_estadisticas(self):
+        """Retorna estadisticas de la politica de reintentos"""
+        total_llamadas = self.total_llamadas.valor
+        total_reintentos = self.total_reintentos.valor
+        tasa_reintentos = 0
+        if total_llamadas > 0:
+            tasa_reintentos = (total_reintentos / total_llamadas) * 100
+
+        return {
+            "nombre": self.nombre,
+            "max_intentos": self.max_intentos,
+            "espera_base": self.espera_base,
+            "espera_max": self.espera_max,
+            "total_llamadas": total_llamadas,
+            "total_reintentos": total_reintentos,
+            "tasa_reintentos": round(tasa_reintentos, 2),
+            "exitos_con_reintento": self.exitos_con_reintento.valor,
+            "sin_presupuesto": self.sin_presupuesto.valor,
+            "intentos_agotados": self.intentos_agotados.valor,
+            "presupuesto_porcentaje": self.presupuesto.porcentaje,
+            "presupuesto_saldo": round(self.presupuesto.saldo, 2),
+        }
+
+
+class GestorReintentos:
+    """
+    Gestor central de las politicas de reintentos (una por dependencia).
+    Patron Singleton para tener una unica instancia.
+    """
+
+    _instancia = None
+
+    def __new__(cls):
+        if cls._instancia is None:
+            cls._instancia = super().__new__(cls)
+            cls._instancia.politicas = {}
+        return cls._instancia
+
+    def crear_politica(self, nombre, **opciones):
+        """Crea y registra una politica de reintentos (opciones de PoliticaReintentos)"""
+        if nombre not in self.politicas:
+            self.politicas[nombre] = PoliticaReintentos(nombre, **opciones)
+            print(f"[Gestor] Politica de reintentos '{nombre}' registrada")
+        return self.politicas[nombre]
+
+    def obtener_politica(self, nombre):
+        """Obtiene una politica existente"""
+        if nombre not in self.politicas:
+            raise ValueError(f"Politica de reintentos '{nombre}' no existe")
+        return self.politicas[nombre]
+
+    def reconfigurar_politica(self, nombre, **cambios):
+        """Aplica cambios en caliente a una politica existente"""
+        self.obtener_politica(nombre).reconfigurar(**cambios)
+
+    def obtener_todas_estadisticas(self):
+        """Retorna estadisticas de todas las politicas"""
+        return {
+            nombre: politica.obtener_estadisticas()
+            for nombre, politica in self.politicas.items()
+        }
@@ -1,43 +1,133 @@
 """
-Ejemplo de worker que usa infraestructura/order_queue.publish_order/consume_orders.
+Worker de ordenes: consume la cola con patrones.queue.OrderConsumer.
+
+Procesa los mensajes en micro-lotes concurrentes. Cada lote se "reclama" con
+una sola sentencia (pending -> processing) y las tomadas se marcan como
+completadas con otra. De las que no se pudieron tomar:
+- completadas, fallidas o inexistentes: ack y se descartan (duplicados o
+  reentregas de ordenes ya procesadas);
+- en 'processing' (otro worker las tiene, o uno que se cayó): vuelven a la
+  cola después de WORKER_REQUEUE_DELAY segundos. Si el worker se cayó, la
+  toma vence a los ORDENES_CLAIM_TIMEOUT segundos y la reentrega la retoma.
+Los mensajes sin un order_id válido se rechazan; si la BD no está disponible,
+todo el lote vuelve a la cola.
 
 Ejecuta:
-    python worker/order_worker.py
+    python -m patrones.workerQueue
 """
-import time
-from queue import consume_orders
-from persistencia.order_repo import OrdenRepo
+import psycopg2
+
+from infraestructura.config_store import cfg
+from patrones.queue import OrderConsumer
+from persistencia.db import PoolTimeoutError
+from persistencia.order_repo import (
+    OrdenRepo, STATUS_PROCESSING, STATUS_PENDING, STATUS_COMPLETED, STATUS_FAILED,
+)
+
+WORKER_PREFETCH = cfg.get("WORKER_PREFETCH", default=50, as_type=int)
+WORKER_CONCURRENCY = cfg.get("WORKER_CONCURRENCY", default=4, as_type=int)
+WORKER_BATCH_SIZE = cfg.get("WORKER_BATCH_SIZE", default=20, as_type=int)
+WORKER_BATCH_WAIT = cfg.get("WORKER_BATCH_WAIT", default=0.2, as_type=float)
+WORKER_REQUEUE_DELAY = cfg.get("WORKER_REQUEUE_DELAY", default=5, as_type=float)
+
+# estados en los que el mensaje ya no tiene nada que hacer
+ESTADOS_FINALES = (STATUS_COMPLETED, STATUS_FAILED)
 
 repo = OrdenRepo()
 
-def handle_order_message(msg: dict) -> bool:
-   
-    order_id = msg.get("order_id")
-    if not order_id:
-        print("[WARN] mensaje sin order_id")
-        return True  # ack y descartar
+# errores de conexión o del pool: pasajeros, el lote vuelve a la cola. Cualquier
+# otro error (datos inválidos) se repetiría igual en cada reintento
+ERRORES_TRANSITORIOS = (psycopg2.OperationalError, psycopg2.InterfaceError, PoolTimeoutError)
 
-    print(f"[WORKER] procesando orden {order_id}")
-    order = repo.findById(order_id)
-    if not order:
-        print(f"[WARN] orden {order_id} no encontrada en BD")
-        return True
 
-    if order.get("status") == "completed":
-        print(f"[WORKER] orden {order_id} ya completada")
-        return True
+def _order_id(msg):
+    """order_id del mensaje como int, o None si falta o no es válido"""
+    order_id = msg.get("order_id") if isinstance(msg, dict) else None
+    if isinstance(order_id, str) and order_id.strip().isdigit():
+        order_id = int(order_id)
+    if isinstance(order_id, bool) or not isinstance(order_id, int) or order_id <= 0:
+        return None
+    return order_id
 
+
+def _tomar(order_ids):
+    """
+    repo.claim del lote. Si falla por algo que no es pasajero, se toman de a
+    una para que la orden culpable no frene a las demás.
+
+    Returns:
+        tuple: (tomadas, {id: estado}, ids rechazados)
+    """
     try:
-        time.sleep(1)
-        try:
-            repo.update_status(order_id, "completed")
-        except Exception:
-            print("[INFO] update_status no implementado en repo; omitiendo actualización")
-        print(f"[WORKER] orden {order_id} procesada OK")
-        return True
+        return (*repo.claim(order_ids), set())
+    except ERRORES_TRANSITORIOS:
+        raise
     except Exception as e:
-        print(f"[ERROR] fallo procesando orden {order_id}: {e}")
-        return False
+        print(f"[ERROR] no se pudo tomar el lote {order_ids}: {e}; se toman de a una")
+
+    claimed, estados, rechazadas = set(), {}, set()
+    for order_id in order_ids:
+        try:
+            tomadas, otras = repo.claim([order_id])
+        except ERRORES_TRANSITORIOS:
+            raise
+        except Exception as e:
+            print(f"[ERROR] orden {order_id} imposible de tomar, se rechaza: {e}")
+            rechazadas.add(order_id)
+            continue
+        claimed |= tomadas
+        estados.update(otras)
+    return claimed, estados, rechazadas
+
+
+def handle_order_batch(msgs: list) -> list:
+    """Retorna un resultado por mensaje: True = ack, False = reintentar, None = rechazar"""
+    ids_por_mensaje = [_order_id(msg) for msg in msgs]
+    for msg, order_id in zip(msgs, ids_por_mensaje):
+        if order_id is None:
+            print(f"[WARN] mensaje sin order_id válido, se rechaza: {msg!r}")
+    order_ids = sorted({order_id for order_id in ids_por_mensaje if order_id is not None})
+
+    try:
+        claimed, estados, rechazadas = _tomar(order_ids) if order_ids else (set(), {}, set())
+    except ERRORES_TRANSITORIOS as e:
+        # BD caída o pool agotado: es pasajero, los mensajes vuelven a la cola
+        print(f"[ERROR] no se pudieron tomar las ordenes {order_ids}: {e}")
+        return [None if order_id is None else False for order_id in ids_por_mensaje]
+
+    # las que no se tomaron y no terminaron (las tiene otro worker) se reintentan
+    en_curso = {oid for oid, estado in estados.items() if estado not in ESTADOS_FINALES}
+    descartadas = set(order_ids) - claimed - en_curso - rechazadas
+    if descartadas:
+        print(f"[WORKER] ordenes {sorted(descartadas)} ya procesadas o inexistentes; se omiten")
+    if en_curso:
+        print(f"[WORKER] ordenes {sorted(en_curso)} en proceso en otro worker; vuelven a la cola")
+
+    if claimed:
+        try:
+            completed = repo.compare_and_set_status_many(claimed, STATUS_PROCESSING, STATUS_COMPLETED)
+            print(f"[WORKER] {len(completed)} ordenes procesadas OK")
+        except Exception as e:
+            print(f"[ERROR] fallo procesando ordenes {sorted(claimed)}: {e}")
+            try:
+                # liberar para que el reintento las pueda volver a tomar
+                repo.compare_and_set_status_many(claimed, STATUS_PROCESSING, STATUS_PENDING)
+            except Exception:
+                # quedan en 'processing': la reentrega las retoma cuando
+                # vence ORDENES_CLAIM_TIMEOUT
+                pass
+            en_curso |= claimed
+    return [
+        None if order_id is None or order_id in rechazadas else order_id not in en_curso
+        for order_id in ids_por_mensaje
+    ]
 
 if __name__ == "__main__":
-    consume_orders(handle_order_message, prefetch=1)
\ No newline at end of file
+    OrderConsumer(
+        handle_order_batch,
+        prefetch=WORKER_PREFETCH,
+        max_workers=WORKER_CONCURRENCY,
+        batch_size=WORKER_BATCH_SIZE,
+        batch_wait=WORKER_BATCH_WAIT,
+        requeue_delay=WORKER_REQUEUE_DELAY,
+    ).run()
@@ -0,0 +1,83 @@
+"""
+Capa de acceso asíncrona a Postgres (asyncpg) para los handlers `async def`.
+
+Tiene su propio pool, independiente del pool sync de persistencia.db, que
+sigue usando el worker y los ejemplos.
+"""
+import asyncio
+from contextlib import asynccontextmanager
+
+try:
+    import asyncpg
+except Exception:
+    asyncpg = None
+
+from infraestructura.config_store import cfg
+from persistencia.db import DATABASE_URL
+
+DB_ASYNC_POOL_MIN = cfg.get("DB_ASYNC_POOL_MIN", default=2, as_type=int)
+DB_ASYNC_POOL_MAX = cfg.get("DB_ASYNC_POOL_MAX", default=20, as_type=int)
+DB_ASYNC_POOL_TIMEOUT = cfg.get("DB_ASYNC_POOL_TIMEOUT", default=10, as_type=float)
+DB_ASYNC_POOL_MAX_IDLE = cfg.get("DB_ASYNC_POOL_MAX_IDLE", default=300, as_type=float)
+
+_pool = None
+_pool_lock = None
+
+
+async def get_pool():
+    """Crea el pool la primera vez que se usa (una sola vez aunque haya concurrencia)"""
+    global _pool, _pool_lock
+    if _pool is not None:
+        return _pool
+    if asyncpg is None:
+        raise RuntimeError("asyncpg no está instalado; la capa async no está disponible")
+    if _pool_lock is None:
+        _pool_lock = asyncio.Lock()
+    async with _pool_lock:
+        if _pool is None:
+            _pool = await asyncpg.create_pool(
+                DATABASE_URL,
+                min_size=DB_ASYNC_POOL_MIN,
+                max_size=DB_ASYNC_POOL_MAX,
+                max_inactive_connection_lifetime=DB_ASYNC_POOL_MAX_IDLE,
+            )
+    return _pool
+
+
+@asynccontextmanager
+async def get_conn():
+    """Presta una conexión del pool async; usar como `async with get_conn() as conn:`"""
+    pool = await get_pool()
+    async with pool.acquire(timeout=DB_ASYNC_POOL_TIMEOUT) as conn:
+        yield conn
+
+
+def to_dict(record):
+    """Convierte un asyncpg.Record al mismo formato dict que devuelve RealDictCursor"""
+    return dict(record) if record is not None else None
+
+
+def to_dicts(records):
+    return [dict(r) for r in records]
+
+
+def get_pool_stats() -> dict:
+    """Retorna estadísticas del pool async (vacío si todavía no se creó)"""
+    if _pool is None:
+        return {"min_size": DB_ASYNC_POOL_MIN, "max_size": DB_ASYNC_POOL_MAX, "size": 0, "idle": 0, "in_use": 0}
+    size = _pool.get_size()
+    idle = _pool.get_idle_size()
+    return {
+        "min_size": _pool.get_min_size(),
+        "max_size": _pool.get_max_size(),
+        "size": size,
+        "idle": idle,
+        "in_use": size - idle,
+    }
+
+
+async def close_pool():
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
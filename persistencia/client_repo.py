@@ -1,4 +1,6 @@
 from persistencia.db import get_conn
+from persistencia import async_db
+from persistencia.invalidacion import notificar, notificar_async
 
 class ClienteRepo:
     def save(self, cliente_data):
@@ -7,8 +9,11 @@ class ClienteRepo:
                 "INSERT INTO clients (name, email, password) VALUES (%s, %s, %s) RETURNING *",
                 (cliente_data["name"], cliente_data["email"], cliente_data["password"])
             )
+            fila = cur.fetchone()
+            if fila:
+                notificar(cur, "clientes", [fila["id"]])
             conn.commit()
-            return cur.fetchone()
+            return fila
 
     def login(self, email, password):
         with get_conn() as conn, conn.cursor() as cur:
@@ -24,10 +29,56 @@ class ClienteRepo:
                 "UPDATE clients SET name = %s, email = %s, password = %s WHERE id = %s RETURNING *",
                 (cliente_data["name"], cliente_data["email"], cliente_data["password"], cliente_id)
             )
+            fila = cur.fetchone()
+            if fila:
+                notificar(cur, "clientes", [fila["id"]])
             conn.commit()
-            return cur.fetchone()
+            return fila
 
     def findById(self, cliente_id):
         with get_conn() as conn, conn.cursor() as cur:
             cur.execute("SELECT * FROM clients WHERE id = %s", (cliente_id,))
-            return cur.fetchone()
\ No newline at end of file
+            return cur.fetchone()
+
+    def findExistingIds(self, cliente_ids):
+        """Retorna el subconjunto de ids que existen, en una sola consulta"""
+        with get_conn() as conn, conn.cursor() as cur:
+            cur.execute("SELECT id FROM clients WHERE id = ANY(%s::int[])", (list(cliente_ids),))
+            return {row["id"] for row in cur.fetchall()}
+
+
+class ClienteRepoAsync:
+    """Versión async de ClienteRepo (asyncpg) para los handlers `async def`"""
+
+    async def save(self, cliente_data):
+        async with async_db.get_conn() as conn, conn.transaction():
+            row = await conn.fetchrow(
+                "INSERT INTO clients (name, email, password) VALUES ($1, $2, $3) RETURNING *",
+                cliente_data["name"], cliente_data["email"], cliente_data["password"]
+            )
+            if row:
+                await notificar_async(conn, "clientes", [row["id"]])
+            return async_db.to_dict(row)
+
+    async def login(self, email, password):
+        async with async_db.get_conn() as conn:
+            row = await conn.fetchrow(
+                "SELECT * FROM clients WHERE email = $1 AND password = $2",
+                email, password
+            )
+            return async_db.to_dict(row)
+
+    async def update(self, cliente_id, cliente_data):
+        async with async_db.get_conn() as conn, conn.transaction():
+            row = await conn.fetchrow(
+                "UPDATE clients SET name = $1, email = $2, password = $3 WHERE id = $4 RETURNING *",
+                cliente_data["name"], cliente_data["email"], cliente_data["password"], cliente_id
+            )
+            if row:
+                await notificar_async(conn, "clientes", [row["id"]])
+            return async_db.to_dict(row)
+
+    async def findById(self, cliente_id):
+        async with async_db.get_conn() as conn:
+            row = await conn.fetchrow("SELECT * FROM clients WHERE id = $1", cliente_id)
+            return async_db.to_dict(row)
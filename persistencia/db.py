@@ -1,8 +1,245 @@
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+
 import psycopg2
 from psycopg2.extras import RealDictCursor
 from infraestructura.config_store import cfg
 
 DATABASE_URL = cfg.get("DATABASE_URL", default="postgresql://user:pass@db:5432/ecommerce")
 
+# tamaño y comportamiento del pool configurables vía ConfigStore (env/Consul)
+DB_POOL_MIN = cfg.get("DB_POOL_MIN", default=2, as_type=int)
+DB_POOL_MAX = cfg.get("DB_POOL_MAX", default=20, as_type=int)
+DB_POOL_TIMEOUT = cfg.get("DB_POOL_TIMEOUT", default=10, as_type=float)
+DB_POOL_MAX_IDLE = cfg.get("DB_POOL_MAX_IDLE", default=300, as_type=float)
+DB_POOL_HEALTHCHECK = cfg.get("DB_POOL_HEALTHCHECK", default=True, as_type=bool)
+DB_POOL_HEALTHCHECK_AFTER = cfg.get("DB_POOL_HEALTHCHECK_AFTER", default=30, as_type=float)
+
+
+class PoolTimeoutError(Exception):
+    """No se obtuvo una conexión del pool dentro del timeout"""
+    pass
+
+
+class ConnectionPool:
+    """
+    Pool de conexiones thread-safe para psycopg2.
+
+    Mantiene entre min_size y max_size conexiones abiertas. Al pedir una
+    conexión se reutiliza una ociosa (verificando su salud) o se abre una
+    nueva si no se alcanzó el máximo; si no, se espera hasta `timeout`.
+    Las conexiones ociosas por más de `max_idle` segundos se cierran,
+    respetando siempre el mínimo.
+    """
+
+    def __init__(self, dsn, min_size=2, max_size=20, timeout=10.0, max_idle=300.0,
+                 healthcheck=True, healthcheck_after=30.0):
+        self.dsn = dsn
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.healthcheck = healthcheck
+        self.healthcheck_after = healthcheck_after
+
+        self._lock = threading.Condition()
+        self._idle = deque()  # (conexion, momento en que se devolvió)
+        self._size = 0  # conexiones abiertas (ociosas + en uso)
+        self._in_use = 0
+        self._waiting = 0
+
+        # estadísticas
+        self._checkouts = 0
+        self._timeouts = 0
+        self._discarded = 0
+        self._evicted = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._started = time.time()
+
+    def _connect(self):
+        return psycopg2.connect(self.dsn, cursor_factory=RealDictCursor)
+
+    def _is_healthy(self, conn, idle_since):
+        if conn.closed:
+            return False
+        if not self.healthcheck or time.time() - idle_since < self.healthcheck_after:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    def _close_quietly(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _evict_idle(self):
+        """Cierra conexiones ociosas viejas (se llama con el lock tomado)"""
+        now = time.time()
+        expired = []
+        # las más viejas están a la izquierda
+        while self._idle and self._size > self.min_size and now - self._idle[0][1] > self.max_idle:
+            conn, _ = self._idle.popleft()
+            self._size -= 1
+            self._evicted += 1
+            expired.append(conn)
+        return expired
+
+    def getconn(self):
+        """Obtiene una conexión del pool, esperando como máximo `timeout` segundos"""
+        start = time.time()
+        deadline = start + self.timeout
+        with self._lock:
+            to_close = self._evict_idle()
+            while True:
+                if self._idle:
+                    conn, idle_since = self._idle.pop()
+                    reuse = True
+                    break
+                if self._size < self.max_size:
+                    # reservamos el lugar y conectamos fuera del lock
+                    self._size += 1
+                    conn, reuse = None, False
+                    break
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeoutError(
+                        f"No hay conexiones libres en el pool (max={self.max_size}) "
+                        f"después de {self.timeout}s"
+                    )
+                self._waiting += 1
+                try:
+                    self._lock.wait(remaining)
+                finally:
+                    self._waiting -= 1
+            self._in_use += 1
+
+        for old in to_close:
+            self._close_quietly(old)
+
+        try:
+            if reuse and not self._is_healthy(conn, idle_since):
+                self._close_quietly(conn)
+                with self._lock:
+                    self._discarded += 1
+                conn = None
+            if conn is None:
+                conn = self._connect()
+        except Exception:
+            with self._lock:
+                self._size -= 1
+                self._in_use -= 1
+                self._lock.notify()
+            raise
+
+        waited = time.time() - start
+        with self._lock:
+            self._checkouts += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+        return conn
+
+    def putconn(self, conn, discard=False):
+        """Devuelve una conexión al pool (o la descarta si está rota)"""
+        if not discard and not conn.closed:
+            try:
+                # no dejar transacciones abiertas en conexiones ociosas
+                conn.rollback()
+            except Exception:
+                discard = True
+        discard = discard or conn.closed
+
+        with self._lock:
+            self._in_use -= 1
+            if discard:
+                self._size -= 1
+                self._discarded += 1
+            else:
+                self._idle.append((conn, time.time()))
+            self._lock.notify()
+
+        if discard:
+            self._close_quietly(conn)
+
+    @contextmanager
+    def connection(self):
+        """
+        Context manager que presta una conexión y la devuelve al salir.
+        Hace commit si el bloque termina bien y rollback si lanza una excepción,
+        igual que `with psycopg2.connect(...) as conn`.
+        """
+        conn = self.getconn()
+        discard = False
+        try:
+            yield conn
+            if not conn.closed:
+                conn.commit()
+        except Exception as e:
+            if isinstance(e, (psycopg2.InterfaceError, psycopg2.OperationalError)):
+                discard = True
+            elif not conn.closed:
+                try:
+                    conn.rollback()
+                except Exception:
+                    discard = True
+            raise
+        finally:
+            self.putconn(conn, discard=discard)
+
+    def get_stats(self) -> dict:
+        """Retorna estadísticas del pool"""
+        with self._lock:
+            elapsed = max(time.time() - self._started, 1e-9)
+            return {
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "size": self._size,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "waiting": self._waiting,
+                "checkouts": self._checkouts,
+                "checkouts_per_sec": round(self._checkouts / elapsed, 2),
+                "avg_wait_ms": round(self._wait_total / self._checkouts * 1000, 3) if self._checkouts else 0.0,
+                "max_wait_ms": round(self._wait_max * 1000, 3),
+                "timeouts": self._timeouts,
+                "discarded": self._discarded,
+                "evicted_idle": self._evicted,
+            }
+
+    def closeall(self):
+        """Cierra todas las conexiones ociosas"""
+        with self._lock:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+        for conn, _ in idle:
+            self._close_quietly(conn)
+
+
+pool = ConnectionPool(
+    DATABASE_URL,
+    min_size=DB_POOL_MIN,
+    max_size=DB_POOL_MAX,
+    timeout=DB_POOL_TIMEOUT,
+    max_idle=DB_POOL_MAX_IDLE,
+    healthcheck=DB_POOL_HEALTHCHECK,
+    healthcheck_after=DB_POOL_HEALTHCHECK_AFTER,
+)
+
+
 def get_conn():
-    return psycopg2.connect(DATABASE_URL, cursor_factory=RealDictCursor)
\ No newline at end of file
+    """Presta una conexión del pool; usar como `with get_conn() as conn:`"""
+    return pool.connection()
+
+
+def get_pool_stats():
+    return pool.get_stats()
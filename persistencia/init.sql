@@ -1,8 +1,37 @@
+-- trigramas para la búsqueda tolerante a errores de tipeo
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
 CREATE TABLE IF NOT EXISTS products (
     id SERIAL PRIMARY KEY,
     name TEXT NOT NULL,
     price NUMERIC NOT NULL,
-    stock INTEGER NOT NULL
+    stock INTEGER NOT NULL CHECK (stock >= 0),
+    hot BOOLEAN NOT NULL DEFAULT FALSE,
+    version BIGINT NOT NULL DEFAULT 0,
+    -- documento de búsqueda; 'simple' no aplica stemming (nombres, marcas, modelos)
+    search tsvector GENERATED ALWAYS AS (to_tsvector('simple', name)) STORED
+);
+
+CREATE INDEX IF NOT EXISTS idx_products_version ON products (version);
+
+-- /productos/search: texto completo con prefijos y, si no alcanza, vecinos por trigramas
+CREATE INDEX IF NOT EXISTS idx_products_search ON products USING GIN (search);
+CREATE INDEX IF NOT EXISTS idx_products_name_trgm ON products USING GIST (lower(name) gist_trgm_ops);
+
+-- listado paginado (keyset): un índice (clave de orden, id) por cada orden de /productos
+CREATE INDEX IF NOT EXISTS idx_products_price ON products (price, id);
+-- COLLATE "C" sirve tanto para ordenar por nombre como para la búsqueda por prefijo (LIKE 'abc%')
+CREATE INDEX IF NOT EXISTS idx_products_name ON products ((lower(name)) COLLATE "C", id);
+-- filtros de stock: los normales por su columna, los hot (pocos) se recorren aparte
+CREATE INDEX IF NOT EXISTS idx_products_stock ON products (stock, id) WHERE NOT hot;
+CREATE INDEX IF NOT EXISTS idx_products_hot ON products (id) WHERE hot;
+
+-- stock de productos "hot" repartido en buckets para evitar contención en una sola fila
+CREATE TABLE IF NOT EXISTS product_stock_buckets (
+    product_id INTEGER REFERENCES products(id) ON DELETE CASCADE,
+    bucket INTEGER NOT NULL,
+    stock INTEGER NOT NULL CHECK (stock >= 0),
+    PRIMARY KEY (product_id, bucket)
 );
 
 CREATE TABLE IF NOT EXISTS clients (
@@ -16,9 +45,14 @@ CREATE TABLE IF NOT EXISTS clients (
 CREATE TABLE IF NOT EXISTS orders (
     id SERIAL PRIMARY KEY,
     client_id INTEGER REFERENCES clients(id),
+    status TEXT NOT NULL DEFAULT 'pending'
+        CHECK (status IN ('pending', 'processing', 'completed', 'failed')),
+    claimed_at TIMESTAMP,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+CREATE INDEX IF NOT EXISTS idx_orders_status ON orders (status);
+
 CREATE TABLE IF NOT EXISTS order_items (
     id SERIAL PRIMARY KEY,
     order_id INTEGER REFERENCES orders(id),
@@ -26,9 +60,45 @@ CREATE TABLE IF NOT EXISTS order_items (
     quantity INTEGER NOT NULL
 );
 
+CREATE INDEX IF NOT EXISTS idx_order_items_order_id ON order_items (order_id);
+
 CREATE TABLE IF NOT EXISTS proveedores (
     id SERIAL PRIMARY KEY,
     nombre TEXT NOT NULL,
     contacto TEXT,
-    email TEXT
-);
\ No newline at end of file
+    email TEXT,
+    version BIGINT NOT NULL DEFAULT 0
+);
+
+CREATE INDEX IF NOT EXISTS idx_proveedores_version ON proveedores (version);
+
+-- versión por tabla del catálogo: cada escritura la incrementa y la guarda en la fila
+-- modificada; sirve de ETag para los listados y para pedir solo los cambios
+CREATE TABLE IF NOT EXISTS catalog_versions (
+    tabla TEXT PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0
+);
+
+INSERT INTO catalog_versions (tabla) VALUES ('products'), ('proveedores') ON CONFLICT DO NOTHING;
+
+-- filas borradas, para que /productos/changes también informe las bajas
+CREATE TABLE IF NOT EXISTS catalog_tombstones (
+    tabla TEXT NOT NULL,
+    row_id INTEGER NOT NULL,
+    version BIGINT NOT NULL,
+    PRIMARY KEY (tabla, row_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_catalog_tombstones_version ON catalog_tombstones (tabla, version);
+
+-- eventos de ordenes pendientes de publicar en RabbitMQ (transactional outbox)
+CREATE TABLE IF NOT EXISTS order_outbox (
+    id BIGSERIAL PRIMARY KEY,
+    order_id INTEGER NOT NULL REFERENCES orders(id),
+    payload JSONB NOT NULL DEFAULT '{}',
+    -- el relay sube la versión del stock del catálogo antes de publicar el evento
+    stock_versionado BOOLEAN NOT NULL DEFAULT FALSE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_order_outbox_sin_versionar ON order_outbox (id) WHERE NOT stock_versionado;
@@ -0,0 +1,146 @@
+"""
+Bus de invalidación de caches entre procesos usando LISTEN/NOTIFY de Postgres.
+
+Las escrituras de los repositorios emiten un NOTIFY (dentro de su propia
+transacción, así que solo se entrega si hace commit) con la entidad y los ids
+modificados. Cada proceso mantiene una única conexión escuchando el canal y
+reenvía cada evento a los suscriptores de esa entidad, que borran las claves
+de sus caches locales.
+"""
+import json
+import select
+import logging
+import threading
+
+import psycopg2
+import psycopg2.extensions
+
+from infraestructura.config_store import cfg
+from persistencia.db import DATABASE_URL
+
+logger = logging.getLogger(__name__)
+
+CANAL_INVALIDACION = cfg.get("CACHE_INVALIDATION_CHANNEL", default="cache_invalidation")
+# el payload de NOTIFY tiene un límite de ~8000 bytes: con más ids se invalida toda la entidad
+MAX_IDS_POR_EVENTO = 500
+RECONEXION_SEG = cfg.get("CACHE_INVALIDATION_RECONNECT", default=2, as_type=float)
+
+
+def _payload(entidad, ids):
+    ids = sorted(set(ids)) if ids is not None else None
+    if ids is not None and len(ids) > MAX_IDS_POR_EVENTO:
+        ids = None
+    return json.dumps({"entidad": entidad, "ids": ids})
+
+
+def notificar(cur, entidad, ids=None):
+    """Emite el evento dentro de la transacción del cursor (psycopg2). ids=None = toda la entidad"""
+    cur.execute("SELECT pg_notify(%s, %s)", (CANAL_INVALIDACION, _payload(entidad, ids)))
+
+
+async def notificar_async(conn, entidad, ids=None):
+    """Igual que notificar, sobre una conexión asyncpg"""
+    await conn.execute("SELECT pg_notify($1, $2)", CANAL_INVALIDACION, _payload(entidad, ids))
+
+
+class BusInvalidacion:
+    """Escucha el canal de invalidación en un thread propio y despacha a los suscriptores"""
+
+    def __init__(self, dsn=DATABASE_URL, canal=CANAL_INVALIDACION):
+        self.dsn = dsn
+        self.canal = canal
+        self._suscriptores = {}  # entidad -> [callback(ids)]
+        self._thread = None
+        self._stop = threading.Event()
+
+        self.eventos = 0
+        self.reconexiones = 0
+
+    def suscribir(self, entidad, callback):
+        """callback(ids) se llama por cada evento de `entidad`; ids=None = invalidar todo"""
+        self._suscriptores.setdefault(entidad, []).append(callback)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="cache-invalidation", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _despachar(self, entidad, ids):
+        for callback in self._suscriptores.get(entidad, []):
+            try:
+                callback(ids)
+            except Exception as e:
+                logger.error(f"[invalidacion] error invalidando '{entidad}': {e}")
+
+    def _invalidar_todo(self):
+        for entidad in list(self._suscriptores):
+            self._despachar(entidad, None)
+
+    def _run(self):
+        primera_vez = True
+        while not self._stop.is_set():
+            conn = None
+            try:
+                conn = psycopg2.connect(self.dsn)
+                conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                with conn.cursor() as cur:
+                    cur.execute(f'LISTEN "{self.canal}"')
+                if not primera_vez:
+                    # mientras estuvimos desconectados se pudieron perder eventos
+                    self.reconexiones += 1
+                    self._invalidar_todo()
+                primera_vez = False
+                logger.info(f"[invalidacion] escuchando canal '{self.canal}'")
+                self._escuchar(conn)
+            except Exception as e:
+                logger.error(f"[invalidacion] conexión perdida: {e}. Reintentando en {RECONEXION_SEG}s")
+                self._stop.wait(RECONEXION_SEG)
+            finally:
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+
+    def _escuchar(self, conn):
+        while not self._stop.is_set():
+            # timeout corto para poder detener el thread
+            if select.select([conn], [], [], 1.0) == ([], [], []):
+                continue
+            conn.poll()
+            while conn.notifies:
+                notificacion = conn.notifies.pop(0)
+                try:
+                    evento = json.loads(notificacion.payload)
+                except Exception:
+                    continue
+                self.eventos += 1
+                self._despachar(evento.get("entidad"), evento.get("ids"))
+
+    def get_stats(self) -> dict:
+        return {
+            "canal": self.canal,
+            "activo": self._thread is not None and self._thread.is_alive(),
+            "eventos": self.eventos,
+            "reconexiones": self.reconexiones,
+        }
+
+
+_bus = None
+_bus_lock = threading.Lock()
+
+
+def get_bus() -> BusInvalidacion:
+    """Bus compartido por todo el proceso"""
+    global _bus
+    if _bus is None:
+        with _bus_lock:
+            if _bus is None:
+                _bus = BusInvalidacion()
+    return _bus
@@ -1,24 +1,165 @@
+import io
+import json
+from infraestructura.config_store import cfg
 from persistencia.db import get_conn
+from persistencia import async_db
+from persistencia.reserva_stock import ReservaStock, ReservaStockAsync, ErrorStockInsuficiente
+from persistencia.outbox_repo import OutboxRepo
+from persistencia.invalidacion import notificar, notificar_async
+
+# cantidad de ordenes por transacción en la ingesta masiva
+ORDENES_BULK_CHUNK = cfg.get("ORDENES_BULK_CHUNK", default=500, as_type=int)
+# segundos después de los cuales una orden en 'processing' se considera abandonada
+# (el worker que la tomó se cayó) y otro worker puede volver a tomarla
+ORDENES_CLAIM_TIMEOUT = cfg.get("ORDENES_CLAIM_TIMEOUT", default=300, as_type=int)
+
+# ciclo de vida de una orden
+STATUS_PENDING = "pending"
+STATUS_PROCESSING = "processing"
+STATUS_COMPLETED = "completed"
+STATUS_FAILED = "failed"
+
+# ordenes con sus items en una sola consulta (los items se agregan como JSON
+# en la BD); paginado por keyset sobre orders.id
+ORDENES_PAGINA_SQL = """
+    SELECT o.*,
+           COALESCE(
+               (SELECT json_agg(oi ORDER BY oi.id) FROM order_items oi WHERE oi.order_id = o.id),
+               '[]'::json
+           ) AS items
+    FROM orders o
+    WHERE o.id > {after_id}
+    ORDER BY o.id
+    LIMIT {limit}
+"""
+_ORDENES_PAGINA_PG = ORDENES_PAGINA_SQL.format(after_id="%s", limit="%s")
+_ORDENES_PAGINA_ASYNC = ORDENES_PAGINA_SQL.format(after_id="$1", limit="$2")
+
+# todos los items de la orden en un solo INSERT multi-fila
+_INSERTAR_ITEMS_PG = """
+    INSERT INTO order_items (order_id, product_id, quantity)
+    SELECT %s, x.product_id, x.quantity
+    FROM unnest(%s::int[], %s::int[]) AS x(product_id, quantity)
+"""
+_INSERTAR_ITEMS_ASYNC = """
+    INSERT INTO order_items (order_id, product_id, quantity)
+    SELECT $1, x.product_id, x.quantity
+    FROM unnest($2::int[], $3::int[]) AS x(product_id, quantity)
+"""
+
+def _columnas_items(items):
+    """Separa los items en arrays paralelos (product_id, quantity) para unnest"""
+    return [item["product_id"] for item in items], [item["quantity"] for item in items]
+
+
+def _cantidades_por_producto(items):
+    """Suma las cantidades por producto, ordenado por product_id"""
+    cantidades = {}
+    for item in items:
+        cantidades[item["product_id"]] = cantidades.get(item["product_id"], 0) + item["quantity"]
+    ids = sorted(cantidades)
+    return ids, [cantidades[i] for i in ids]
+
 
 class OrdenRepo:
+    def __init__(self):
+        self.reserva = ReservaStock()
+        self.outbox = OutboxRepo()
+
     def save(self, orden_data):
+        """
+        Crea la orden con sus items, reserva el stock y registra el evento de
+        la orden en el outbox, todo en la misma transacción.
+
+        Raises:
+            ErrorStockInsuficiente: Si algún producto no tiene stock suficiente
+        """
         with get_conn() as conn, conn.cursor() as cur:
             cur.execute(
                 "INSERT INTO orders (client_id) VALUES (%s) RETURNING id",
                 (orden_data["client_id"],)
             )
             orden_id = cur.fetchone()["id"]
-            for item in orden_data["items"]:
+            items = orden_data["items"]
+            if items:
+                # reservar antes de insertar los items: el FK de order_items toma
+                # FOR KEY SHARE sobre los productos, y con eso tomado antes del
+                # bloqueo de la reserva dos ordenes del mismo producto se trababan
+                producto_ids, cantidades = _cantidades_por_producto(items)
+                self.reserva.reservar(cur, producto_ids, cantidades)
+                cur.execute(_INSERTAR_ITEMS_PG, (orden_id, *_columnas_items(items)))
+                # el stock cambió: las otras instancias invalidan esos productos
+                notificar(cur, "productos", producto_ids)
+            # la versión del stock la sube el relay del outbox después del commit
+            # (ver versiones.versionar_stock): así las ordenes no compiten por
+            # el contador del catálogo
+            self.outbox.add(cur, orden_id, {"client_id": orden_data["client_id"]})
+            conn.commit()
+            return {"id": orden_id, "client_id": orden_data["client_id"], "items": orden_data["items"]}
+
+    def saveBulk(self, ordenes, chunk_size=None):
+        """
+        Crea muchas ordenes con sentencias por conjunto, en transacciones de
+        `chunk_size` ordenes. Una orden sin stock se rechaza sin afectar al resto.
+        Si falla la transacción de un chunk (deadlock, conexión caída, COPY),
+        solo sus ordenes se informan como fallidas: las de los chunks ya
+        confirmados siguen en el resultado, para no duplicarlas al reintentar.
+
+        Returns:
+            list: Por cada orden, {"ok": True, "orden": {...}} o {"ok": False, "error": "..."}
+        """
+        chunk_size = chunk_size or ORDENES_BULK_CHUNK
+        resultados = []
+        for inicio in range(0, len(ordenes), chunk_size):
+            chunk = ordenes[inicio:inicio + chunk_size]
+            try:
+                resultados.extend(self._save_chunk(chunk))
+            except Exception as e:
+                # la transacción del chunk se deshizo: ninguna de sus ordenes se creó
+                error = f"No se pudo guardar la orden, se puede reintentar: {e}"
+                resultados.extend({"ok": False, "error": error} for _ in chunk)
+        return resultados
+
+    def _save_chunk(self, ordenes):
+        pedidos = [dict(zip(*_cantidades_por_producto(orden["items"]))) for orden in ordenes]
+        with get_conn() as conn, conn.cursor() as cur:
+            faltantes = self.reserva.reservar_lote(cur, pedidos)
+            aceptadas = [orden for orden, f in zip(ordenes, faltantes) if f is None]
+            ids = []
+            if aceptadas:
+                # se reservan los ids de antemano para saber a qué orden corresponde cada uno
                 cur.execute(
-                    "INSERT INTO order_items (order_id, product_id, quantity) VALUES (%s, %s, %s)",
-                    (orden_id, item["product_id"], item["quantity"])
+                    "SELECT nextval(pg_get_serial_sequence('orders', 'id')) AS id FROM generate_series(1, %s)",
+                    (len(aceptadas),)
                 )
+                ids = [row["id"] for row in cur.fetchall()]
                 cur.execute(
-                    "UPDATE products SET stock = stock - %s WHERE id = %s",
-                    (item["quantity"], item["product_id"])
+                    "INSERT INTO orders (id, client_id) SELECT * FROM unnest(%s::int[], %s::int[])",
+                    (ids, [orden["client_id"] for orden in aceptadas])
                 )
+                # los items van con COPY, que es lo más rápido para muchas filas
+                buf = io.StringIO()
+                for orden_id, orden in zip(ids, aceptadas):
+                    for item in orden["items"]:
+                        buf.write(f"{orden_id}\t{int(item['product_id'])}\t{int(item['quantity'])}\n")
+                buf.seek(0)
+                cur.copy_expert("COPY order_items (order_id, product_id, quantity) FROM STDIN", buf)
+                self.outbox.add_many(cur, ids, [orden["client_id"] for orden in aceptadas])
+                producto_ids = sorted({int(item["product_id"]) for orden in aceptadas for item in orden["items"]})
+                notificar(cur, "productos", producto_ids)
             conn.commit()
-            return {"id": orden_id, "client_id": orden_data["client_id"], "items": orden_data["items"]}
+
+        ids_iter = iter(ids)
+        resultados = []
+        for orden, f in zip(ordenes, faltantes):
+            if f is None:
+                resultados.append({
+                    "ok": True,
+                    "orden": {"id": next(ids_iter), "client_id": orden["client_id"], "items": orden["items"]},
+                })
+            else:
+                resultados.append({"ok": False, "error": str(ErrorStockInsuficiente(f))})
+        return resultados
 
     def findById(self, orden_id):
         with get_conn() as conn, conn.cursor() as cur:
@@ -29,11 +170,123 @@ class OrdenRepo:
                 orden["items"] = cur.fetchall()
             return orden
 
+    def update_status(self, orden_id, status):
+        """Fija el estado de una orden sin importar el actual; retorna la orden o None"""
+        with get_conn() as conn, conn.cursor() as cur:
+            cur.execute("UPDATE orders SET status = %s WHERE id = %s RETURNING *", (status, orden_id))
+            conn.commit()
+            return cur.fetchone()
+
+    def update_status_many(self, orden_ids, status):
+        """Actualiza el estado de varias ordenes con una sola sentencia"""
+        with get_conn() as conn, conn.cursor() as cur:
+            cur.execute(
+                "UPDATE orders SET status = %s WHERE id = ANY(%s::int[])",
+                (status, list(orden_ids))
+            )
+            conn.commit()
+            return cur.rowcount
+
+    def compare_and_set_status(self, orden_id, expected, status):
+        """Cambia el estado solo si el actual es `expected`; retorna True si hubo cambio"""
+        return orden_id in self.compare_and_set_status_many([orden_id], expected, status)
+
+    def compare_and_set_status_many(self, orden_ids, expected, status):
+        """Versión por lotes de compare_and_set_status; retorna los ids que cambiaron"""
+        with get_conn() as conn, conn.cursor() as cur:
+            cur.execute(
+                "UPDATE orders SET status = %s WHERE id = ANY(%s::int[]) AND status = %s RETURNING id",
+                (status, list(orden_ids), expected)
+            )
+            conn.commit()
+            return {row["id"] for row in cur.fetchall()}
+
+    def claim(self, orden_ids, claim_timeout=None):
+        """
+        Toma las ordenes para procesarlas (pending -> processing) en una sola
+        sentencia. También retoma las que quedaron en 'processing' por más de
+        `claim_timeout` segundos.
+
+        Returns:
+            tuple: (ids tomados, {id: estado} de las que no se tomaron). Las
+            que no existen no aparecen; una en 'processing' la tiene otro
+            worker (o uno caído, hasta que venza el timeout).
+        """
+        timeout = claim_timeout if claim_timeout is not None else ORDENES_CLAIM_TIMEOUT
+        with get_conn() as conn, conn.cursor() as cur:
+            # el SELECT ve las filas como estaban antes del UPDATE del CTE
+            cur.execute(
+                """
+                WITH tomadas AS (
+                    UPDATE orders SET status = %s, claimed_at = now()
+                    WHERE id = ANY(%s::int[])
+                      AND (status = %s
+                           OR (status = %s AND claimed_at < now() - make_interval(secs => %s)))
+                    RETURNING id
+                )
+                SELECT o.id, o.status, t.id IS NOT NULL AS tomada
+                FROM orders o LEFT JOIN tomadas t ON t.id = o.id
+                WHERE o.id = ANY(%s::int[])
+                """,
+                (STATUS_PROCESSING, list(orden_ids), STATUS_PENDING, STATUS_PROCESSING, timeout,
+                 list(orden_ids))
+            )
+            conn.commit()
+            filas = cur.fetchall()
+            tomadas = {fila["id"] for fila in filas if fila["tomada"]}
+            estados = {fila["id"]: fila["status"] for fila in filas if not fila["tomada"]}
+            return tomadas, estados
+
     def findAll(self):
+        return self.findPage(after_id=0, limit=None)
+
+    def findPage(self, after_id=0, limit=None):
+        """Ordenes con id > after_id (con sus items), como máximo `limit` (None = todas)"""
         with get_conn() as conn, conn.cursor() as cur:
-            cur.execute("SELECT * FROM orders")
-            orders = cur.fetchall()
+            cur.execute(_ORDENES_PAGINA_PG, (after_id, limit))
+            return cur.fetchall()
+
+
+class OrdenRepoAsync:
+    """Versión async de OrdenRepo (asyncpg) para los handlers `async def`"""
+
+    def __init__(self):
+        self.reserva = ReservaStockAsync()
+        self.outbox = OutboxRepo()
+
+    async def save(self, orden_data):
+        async with async_db.get_conn() as conn, conn.transaction():
+            orden_id = await conn.fetchval(
+                "INSERT INTO orders (client_id) VALUES ($1) RETURNING id",
+                orden_data["client_id"]
+            )
+            items = orden_data["items"]
+            if items:
+                # reservar antes de insertar los items (ver OrdenRepo.save)
+                producto_ids, cantidades = _cantidades_por_producto(items)
+                await self.reserva.reservar(conn, producto_ids, cantidades)
+                await conn.execute(_INSERTAR_ITEMS_ASYNC, orden_id, *_columnas_items(items))
+                await notificar_async(conn, "productos", producto_ids)
+            await self.outbox.add_async(conn, orden_id, {"client_id": orden_data["client_id"]})
+            return {"id": orden_id, "client_id": orden_data["client_id"], "items": orden_data["items"]}
+
+    async def findById(self, orden_id):
+        async with async_db.get_conn() as conn:
+            orden = async_db.to_dict(await conn.fetchrow("SELECT * FROM orders WHERE id = $1", orden_id))
+            if orden:
+                orden["items"] = async_db.to_dicts(
+                    await conn.fetch("SELECT * FROM order_items WHERE order_id = $1", orden_id)
+                )
+            return orden
+
+    async def findAll(self):
+        return await self.findPage(after_id=0, limit=None)
+
+    async def findPage(self, after_id=0, limit=None):
+        """Ordenes con id > after_id (con sus items), como máximo `limit` (None = todas)"""
+        async with async_db.get_conn() as conn:
+            orders = async_db.to_dicts(await conn.fetch(_ORDENES_PAGINA_ASYNC, after_id, limit))
+            # asyncpg devuelve json como texto
             for order in orders:
-                cur.execute("SELECT * FROM order_items WHERE order_id = %s", (order["id"],))
-                order["items"] = cur.fetchall()
-            return orders
\ No newline at end of file
+                order["items"] = json.loads(order["items"])
+            return orders
@@ -0,0 +1,73 @@
+import json
+
+# los eventos de ordenes se escriben en la misma transacción que la orden
+# y un relay los publica después en RabbitMQ (transactional outbox)
+
+
+class OutboxRepo:
+    def add(self, cur, order_id, payload):
+        """Agrega un evento dentro de la transacción del cursor (psycopg2)"""
+        cur.execute(
+            "INSERT INTO order_outbox (order_id, payload) VALUES (%s, %s)",
+            (order_id, json.dumps(payload or {}))
+        )
+
+    def add_many(self, cur, order_ids, client_ids):
+        """Agrega los eventos de muchas ordenes con un solo INSERT"""
+        cur.execute(
+            """
+            INSERT INTO order_outbox (order_id, payload)
+            SELECT x.order_id, jsonb_build_object('client_id', x.client_id)
+            FROM unnest(%s::int[], %s::int[]) AS x(order_id, client_id)
+            """,
+            (list(order_ids), list(client_ids))
+        )
+
+    async def add_async(self, conn, order_id, payload):
+        """Agrega un evento dentro de la transacción de la conexión (asyncpg)"""
+        await conn.execute(
+            "INSERT INTO order_outbox (order_id, payload) VALUES ($1, $2::jsonb)",
+            order_id, json.dumps(payload or {})
+        )
+
+    def claim_batch(self, cur, limit):
+        """
+        Toma (bloquea) hasta `limit` eventos pendientes, los más viejos primero.
+        SKIP LOCKED permite varios relays en paralelo sin repetir eventos.
+        Solo toma eventos con el stock ya versionado: al publicarlos se borran.
+        """
+        cur.execute(
+            """
+            SELECT id, order_id, payload FROM order_outbox
+            WHERE stock_versionado
+            ORDER BY id
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+            """,
+            (limit,)
+        )
+        return cur.fetchall()
+
+    def claim_sin_versionar(self, cur, limit):
+        """Toma hasta `limit` eventos cuyo stock todavía no se versionó"""
+        cur.execute(
+            """
+            SELECT id, order_id FROM order_outbox
+            WHERE NOT stock_versionado
+            ORDER BY id
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+            """,
+            (limit,)
+        )
+        return cur.fetchall()
+
+    def marcar_versionados(self, cur, ids):
+        cur.execute("UPDATE order_outbox SET stock_versionado = TRUE WHERE id = ANY(%s::bigint[])", (list(ids),))
+
+    def delete(self, cur, ids):
+        cur.execute("DELETE FROM order_outbox WHERE id = ANY(%s::bigint[])", (list(ids),))
+
+    def count_pending(self, cur):
+        cur.execute("SELECT count(*) AS pendientes FROM order_outbox")
+        return cur.fetchone()["pendientes"]
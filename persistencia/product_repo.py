@@ -1,36 +1,421 @@
+import re
+import json
+import base64
+from decimal import Decimal
+from infraestructura.config_store import cfg
 from persistencia.db import get_conn
+from persistencia import async_db
+from persistencia.reserva_stock import ReservaStock, ReservaStockAsync
+from persistencia.invalidacion import notificar, notificar_async
+from persistencia.versiones import (
+    incrementar_version, incrementar_version_async, registrar_borrado, registrar_borrado_async,
+    leer_version_productos, leer_version_productos_async, version_etag,
+)
+
+# para los productos hot el stock disponible es la suma de sus buckets
+STOCK_BUCKETS = "(SELECT COALESCE(SUM(b.stock), 0)::int FROM product_stock_buckets b WHERE b.product_id = p.id)"
+STOCK_DISPONIBLE = f"CASE WHEN p.hot THEN {STOCK_BUCKETS} ELSE p.stock END"
+COLUMNAS_PRODUCTOS = f"p.id, p.name, p.price, {STOCK_DISPONIBLE} AS stock, p.hot, p.version"
+SELECT_PRODUCTOS = f"SELECT {COLUMNAS_PRODUCTOS} FROM products p"
+# columnas devueltas por INSERT/UPDATE (sin el tsvector de búsqueda)
+COLUMNAS_ESCRITURA = "id, name, price, stock, hot, version"
+
+PRODUCTOS_PAGE_SIZE = cfg.get("PRODUCTOS_PAGE_SIZE", default=50, as_type=int)
+PRODUCTOS_MAX_PAGE_SIZE = cfg.get("PRODUCTOS_MAX_PAGE_SIZE", default=200, as_type=int)
+
+# orden -> (clave de orden, descendente). Cada clave tiene un índice (clave, id)
+# en init.sql, así una página es un recorrido de índice de `limit` filas
+ORDENES_PRODUCTOS = {
+    "id": ("p.id", False),
+    "-id": ("p.id", True),
+    "price": ("p.price", False),
+    "-price": ("p.price", True),
+    "name": ('lower(p.name) COLLATE "C"', False),
+    "-name": ('lower(p.name) COLLATE "C"', True),
+}
+
+
+def codificar_cursor(clave, producto_id):
+    """Cursor opaco con la clave de orden y el id de la última fila de la página"""
+    valor = str(clave) if isinstance(clave, Decimal) else clave
+    return base64.urlsafe_b64encode(json.dumps([valor, producto_id]).encode()).decode()
+
+
+def decodificar_cursor(cursor, orden):
+    """Raises: ValueError si el cursor no es válido para `orden`"""
+    try:
+        clave, producto_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        producto_id = int(producto_id)
+        if ORDENES_PRODUCTOS[orden][0] == "p.price":
+            clave = Decimal(clave)
+        elif ORDENES_PRODUCTOS[orden][0] == "p.id":
+            clave = int(clave)
+        elif not isinstance(clave, str):
+            raise ValueError
+        return clave, producto_id
+    except Exception:
+        raise ValueError("Cursor inválido")
+
+
+def _prefijo_like(prefijo):
+    escapado = prefijo.lower().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return escapado + "%"
+
+
+def _consulta_pagina(filtros, orden, cursor, limit, marcador):
+    """
+    Arma la consulta de una página (keyset) para psycopg2 (marcador "%s") o
+    asyncpg (marcador "$n"). Se pide una fila de más para saber si hay otra página.
+    """
+    params = []
+
+    def param(valor):
+        params.append(valor)
+        return marcador(len(params))
+
+    condiciones = []
+    if filtros.get("min_price") is not None:
+        condiciones.append(f"p.price >= {param(Decimal(str(filtros['min_price'])))}")
+    if filtros.get("max_price") is not None:
+        condiciones.append(f"p.price <= {param(Decimal(str(filtros['max_price'])))}")
+    # el stock de los normales usa idx_products_stock; los hot (pocos) idx_products_hot
+    for clave_filtro, operador in (("min_stock", ">="), ("max_stock", "<=")):
+        if filtros.get(clave_filtro) is not None:
+            valor = param(int(filtros[clave_filtro]))
+            condiciones.append(
+                f"((NOT p.hot AND p.stock {operador} {valor}) OR (p.hot AND {STOCK_BUCKETS} {operador} {valor}))"
+            )
+    if filtros.get("q"):
+        condiciones.append(f'lower(p.name) COLLATE "C" LIKE {param(_prefijo_like(filtros["q"]))}')
+
+    expresion, descendente = ORDENES_PRODUCTOS[orden]
+    if cursor is not None:
+        clave, producto_id = cursor
+        comparacion = "<" if descendente else ">"
+        if expresion == "p.id":
+            condiciones.append(f"p.id {comparacion} {param(producto_id)}")
+        else:
+            condiciones.append(f"({expresion}, p.id) {comparacion} ({param(clave)}, {param(producto_id)})")
+
+    direccion = "DESC" if descendente else "ASC"
+    sql = f"SELECT {COLUMNAS_PRODUCTOS}, {expresion} AS clave_orden FROM products p"
+    if condiciones:
+        sql += " WHERE " + " AND ".join(condiciones)
+    if expresion == "p.id":
+        sql += f" ORDER BY p.id {direccion}"
+    else:
+        sql += f" ORDER BY {expresion} {direccion}, p.id {direccion}"
+    sql += f" LIMIT {param(limit + 1)}"
+    return sql, params
+
+
+BUSQUEDA_MAX_RESULTADOS = cfg.get("BUSQUEDA_MAX_RESULTADOS", default=50, as_type=int)
+# tope de coincidencias que se ordenan por relevancia: una búsqueda muy amplia
+# ("a") no ordena medio catálogo, se rankea sobre los primeros candidatos
+BUSQUEDA_MAX_CANDIDATOS = cfg.get("BUSQUEDA_MAX_CANDIDATOS", default=1000, as_type=int)
+# similitud mínima (0..1) de trigramas para aceptar un resultado con errores de tipeo
+BUSQUEDA_SIMILITUD_MIN = cfg.get("BUSQUEDA_SIMILITUD_MIN", default=0.4, as_type=float)
+
+# texto completo: todos los términos, el último (o todos) como prefijo ("zapa" -> zapatilla)
+_BUSCAR_TEXTO = f"""
+    WITH candidatos AS (
+        SELECT p.id FROM products p
+        WHERE p.search @@ to_tsquery('simple', {{q}})
+        LIMIT {{candidatos}}
+    )
+    SELECT {COLUMNAS_PRODUCTOS}, ts_rank_cd(p.search, to_tsquery('simple', {{q}})) AS relevancia
+    FROM candidatos c JOIN products p ON p.id = c.id
+    ORDER BY relevancia DESC, p.id
+    LIMIT {{limit}}
+"""
+
+# tolerancia a errores: vecinos más cercanos por trigramas (KNN sobre el índice GiST).
+# word_similarity compara el texto buscado con la parte más parecida del nombre
+_BUSCAR_SIMILARES = f"""
+    SELECT * FROM (
+        SELECT {COLUMNAS_PRODUCTOS}, word_similarity({{texto}}, lower(p.name)) AS relevancia
+        FROM products p
+        WHERE p.id <> ALL({{excluir}}::int[])
+        ORDER BY {{texto}} <<-> lower(p.name)
+        LIMIT {{limit}}
+    ) s
+    WHERE s.relevancia >= {{minimo}}
+"""
+
+
+def _terminos(texto):
+    """Términos de búsqueda sin operadores de tsquery"""
+    return re.findall(r"[^\W_]+", texto.lower())
+
+
+def _tsquery(terminos):
+    return " & ".join(f"{t}:*" for t in terminos)
+
+
+def _armar_pagina(filas, limit):
+    siguiente = None
+    if len(filas) > limit:
+        filas = filas[:limit]
+        siguiente = codificar_cursor(filas[-1]["clave_orden"], filas[-1]["id"])
+    for fila in filas:
+        del fila["clave_orden"]
+    return filas, siguiente
+
+# cambios desde una versión: filas modificadas y bajas. Los productos hot se
+# incluyen siempre porque las compras descuentan sus buckets sin versionar la
+# fila (ver versiones.versionar_stock); son pocos, y así no vuelven a competir por ella.
+# También los de ordenes que el relay del outbox todavía no versionó
+SELECT_CAMBIOS = SELECT_PRODUCTOS + """
+    WHERE p.version > {since} OR p.hot OR p.id IN (
+        SELECT oi.product_id FROM order_outbox ob
+        JOIN order_items oi ON oi.order_id = ob.order_id
+        WHERE NOT ob.stock_versionado
+    )
+    ORDER BY p.id
+"""
+SELECT_BAJAS = "SELECT row_id FROM catalog_tombstones WHERE tabla = 'products' AND version > {since} ORDER BY row_id"
 
 class ProductoRepo:
+    def __init__(self):
+        self.reserva = ReservaStock()
+
     def findAll(self):
         with get_conn() as conn, conn.cursor() as cur:
-            cur.execute("SELECT * FROM products")
+            cur.execute(SELECT_PRODUCTOS)
             return cur.fetchall()
 
     def findById(self, producto_id):
         with get_conn() as conn, conn.cursor() as cur:
-            cur.execute("SELECT * FROM products WHERE id = %s", (producto_id,))
+            cur.execute(SELECT_PRODUCTOS + " WHERE p.id = %s", (producto_id,))
             return cur.fetchone()
 
+    def version(self):
+        with get_conn() as conn, conn.cursor() as cur:
+            return version_etag(*leer_version_productos(cur))
+
+    def findPage(self, filtros=None, orden="id", cursor=None, limit=None):
+        """
+        Página de productos con filtros y orden, paginada por keyset.
+
+        Args:
+            filtros: dict con min_price, max_price, min_stock, max_stock, q (prefijo del nombre)
+            orden: una de las claves de ORDENES_PRODUCTOS
+            cursor: el "siguiente" de la página anterior
+            limit: tamaño de página (máximo PRODUCTOS_MAX_PAGE_SIZE)
+
+        Returns:
+            dict: {"version": v, "productos": [...], "siguiente": cursor o None}, con v
+            la versión para el ETag (ver version_etag). Se lee antes que las filas:
+            pueden ser más nuevas que v, nunca más viejas.
+
+        Raises:
+            ValueError: Si el orden o el cursor no son válidos
+        """
+        if orden not in ORDENES_PRODUCTOS:
+            raise ValueError(f"Orden inválido: {orden}")
+        limit = min(limit or PRODUCTOS_PAGE_SIZE, PRODUCTOS_MAX_PAGE_SIZE)
+        cursor = decodificar_cursor(cursor, orden) if cursor else None
+        sql, params = _consulta_pagina(filtros or {}, orden, cursor, limit, lambda n: "%s")
+        with get_conn() as conn, conn.cursor() as cur:
+            version = version_etag(*leer_version_productos(cur))
+            cur.execute(sql, params)
+            productos, siguiente = _armar_pagina(cur.fetchall(), limit)
+            return {"version": version, "productos": productos, "siguiente": siguiente}
+
+    def search(self, texto, limit=None):
+        """
+        Busca productos por nombre, ordenados por relevancia. Primero por texto
+        completo (con prefijos); si no alcanza para `limit`, completa con los
+        nombres más parecidos por trigramas (errores de tipeo).
+        """
+        limit = min(limit or BUSQUEDA_MAX_RESULTADOS, BUSQUEDA_MAX_RESULTADOS)
+        terminos = _terminos(texto)
+        if not terminos:
+            return []
+        with get_conn() as conn, conn.cursor() as cur:
+            cur.execute(
+                _BUSCAR_TEXTO.format(q="%(q)s", candidatos="%(candidatos)s", limit="%(limit)s"),
+                {"q": _tsquery(terminos), "candidatos": BUSQUEDA_MAX_CANDIDATOS, "limit": limit}
+            )
+            resultados = cur.fetchall()
+            if len(resultados) < limit:
+                cur.execute(
+                    _BUSCAR_SIMILARES.format(
+                        texto="%(texto)s", excluir="%(excluir)s", limit="%(limit)s", minimo="%(minimo)s"
+                    ),
+                    {
+                        "texto": " ".join(terminos),
+                        "excluir": [r["id"] for r in resultados],
+                        "limit": limit - len(resultados),
+                        "minimo": BUSQUEDA_SIMILITUD_MIN,
+                    }
+                )
+                resultados.extend(cur.fetchall())
+            return resultados
+
+    def findChanges(self, since):
+        """
+        Productos modificados y ids borrados después de la versión `since`. Los
+        productos hot y los de ordenes sin versionar se incluyen siempre.
+        """
+        with get_conn() as conn, conn.cursor() as cur:
+            version, pendiente = leer_version_productos(cur)
+            if since >= version and pendiente is None:
+                return {"version": version, "productos": [], "eliminados": []}
+            cur.execute(SELECT_CAMBIOS.format(since="%s"), (since,))
+            productos = cur.fetchall()
+            cur.execute(SELECT_BAJAS.format(since="%s"), (since,))
+            eliminados = [fila["row_id"] for fila in cur.fetchall()]
+            return {"version": version, "productos": productos, "eliminados": eliminados}
+
     def save(self, producto_data):
         with get_conn() as conn, conn.cursor() as cur:
             cur.execute(
-                "INSERT INTO products (name, price, stock) VALUES (%s, %s, %s) RETURNING *",
+                "INSERT INTO products (name, price, stock) VALUES (%s, %s, %s) RETURNING " + COLUMNAS_ESCRITURA,
                 (producto_data["name"], producto_data["price"], producto_data["stock"])
             )
+            producto = cur.fetchone()
+            producto["version"] = incrementar_version(cur, "products", [producto["id"]])
+            notificar(cur, "productos", [producto["id"]])
             conn.commit()
-            return cur.fetchone()
+            return producto
 
     def update(self, producto_id, producto_data):
         with get_conn() as conn, conn.cursor() as cur:
             cur.execute(
-                "UPDATE products SET name=%s, price=%s, stock=%s WHERE id=%s RETURNING *",
+                "UPDATE products SET name=%s, price=%s, stock=%s WHERE id=%s RETURNING " + COLUMNAS_ESCRITURA,
                 (producto_data["name"], producto_data["price"], producto_data["stock"], producto_id)
             )
+            producto = cur.fetchone()
+            if producto and producto["hot"]:
+                # el stock nuevo se vuelve a repartir entre los buckets
+                self.reserva.repartir(cur, producto_id, producto_data["stock"])
+            if producto:
+                producto["version"] = incrementar_version(cur, "products", [producto_id])
+                notificar(cur, "productos", [producto_id])
             conn.commit()
-            return cur.fetchone()
+            return producto
+
+    def marcarHot(self, producto_id, hot, buckets=None):
+        """Activa/desactiva el stock repartido en buckets para un producto"""
+        with get_conn() as conn, conn.cursor() as cur:
+            if hot:
+                encontrado = self.reserva.marcar_hot(cur, producto_id, buckets)
+            else:
+                encontrado = self.reserva.desmarcar_hot(cur, producto_id)
+            if encontrado:
+                incrementar_version(cur, "products", [producto_id])
+                notificar(cur, "productos", [producto_id])
+            conn.commit()
+        return self.findById(producto_id) if encontrado else None
 
     def delete(self, producto_id):
         with get_conn() as conn, conn.cursor() as cur:
             cur.execute("DELETE FROM products WHERE id=%s RETURNING id", (producto_id,))
+            eliminado = cur.fetchone()
+            if eliminado:
+                registrar_borrado(cur, "products", producto_id)
+                notificar(cur, "productos", [producto_id])
             conn.commit()
-            return cur.fetchone()
\ No newline at end of file
+            return eliminado
+
+
+class ProductoRepoAsync:
+    """Versión async de ProductoRepo (asyncpg) para los handlers `async def`"""
+
+    def __init__(self):
+        self.reserva = ReservaStockAsync()
+
+    async def findAll(self):
+        async with async_db.get_conn() as conn:
+            rows = await conn.fetch(SELECT_PRODUCTOS)
+            return async_db.to_dicts(rows)
+
+    async def findById(self, producto_id):
+        async with async_db.get_conn() as conn:
+            row = await conn.fetchrow(SELECT_PRODUCTOS + " WHERE p.id = $1", producto_id)
+            return async_db.to_dict(row)
+
+    async def version(self):
+        async with async_db.get_conn() as conn:
+            return version_etag(*await leer_version_productos_async(conn))
+
+    async def findPage(self, filtros=None, orden="id", cursor=None, limit=None):
+        """Igual que ProductoRepo.findPage"""
+        if orden not in ORDENES_PRODUCTOS:
+            raise ValueError(f"Orden inválido: {orden}")
+        limit = min(limit or PRODUCTOS_PAGE_SIZE, PRODUCTOS_MAX_PAGE_SIZE)
+        cursor = decodificar_cursor(cursor, orden) if cursor else None
+        sql, params = _consulta_pagina(filtros or {}, orden, cursor, limit, lambda n: f"${n}")
+        async with async_db.get_conn() as conn:
+            version = version_etag(*await leer_version_productos_async(conn))
+            rows = await conn.fetch(sql, *params)
+            productos, siguiente = _armar_pagina(async_db.to_dicts(rows), limit)
+            return {"version": version, "productos": productos, "siguiente": siguiente}
+
+    async def search(self, texto, limit=None):
+        """Igual que ProductoRepo.search"""
+        limit = min(limit or BUSQUEDA_MAX_RESULTADOS, BUSQUEDA_MAX_RESULTADOS)
+        terminos = _terminos(texto)
+        if not terminos:
+            return []
+        async with async_db.get_conn() as conn:
+            rows = await conn.fetch(
+                _BUSCAR_TEXTO.format(q="$1", candidatos="$2", limit="$3"),
+                _tsquery(terminos), BUSQUEDA_MAX_CANDIDATOS, limit
+            )
+            resultados = async_db.to_dicts(rows)
+            if len(resultados) < limit:
+                rows = await conn.fetch(
+                    _BUSCAR_SIMILARES.format(texto="$1", excluir="$2", limit="$3", minimo="$4"),
+                    " ".join(terminos), [r["id"] for r in resultados],
+                    limit - len(resultados), BUSQUEDA_SIMILITUD_MIN
+                )
+                resultados.extend(async_db.to_dicts(rows))
+            return resultados
+
+    async def findChanges(self, since):
+        async with async_db.get_conn() as conn:
+            version, pendiente = await leer_version_productos_async(conn)
+            if since >= version and pendiente is None:
+                return {"version": version, "productos": [], "eliminados": []}
+            productos = await conn.fetch(SELECT_CAMBIOS.format(since="$1"), since)
+            eliminados = await conn.fetch(SELECT_BAJAS.format(since="$1"), since)
+            return {
+                "version": version,
+                "productos": async_db.to_dicts(productos),
+                "eliminados": [row["row_id"] for row in eliminados],
+            }
+
+    async def save(self, producto_data):
+        async with async_db.get_conn() as conn, conn.transaction():
+            row = await conn.fetchrow(
+                "INSERT INTO products (name, price, stock) VALUES ($1, $2, $3) RETURNING " + COLUMNAS_ESCRITURA,
+                producto_data["name"], producto_data["price"], producto_data["stock"]
+            )
+            producto = async_db.to_dict(row)
+            producto["version"] = await incrementar_version_async(conn, "products", [producto["id"]])
+            await notificar_async(conn, "productos", [producto["id"]])
+            return producto
+
+    async def update(self, producto_id, producto_data):
+        async with async_db.get_conn() as conn, conn.transaction():
+            row = await conn.fetchrow(
+                "UPDATE products SET name=$1, price=$2, stock=$3 WHERE id=$4 RETURNING " + COLUMNAS_ESCRITURA,
+                producto_data["name"], producto_data["price"], producto_data["stock"], producto_id
+            )
+            if row and row["hot"]:
+                await self.reserva.repartir(conn, producto_id, producto_data["stock"])
+            producto = async_db.to_dict(row)
+            if producto:
+                producto["version"] = await incrementar_version_async(conn, "products", [producto_id])
+                await notificar_async(conn, "productos", [producto_id])
+            return producto
+
+    async def delete(self, producto_id):
+        async with async_db.get_conn() as conn, conn.transaction():
+            row = await conn.fetchrow("DELETE FROM products WHERE id=$1 RETURNING id", producto_id)
+            if row:
+                await registrar_borrado_async(conn, "products", producto_id)
+                await notificar_async(conn, "productos", [producto_id])
+            return async_db.to_dict(row)
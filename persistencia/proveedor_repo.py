@@ -1,4 +1,10 @@
 from persistencia.db import get_conn
+from persistencia import async_db
+from persistencia.invalidacion import notificar, notificar_async
+from persistencia.versiones import (
+    incrementar_version, incrementar_version_async, registrar_borrado, registrar_borrado_async,
+    leer_version, leer_version_async,
+)
 
 class ProveedorRepo:
     def findAll(self):
@@ -11,14 +17,29 @@ class ProveedorRepo:
             cur.execute("SELECT * FROM proveedores WHERE id = %s", (proveedor_id,))
             return cur.fetchone()
 
+    def version(self):
+        with get_conn() as conn, conn.cursor() as cur:
+            return leer_version(cur, "proveedores")
+
+    def findAllVersionado(self):
+        """Retorna {"version": v, "proveedores": [...]}; la versión se lee antes que las filas"""
+        with get_conn() as conn, conn.cursor() as cur:
+            version = leer_version(cur, "proveedores")
+            cur.execute("SELECT * FROM proveedores")
+            return {"version": version, "proveedores": cur.fetchall()}
+
     def save(self, proveedor_data):
         with get_conn() as conn, conn.cursor() as cur:
             cur.execute(
                 "INSERT INTO proveedores (nombre, contacto, email) VALUES (%s, %s, %s) RETURNING *",
                 (proveedor_data["nombre"], proveedor_data["contacto"], proveedor_data["email"])
             )
+            fila = cur.fetchone()
+            if fila:
+                fila["version"] = incrementar_version(cur, "proveedores", [fila["id"]])
+                notificar(cur, "proveedores", [fila["id"]])
             conn.commit()
-            return cur.fetchone()
+            return fila
 
     def update(self, proveedor_id, proveedor_data):
         with get_conn() as conn, conn.cursor() as cur:
@@ -26,11 +47,75 @@ class ProveedorRepo:
                 "UPDATE proveedores SET nombre=%s, contacto=%s, email=%s WHERE id=%s RETURNING *",
                 (proveedor_data["nombre"], proveedor_data["contacto"], proveedor_data["email"], proveedor_id)
             )
+            fila = cur.fetchone()
+            if fila:
+                fila["version"] = incrementar_version(cur, "proveedores", [fila["id"]])
+                notificar(cur, "proveedores", [fila["id"]])
             conn.commit()
-            return cur.fetchone()
+            return fila
 
     def delete(self, proveedor_id):
         with get_conn() as conn, conn.cursor() as cur:
             cur.execute("DELETE FROM proveedores WHERE id=%s RETURNING id", (proveedor_id,))
+            fila = cur.fetchone()
+            if fila:
+                registrar_borrado(cur, "proveedores", fila["id"])
+                notificar(cur, "proveedores", [fila["id"]])
             conn.commit()
-            return cur.fetchone()
\ No newline at end of file
+            return fila
+
+
+class ProveedorRepoAsync:
+    """Versión async de ProveedorRepo (asyncpg) para los handlers `async def`"""
+
+    async def findAll(self):
+        async with async_db.get_conn() as conn:
+            rows = await conn.fetch("SELECT * FROM proveedores")
+            return async_db.to_dicts(rows)
+
+    async def findById(self, proveedor_id):
+        async with async_db.get_conn() as conn:
+            row = await conn.fetchrow("SELECT * FROM proveedores WHERE id = $1", proveedor_id)
+            return async_db.to_dict(row)
+
+    async def version(self):
+        async with async_db.get_conn() as conn:
+            return await leer_version_async(conn, "proveedores")
+
+    async def findAllVersionado(self):
+        async with async_db.get_conn() as conn:
+            version = await leer_version_async(conn, "proveedores")
+            rows = await conn.fetch("SELECT * FROM proveedores")
+            return {"version": version, "proveedores": async_db.to_dicts(rows)}
+
+    async def save(self, proveedor_data):
+        async with async_db.get_conn() as conn, conn.transaction():
+            row = await conn.fetchrow(
+                "INSERT INTO proveedores (nombre, contacto, email) VALUES ($1, $2, $3) RETURNING *",
+                proveedor_data["nombre"], proveedor_data["contacto"], proveedor_data["email"]
+            )
+            proveedor = async_db.to_dict(row)
+            if proveedor:
+                proveedor["version"] = await incrementar_version_async(conn, "proveedores", [proveedor["id"]])
+                await notificar_async(conn, "proveedores", [proveedor["id"]])
+            return proveedor
+
+    async def update(self, proveedor_id, proveedor_data):
+        async with async_db.get_conn() as conn, conn.transaction():
+            row = await conn.fetchrow(
+                "UPDATE proveedores SET nombre=$1, contacto=$2, email=$3 WHERE id=$4 RETURNING *",
+                proveedor_data["nombre"], proveedor_data["contacto"], proveedor_data["email"], proveedor_id
+            )
+            proveedor = async_db.to_dict(row)
+            if proveedor:
+                proveedor["version"] = await incrementar_version_async(conn, "proveedores", [proveedor["id"]])
+                await notificar_async(conn, "proveedores", [proveedor["id"]])
+            return proveedor
+
+    async def delete(self, proveedor_id):
+        async with async_db.get_conn() as conn, conn.transaction():
+            row = await conn.fetchrow("DELETE FROM proveedores WHERE id=$1 RETURNING id", proveedor_id)
+            if row:
+                await registrar_borrado_async(conn, "proveedores", row["id"])
+                await notificar_async(conn, "proveedores", [row["id"]])
+            return async_db.to_dict(row)
@@ -0,0 +1,421 @@
+"""
+Reserva de stock con protección contra sobreventa.
+
+- Productos normales: descuento condicional (`stock >= cantidad`) de todos los
+  productos en un solo UPDATE, con las filas bloqueadas en orden de id.
+- Productos "hot" (marcados para ventas flash): el stock se reparte en varios
+  buckets (product_stock_buckets) y cada reserva descuenta de un bucket libre
+  elegido al azar (FOR UPDATE SKIP LOCKED), así muchas transacciones
+  concurrentes sobre el mismo producto no se serializan en una sola fila.
+
+Las operaciones reciben el cursor (psycopg2) o la conexión (asyncpg) de la
+transacción de la orden; si falta stock lanzan ErrorStockInsuficiente y la
+transacción completa se deshace.
+"""
+import re
+import time
+import random
+import asyncio
+import threading
+from collections import deque
+from functools import lru_cache
+
+from infraestructura.config_store import cfg
+
+STOCK_HOT_BUCKETS = cfg.get("STOCK_HOT_BUCKETS", default=8, as_type=int)
+STOCK_HOT_REINTENTOS = cfg.get("STOCK_HOT_REINTENTOS", default=5, as_type=int)
+STOCK_HOT_BACKOFF_MS = cfg.get("STOCK_HOT_BACKOFF_MS", default=2, as_type=float)
+
+
+# error cuando no hay stock suficiente para uno o más productos
+class ErrorStockInsuficiente(Exception):
+    def __init__(self, producto_ids):
+        self.producto_ids = list(producto_ids)
+        super().__init__(f"Stock insuficiente para los productos {self.producto_ids}")
+
+
+# --- SQL (las plantillas se formatean para psycopg2 y para asyncpg) ---
+
+# bloquea (en orden de id) solo los productos normales; los hot no se bloquean.
+# FOR NO KEY UPDATE (no FOR UPDATE): el descuento no toca columnas clave, y así
+# no choca con el FOR KEY SHARE de los FK de order_items de otras ordenes
+_BLOQUEAR_NORMALES = """
+    SELECT id FROM products
+    WHERE id = ANY({ids}::int[]) AND NOT hot
+    ORDER BY id
+    FOR NO KEY UPDATE
+"""
+
+# descuento condicional: solo se actualizan las filas con stock suficiente
+_DESCONTAR_NORMALES = """
+    UPDATE products p SET stock = p.stock - x.quantity
+    FROM unnest({ids}::int[], {cantidades}::int[]) AS x(product_id, quantity)
+    WHERE p.id = x.product_id AND p.stock >= x.quantity
+    RETURNING p.id
+"""
+
+# toma un bucket cualquiera con stock suficiente que no esté bloqueado por otra transacción
+_DESCONTAR_BUCKET = """
+    UPDATE product_stock_buckets b SET stock = b.stock - {cantidad}
+    WHERE (b.product_id, b.bucket) = (
+        SELECT product_id, bucket FROM product_stock_buckets
+        WHERE product_id = {id} AND stock >= {cantidad2}
+        ORDER BY random()
+        LIMIT 1
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING b.bucket
+"""
+
+_RESUMEN_BUCKETS = """
+    SELECT COALESCE(SUM(stock), 0) AS total, COALESCE(MAX(stock), 0) AS maximo
+    FROM product_stock_buckets WHERE product_id = {id}
+"""
+
+# camino lento: el stock está repartido en buckets que por separado no alcanzan
+_BLOQUEAR_BUCKETS = """
+    SELECT bucket, stock FROM product_stock_buckets
+    WHERE product_id = {id}
+    ORDER BY bucket
+    FOR UPDATE
+"""
+
+_DESCONTAR_VARIOS_BUCKETS = """
+    UPDATE product_stock_buckets b SET stock = b.stock - x.cantidad
+    FROM unnest({buckets}::int[], {cantidades}::int[]) AS x(bucket, cantidad)
+    WHERE b.product_id = {id} AND b.bucket = x.bucket
+"""
+
+# reserva por lotes (ingesta masiva): se bloquean todas las filas involucradas
+_BLOQUEAR_NORMALES_CON_STOCK = """
+    SELECT id, stock FROM products
+    WHERE id = ANY({ids}::int[]) AND NOT hot
+    ORDER BY id
+    FOR NO KEY UPDATE
+"""
+
+_BLOQUEAR_BUCKETS_DE_PRODUCTOS = """
+    SELECT product_id, bucket, stock FROM product_stock_buckets
+    WHERE product_id = ANY({ids}::int[])
+    ORDER BY product_id, bucket
+    FOR UPDATE
+"""
+
+_DESCONTAR_BUCKETS_DE_PRODUCTOS = """
+    UPDATE product_stock_buckets b SET stock = b.stock - x.cantidad
+    FROM unnest({ids}::int[], {buckets}::int[], {cantidades}::int[]) AS x(product_id, bucket, cantidad)
+    WHERE b.product_id = x.product_id AND b.bucket = x.bucket
+"""
+
+_REPARTIR_EN_BUCKETS = """
+    INSERT INTO product_stock_buckets (product_id, bucket, stock)
+    SELECT {id}::int, g - 1, ({stock}::int / {n}::int) + CASE WHEN g <= ({stock2}::int % {n2}::int) THEN 1 ELSE 0 END
+    FROM generate_series(1, {n3}::int) AS g
+"""
+
+
+@lru_cache(maxsize=None)
+def _pg(sql):
+    """Plantilla -> SQL con placeholders de psycopg2"""
+    return re.sub(r"\{\w+\}", "%s", sql)
+
+
+@lru_cache(maxsize=None)
+def _apg(sql):
+    """Plantilla -> SQL con placeholders numerados de asyncpg ($1, $2, ...)"""
+    contador = iter(range(1, 100))
+    return re.sub(r"\{\w+\}", lambda _: f"${next(contador)}", sql)
+
+
+def _repartir_greedy(buckets, cantidad):
+    """Reparte `cantidad` entre buckets [(bucket, stock)] tomando de los más llenos"""
+    tomas = []
+    for bucket, stock in sorted(buckets, key=lambda b: -b[1]):
+        if cantidad <= 0:
+            break
+        toma = min(stock, cantidad)
+        if toma > 0:
+            tomas.append((bucket, toma))
+            cantidad -= toma
+    return tomas
+
+
+class EstadisticasReserva:
+    """Contadores de reservas compartidos por las implementaciones sync y async"""
+
+    VENTANA_SEG = 60
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reservas_ok = 0
+        self.reservas_rechazadas = 0
+        self.reservas_hot = 0
+        self.conflictos = 0
+        self.reintentos = 0
+        self.rebalanceos = 0
+        self._recientes = deque()  # [segundo, reservas ok en ese segundo] dentro de la ventana
+
+    def _registrar(self, **incrementos):
+        with self._lock:
+            for nombre, valor in incrementos.items():
+                setattr(self, nombre, getattr(self, nombre) + valor)
+            if incrementos.get("reservas_ok"):
+                segundo = int(time.time())
+                if self._recientes and self._recientes[-1][0] == segundo:
+                    self._recientes[-1][1] += incrementos["reservas_ok"]
+                else:
+                    self._recientes.append([segundo, incrementos["reservas_ok"]])
+
+    def obtener_estadisticas(self) -> dict:
+        with self._lock:
+            limite = int(time.time()) - self.VENTANA_SEG
+            while self._recientes and self._recientes[0][0] < limite:
+                self._recientes.popleft()
+            return {
+                "reservas_ok": self.reservas_ok,
+                "reservas_rechazadas": self.reservas_rechazadas,
+                "reservas_hot": self.reservas_hot,
+                "conflictos": self.conflictos,
+                "reintentos": self.reintentos,
+                "rebalanceos": self.rebalanceos,
+                "reservas_por_seg": round(sum(n for _, n in self._recientes) / self.VENTANA_SEG, 2),
+            }
+
+
+estadisticas = EstadisticasReserva()
+
+
+class ReservaStock:
+    """Reserva de stock dentro de una transacción psycopg2"""
+
+    def reservar(self, cur, producto_ids, cantidades):
+        """
+        Descuenta `cantidades` de `producto_ids` (ordenados por id, sin repetidos).
+
+        Raises:
+            ErrorStockInsuficiente: Si algún producto no tiene stock suficiente
+        """
+        if any(cantidad <= 0 for cantidad in cantidades):
+            raise ValueError("Las cantidades a reservar deben ser positivas")
+        pedidos = dict(zip(producto_ids, cantidades))
+        cur.execute(_pg(_BLOQUEAR_NORMALES), (producto_ids,))
+        normales = [row["id"] for row in cur.fetchall()]
+
+        faltantes = []
+        if normales:
+            cur.execute(_pg(_DESCONTAR_NORMALES), (normales, [pedidos[i] for i in normales]))
+            descontados = {row["id"] for row in cur.fetchall()}
+            faltantes = [i for i in normales if i not in descontados]
+
+        if not faltantes:
+            # el resto son productos hot (o inexistentes, que fallan igual por falta de stock)
+            normales_set = set(normales)
+            for producto_id in producto_ids:
+                if producto_id not in normales_set and not self._reservar_hot(cur, producto_id, pedidos[producto_id]):
+                    faltantes.append(producto_id)
+                    break
+
+        if faltantes:
+            estadisticas._registrar(reservas_rechazadas=1)
+            raise ErrorStockInsuficiente(faltantes)
+        estadisticas._registrar(reservas_ok=1)
+
+    def _reservar_hot(self, cur, producto_id, cantidad):
+        for intento in range(STOCK_HOT_REINTENTOS + 1):
+            cur.execute(_pg(_DESCONTAR_BUCKET), (cantidad, producto_id, cantidad))
+            if cur.fetchone():
+                estadisticas._registrar(reservas_hot=1)
+                return True
+
+            cur.execute(_pg(_RESUMEN_BUCKETS), (producto_id,))
+            resumen = cur.fetchone()
+            if resumen["total"] < cantidad:
+                return False
+            if resumen["maximo"] < cantidad:
+                # ningún bucket alcanza por sí solo: se toma de varios
+                return self._reservar_repartido(cur, producto_id, cantidad)
+
+            # hay un bucket con stock pero estaba bloqueado por otra transacción
+            estadisticas._registrar(conflictos=1)
+            if intento < STOCK_HOT_REINTENTOS:
+                estadisticas._registrar(reintentos=1)
+                time.sleep(random.uniform(0, STOCK_HOT_BACKOFF_MS * (2 ** intento)) / 1000.0)
+        # sin bucket libre después de los reintentos: se espera el lock
+        return self._reservar_repartido(cur, producto_id, cantidad)
+
+    def _reservar_repartido(self, cur, producto_id, cantidad):
+        estadisticas._registrar(rebalanceos=1)
+        cur.execute(_pg(_BLOQUEAR_BUCKETS), (producto_id,))
+        buckets = [(row["bucket"], row["stock"]) for row in cur.fetchall()]
+        if sum(stock for _, stock in buckets) < cantidad:
+            return False
+        tomas = _repartir_greedy(buckets, cantidad)
+        cur.execute(
+            _pg(_DESCONTAR_VARIOS_BUCKETS),
+            ([b for b, _ in tomas], [c for _, c in tomas], producto_id)
+        )
+        estadisticas._registrar(reservas_hot=1)
+        return True
+
+    def reservar_lote(self, cur, pedidos):
+        """
+        Reserva el stock de muchas ordenes a la vez con sentencias por conjunto.
+
+        Las ordenes se atienden en el orden recibido: una orden sin stock
+        suficiente se rechaza sola, sin afectar a las demás.
+
+        Args:
+            pedidos: Lista de dicts {product_id: cantidad}, uno por orden
+
+        Returns:
+            list: Por cada pedido, None si se reservó o la lista de product_ids sin stock
+        """
+        ids = sorted({producto_id for pedido in pedidos for producto_id in pedido})
+        if not ids:
+            return [None] * len(pedidos)
+
+        cur.execute(_pg(_BLOQUEAR_NORMALES_CON_STOCK), (ids,))
+        disponible = {row["id"]: row["stock"] for row in cur.fetchall()}
+        normales = set(disponible)
+
+        buckets = {}
+        hot_ids = [i for i in ids if i not in normales]
+        if hot_ids:
+            cur.execute(_pg(_BLOQUEAR_BUCKETS_DE_PRODUCTOS), (hot_ids,))
+            for row in cur.fetchall():
+                buckets.setdefault(row["product_id"], []).append((row["bucket"], row["stock"]))
+                disponible[row["product_id"]] = disponible.get(row["product_id"], 0) + row["stock"]
+
+        resultados = []
+        consumido = {}
+        for pedido in pedidos:
+            faltantes = [pid for pid, cantidad in pedido.items() if disponible.get(pid, 0) < cantidad]
+            if faltantes:
+                resultados.append(faltantes)
+                continue
+            for pid, cantidad in pedido.items():
+                disponible[pid] -= cantidad
+                consumido[pid] = consumido.get(pid, 0) + cantidad
+            resultados.append(None)
+
+        descontar_normales = sorted(pid for pid in consumido if pid in normales)
+        if descontar_normales:
+            cur.execute(
+                _pg(_DESCONTAR_NORMALES),
+                (descontar_normales, [consumido[pid] for pid in descontar_normales])
+            )
+        tomas = [
+            (pid, bucket, cantidad)
+            for pid in sorted(consumido) if pid in buckets
+            for bucket, cantidad in _repartir_greedy(buckets[pid], consumido[pid])
+        ]
+        if tomas:
+            cur.execute(
+                _pg(_DESCONTAR_BUCKETS_DE_PRODUCTOS),
+                ([t[0] for t in tomas], [t[1] for t in tomas], [t[2] for t in tomas])
+            )
+
+        rechazadas = sum(1 for r in resultados if r is not None)
+        estadisticas._registrar(reservas_ok=len(resultados) - rechazadas, reservas_rechazadas=rechazadas)
+        return resultados
+
+    def repartir(self, cur, producto_id, stock, buckets=None):
+        """Reemplaza los buckets de un producto hot repartiendo `stock` entre ellos"""
+        n = buckets or STOCK_HOT_BUCKETS
+        cur.execute("DELETE FROM product_stock_buckets WHERE product_id = %s", (producto_id,))
+        cur.execute(_pg(_REPARTIR_EN_BUCKETS), (producto_id, stock, n, stock, n, n))
+        cur.execute("UPDATE products SET stock = 0 WHERE id = %s", (producto_id,))
+
+    def marcar_hot(self, cur, producto_id, buckets=None):
+        """Pasa el stock del producto a buckets para repartir la contención"""
+        cur.execute("SELECT stock, hot FROM products WHERE id = %s FOR NO KEY UPDATE", (producto_id,))
+        producto = cur.fetchone()
+        if not producto or producto["hot"]:
+            return producto
+        cur.execute("UPDATE products SET hot = TRUE WHERE id = %s", (producto_id,))
+        self.repartir(cur, producto_id, producto["stock"], buckets)
+        return producto
+
+    def desmarcar_hot(self, cur, producto_id):
+        """Vuelve a juntar el stock de los buckets en products.stock"""
+        cur.execute("SELECT hot FROM products WHERE id = %s FOR NO KEY UPDATE", (producto_id,))
+        producto = cur.fetchone()
+        if not producto or not producto["hot"]:
+            return producto
+        cur.execute(_pg(_BLOQUEAR_BUCKETS), (producto_id,))
+        total = sum(row["stock"] for row in cur.fetchall())
+        cur.execute("DELETE FROM product_stock_buckets WHERE product_id = %s", (producto_id,))
+        cur.execute("UPDATE products SET hot = FALSE, stock = %s WHERE id = %s", (total, producto_id))
+        return producto
+
+
+class ReservaStockAsync:
+    """Reserva de stock dentro de una transacción asyncpg"""
+
+    async def reservar(self, conn, producto_ids, cantidades):
+        """
+        Descuenta `cantidades` de `producto_ids` (ordenados por id, sin repetidos).
+
+        Raises:
+            ErrorStockInsuficiente: Si algún producto no tiene stock suficiente
+        """
+        if any(cantidad <= 0 for cantidad in cantidades):
+            raise ValueError("Las cantidades a reservar deben ser positivas")
+        pedidos = dict(zip(producto_ids, cantidades))
+        normales = [row["id"] for row in await conn.fetch(_apg(_BLOQUEAR_NORMALES), producto_ids)]
+
+        faltantes = []
+        if normales:
+            rows = await conn.fetch(_apg(_DESCONTAR_NORMALES), normales, [pedidos[i] for i in normales])
+            descontados = {row["id"] for row in rows}
+            faltantes = [i for i in normales if i not in descontados]
+
+        if not faltantes:
+            normales_set = set(normales)
+            for producto_id in producto_ids:
+                if producto_id not in normales_set and not await self._reservar_hot(conn, producto_id, pedidos[producto_id]):
+                    faltantes.append(producto_id)
+                    break
+
+        if faltantes:
+            estadisticas._registrar(reservas_rechazadas=1)
+            raise ErrorStockInsuficiente(faltantes)
+        estadisticas._registrar(reservas_ok=1)
+
+    async def _reservar_hot(self, conn, producto_id, cantidad):
+        for intento in range(STOCK_HOT_REINTENTOS + 1):
+            if await conn.fetchrow(_apg(_DESCONTAR_BUCKET), cantidad, producto_id, cantidad):
+                estadisticas._registrar(reservas_hot=1)
+                return True
+
+            resumen = await conn.fetchrow(_apg(_RESUMEN_BUCKETS), producto_id)
+            if resumen["total"] < cantidad:
+                return False
+            if resumen["maximo"] < cantidad:
+                return await self._reservar_repartido(conn, producto_id, cantidad)
+
+            estadisticas._registrar(conflictos=1)
+            if intento < STOCK_HOT_REINTENTOS:
+                estadisticas._registrar(reintentos=1)
+                await asyncio.sleep(random.uniform(0, STOCK_HOT_BACKOFF_MS * (2 ** intento)) / 1000.0)
+        return await self._reservar_repartido(conn, producto_id, cantidad)
+
+    async def _reservar_repartido(self, conn, producto_id, cantidad):
+        estadisticas._registrar(rebalanceos=1)
+        buckets = [(row["bucket"], row["stock"]) for row in await conn.fetch(_apg(_BLOQUEAR_BUCKETS), producto_id)]
+        if sum(stock for _, stock in buckets) < cantidad:
+            return False
+        tomas = _repartir_greedy(buckets, cantidad)
+        await conn.execute(
+            _apg(_DESCONTAR_VARIOS_BUCKETS),
+            [b for b, _ in tomas], [c for _, c in tomas], producto_id
+        )
+        estadisticas._registrar(reservas_hot=1)
+        return True
+
+    async def repartir(self, conn, producto_id, stock, buckets=None):
+        """Reemplaza los buckets de un producto hot repartiendo `stock` entre ellos"""
+        n = buckets or STOCK_HOT_BUCKETS
+        await conn.execute("DELETE FROM product_stock_buckets WHERE product_id = $1", producto_id)
+        await conn.execute(_apg(_REPARTIR_EN_BUCKETS), producto_id, stock, n, stock, n, n)
+        await conn.execute("UPDATE products SET stock = 0 WHERE id = $1", producto_id)
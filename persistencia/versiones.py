@@ -0,0 +1,132 @@
+"""
+Versiones del catálogo (products, proveedores) para ETags y consultas de cambios.
+
+Cada escritura incrementa el contador de su tabla en catalog_versions y guarda
+el valor nuevo en la columna `version` de las filas que modificó. Como el
+UPDATE del contador bloquea esa fila hasta el commit, las versiones quedan en
+el mismo orden que los commits: quien leyó la versión N ya ve todos los
+cambios <= N, y "dame lo cambiado desde N" no se saltea nada.
+Conviene incrementar la versión lo más tarde posible en la transacción para
+tener ese bloqueo el menor tiempo posible.
+
+Las ordenes cambian el stock pero no tocan el contador: serializaría todas las
+compras (incluso las de productos hot) en esa fila. El relay del outbox
+versiona después del commit, en lotes, el stock de las ordenes nuevas
+(versionar_stock). Para no depender del relay (apagado, trabado o atrasado),
+la versión de "products" se lee junto con el id más alto del outbox todavía
+sin versionar (leer_version_productos): el ETag cambia en el mismo commit de
+la orden y /productos/changes devuelve los productos de esas ordenes hasta que
+el relay les asigne versión.
+"""
+
+_INCREMENTAR = "UPDATE catalog_versions SET version = version + 1 WHERE tabla = %s RETURNING version"
+_INCREMENTAR_ASYNC = "UPDATE catalog_versions SET version = version + 1 WHERE tabla = $1 RETURNING version"
+
+_TOMBSTONE = """
+    INSERT INTO catalog_tombstones (tabla, row_id, version) VALUES (%s, %s, %s)
+    ON CONFLICT (tabla, row_id) DO UPDATE SET version = EXCLUDED.version
+"""
+_TOMBSTONE_ASYNC = """
+    INSERT INTO catalog_tombstones (tabla, row_id, version) VALUES ($1, $2, $3)
+    ON CONFLICT (tabla, row_id) DO UPDATE SET version = EXCLUDED.version
+"""
+
+_PRODUCTOS_DE_ORDENES = """
+    SELECT DISTINCT product_id FROM order_items
+    WHERE order_id = ANY(%s::int[])
+    ORDER BY product_id
+"""
+
+# los productos hot no se versionan por fila (volvería a bloquearse la fila del
+# producto que los buckets evitan); /productos/changes los incluye siempre.
+# Las filas se bloquean antes que el contador, en el mismo orden que las
+# escrituras de ProductoRepo (fila -> contador), para no cruzarse con ellas
+_BLOQUEAR_NO_HOT = "SELECT id FROM products WHERE id = ANY(%s::int[]) AND NOT hot ORDER BY id FOR NO KEY UPDATE"
+
+# versión del catálogo de productos y la orden más nueva cuyo stock todavía no
+# se versionó (usa idx_order_outbox_sin_versionar)
+_VERSION_PRODUCTOS = """
+    SELECT (SELECT version FROM catalog_versions WHERE tabla = 'products') AS version,
+           (SELECT max(id) FROM order_outbox WHERE NOT stock_versionado) AS pendiente
+"""
+
+# solo tablas conocidas: el nombre se interpola en el UPDATE de la fila
+_TABLAS = ("products", "proveedores")
+
+
+def incrementar_version(cur, tabla, row_ids=()):
+    """Incrementa la versión de `tabla` y la asigna a las filas `row_ids`; retorna la versión nueva"""
+    assert tabla in _TABLAS
+    cur.execute(_INCREMENTAR, (tabla,))
+    version = cur.fetchone()["version"]
+    if row_ids:
+        cur.execute(
+            f"UPDATE {tabla} SET version = %s WHERE id = ANY(%s::int[])",
+            (version, list(row_ids))
+        )
+    return version
+
+
+async def incrementar_version_async(conn, tabla, row_ids=()):
+    assert tabla in _TABLAS
+    version = await conn.fetchval(_INCREMENTAR_ASYNC, tabla)
+    if row_ids:
+        await conn.execute(f"UPDATE {tabla} SET version = $1 WHERE id = ANY($2::int[])", version, list(row_ids))
+    return version
+
+
+def versionar_stock(cur, orden_ids):
+    """
+    Sube la versión de "products" por el stock que movieron las ordenes
+    `orden_ids` (ya confirmadas) y la asigna a sus productos. Retorna los ids
+    de los productos afectados.
+    """
+    cur.execute(_PRODUCTOS_DE_ORDENES, (list(orden_ids),))
+    producto_ids = [fila["product_id"] for fila in cur.fetchall()]
+    if producto_ids:
+        cur.execute(_BLOQUEAR_NO_HOT, (producto_ids,))
+        incrementar_version(cur, "products", [fila["id"] for fila in cur.fetchall()])
+    return producto_ids
+
+
+def registrar_borrado(cur, tabla, row_id):
+    """Incrementa la versión y deja constancia del borrado de `row_id`"""
+    version = incrementar_version(cur, tabla)
+    cur.execute(_TOMBSTONE, (tabla, row_id, version))
+    return version
+
+
+async def registrar_borrado_async(conn, tabla, row_id):
+    version = await incrementar_version_async(conn, tabla)
+    await conn.execute(_TOMBSTONE_ASYNC, tabla, row_id, version)
+    return version
+
+
+def leer_version(cur, tabla):
+    cur.execute("SELECT version FROM catalog_versions WHERE tabla = %s", (tabla,))
+    fila = cur.fetchone()
+    return fila["version"] if fila else 0
+
+
+async def leer_version_async(conn, tabla):
+    return await conn.fetchval("SELECT version FROM catalog_versions WHERE tabla = $1", tabla) or 0
+
+
+def leer_version_productos(cur):
+    """
+    (version, pendiente) de "products": `pendiente` es el id más alto del
+    outbox sin versionar, o None si el relay está al día
+    """
+    cur.execute(_VERSION_PRODUCTOS)
+    fila = cur.fetchone()
+    return fila["version"] or 0, fila["pendiente"]
+
+
+async def leer_version_productos_async(conn):
+    fila = await conn.fetchrow(_VERSION_PRODUCTOS)
+    return fila["version"] or 0, fila["pendiente"]
+
+
+def version_etag(version, pendiente):
+    """Versión para el ETag: cambia con cada orden aunque el relay no la haya versionado"""
+    return version if pendiente is None else f"{version}.{pendiente}"
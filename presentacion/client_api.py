@@ -5,23 +5,23 @@ router = APIRouter()
 service = ClienteService()
 
 @router.post("/clientes")
-def registrar_cliente(cliente_data: dict):
-    return service.registrarCliente(cliente_data)
+async def registrar_cliente(cliente_data: dict):
+    return await service.registrarClienteAsync(cliente_data)
 
 @router.post("/clientes/login")
-def login_cliente(data: dict):
-    result = service.loginCliente(data["email"], data["password"])
+async def login_cliente(data: dict):
+    result = await service.loginClienteAsync(data["email"], data["password"])
     if not result:
         raise HTTPException(status_code=401, detail="Credenciales invalidas")
     return result
 
 @router.put("/clientes/{cliente_id}")
-def actualizar_cliente(cliente_id: int, cliente_data: dict):
-    return service.actualizarCliente(cliente_id, cliente_data)
+async def actualizar_cliente(cliente_id: int, cliente_data: dict):
+    return await service.actualizarClienteAsync(cliente_id, cliente_data)
 
 @router.get("/clientes/{cliente_id}")
-def obtener_cliente(cliente_id: int):
-    result = service.obtenerCliente(cliente_id)
+async def obtener_cliente(cliente_id: int):
+    result = await service.obtenerClienteAsync(cliente_id)
     if not result:
         raise HTTPException(status_code=404, detail="Cliente no encontrado")
     return result
@@ -30,7 +30,7 @@ def obtener_cliente(cliente_id: int):
 # endpoints para pagos protegidos con el circuit breaker
 
 @router.post("/clientes/{cliente_id}/pagos")
-def procesar_pago(cliente_id: int, pago_data: dict):
+async def procesar_pago(cliente_id: int, pago_data: dict):
     """
     Procesa un pago para un cliente.
     Protegido con Circuit Breaker para evitar llamadas a un servicio caido.
@@ -47,7 +47,7 @@ def procesar_pago(cliente_id: int, pago_data: dict):
     if not monto or monto <= 0:
         raise HTTPException(status_code=400, detail="Monto invalido")
     
-    resultado = service.realizar_pago(cliente_id, monto, metodo_pago)
+    resultado = await service.realizar_pago_async(cliente_id, monto, metodo_pago)
     
     if resultado["exito"]:
         return resultado
@@ -60,12 +60,12 @@ def procesar_pago(cliente_id: int, pago_data: dict):
 
 
 @router.get("/clientes/pagos/{transaccion_id}")
-def verificar_pago(transaccion_id: str):
+async def verificar_pago(transaccion_id: str):
     """
     Verifica el estado de un pago por su ID de transaccion.
     Tambien protegido con Circuit Breaker.
     """
-    resultado = service.verificar_estado_pago(transaccion_id)
+    resultado = await service.verificar_estado_pago_async(transaccion_id)
     
     if resultado["exito"]:
         return resultado
@@ -76,7 +76,7 @@ def verificar_pago(transaccion_id: str):
 @router.get("/clientes/pagos/estadisticas/general")
 def obtener_estadisticas_pagos():
     """
-    Retorna estadisticas del servicio de pagos y del circuit breaker.
+    Retorna estadisticas del servicio de pagos, del circuit breaker y de los reintentos.
     Util para monitorear el estado del sistema.
     """
     return service.obtener_estadisticas_pagos()
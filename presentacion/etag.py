@@ -0,0 +1,37 @@
+"""
+ETags fuertes a partir de la versión del catálogo (ver persistencia/versiones.py).
+Si el If-None-Match del cliente coincide con la versión actual se responde 304
+sin leer ni serializar las filas.
+
+Frescura: la versión de productos cambia en el commit de cualquier escritura,
+incluidas las ordenes que el relay del outbox todavía no versionó (ver
+version_etag), así que un 304 nunca depende de que el relay esté andando. Lo
+único que puede atrasarla es la cache de la versión en el proceso, que se
+invalida por LISTEN/NOTIFY al confirmar la escritura; sin el bus de
+invalidación, el atraso máximo es CACHE_PRODUCTOS_TTL.
+"""
+import hashlib
+from fastapi import Response
+
+
+def etag(recurso, version, variante=None):
+    """
+    ETag de un listado en la versión `version`. `variante` distingue respuestas
+    distintas del mismo recurso (filtros, página) para que no compartan ETag.
+    """
+    if variante is None:
+        return f'"{recurso}-{version}"'
+    digest = hashlib.sha1(repr(variante).encode()).hexdigest()[:12]
+    return f'"{recurso}-{digest}-{version}"'
+
+
+def coincide(if_none_match, etag_actual):
+    """True si algún ETag de If-None-Match (o "*") coincide con el actual"""
+    if not if_none_match:
+        return False
+    candidatos = [e.strip() for e in if_none_match.split(",")]
+    return "*" in candidatos or etag_actual in candidatos
+
+
+def no_modificado(etag_actual):
+    return Response(status_code=304, headers={"ETag": etag_actual})
@@ -1,52 +1,231 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 
 from infraestructura.config_store import cfg
-from patrones.bulkhead import BulkheadManager
-from patrones.circuit_breaker import GestorCircuitBreakers
+from patrones.bulkhead import BulkheadManager, BulkheadFullException
+from patrones.limite_adaptativo import crear_limite
+from patrones.circuit_breaker import GestorCircuitBreakers, CircuitBreakerError, LlamadaTimeoutError
+from patrones.retry import GestorReintentos
+from logica.payment_service import ErrorProcesamiento
+from patrones.cache import GestorCaches
 from presentacion.auth_api import router as auth_router
 from patrones.gatekeeper import GestorGatekeeper
+from persistencia.db import pool as db_pool
+from persistencia import async_db
+from patrones.queue import close_publisher
+from patrones.outbox import get_relay
+from persistencia.invalidacion import get_bus
+from infraestructura.config_store import get_watcher
 
 # Inicializar la aplicación FastAPI
 app = FastAPI(title="E-Commerce API con Patrones de Resiliencia")
 
+
+@app.exception_handler(BulkheadFullException)
+async def bulkhead_lleno_handler(request: Request, exc: BulkheadFullException):
+    """Un bulkhead lleno es sobrecarga pasajera: 503 + cuándo reintentar"""
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
 # se inicializa el gestor de Bulkheads y Circuit Breakers antes de importar los routers
 # De este modo, los servicios que se importen (y pidan bulkheads) los encontrarán creados.
 bulkhead_manager = BulkheadManager()
 
 
-# bulkhead sizes/timeouts configurables vía ConfigStore (env/Consul)
-bulkhead_manager.create_bulkhead(
+# prefijo de las claves de cada bulkhead en ConfigStore (env/Consul)
+PREFIJOS_BULKHEADS = {
+    "productos": "BULKHEAD_PRODUCTOS",
+    "productos_async": "BULKHEAD_PRODUCTOS_ASYNC",
+    "clientes": "BULKHEAD_CLIENTES",
+    "ordenes": "BULKHEAD_ORDENES",
+    "proveedores": "BULKHEAD_PROVEEDORES",
+}
+
+
+def rango_limite(prefijo: str, inicial: int) -> dict:
+    """Piso y techo del límite adaptativo (<prefijo>_LIMITE_MIN / _LIMITE_MAX)"""
+    return {
+        "limite_min": cfg.get(f"{prefijo}_LIMITE_MIN", default=1, as_type=int),
+        "limite_max": cfg.get(f"{prefijo}_LIMITE_MAX", default=inicial * 4, as_type=int),
+    }
+
+
+def config_bulkheads() -> dict:
+    """
+    Tamaño, timeout, cola y espera de cada bulkhead. Se lee al arrancar y de
+    nuevo cada vez que el watcher de ConfigStore avisa un cambio en BULKHEAD_*.
+    """
+    productos = cfg.get("BULKHEAD_PRODUCTOS_WORKERS", default=5, as_type=int)
+    productos_async = cfg.get("BULKHEAD_PRODUCTOS_ASYNC_MAX", default=20, as_type=int)
+    clientes = cfg.get("BULKHEAD_CLIENTES_WORKERS", default=5, as_type=int)
+    ordenes = cfg.get("BULKHEAD_ORDENES_WORKERS", default=3, as_type=int)
+    proveedores = cfg.get("BULKHEAD_PROVEEDORES_WORKERS", default=4, as_type=int)
+    return {
+        "productos": dict(
+            max_workers=productos,
+            timeout=cfg.get("BULKHEAD_PRODUCTOS_TIMEOUT", default=30, as_type=int),
+            max_queue=cfg.get("BULKHEAD_PRODUCTOS_QUEUE", default=10, as_type=int),
+            max_wait=cfg.get("BULKHEAD_PRODUCTOS_MAX_WAIT", default=1.0, as_type=float),
+            **rango_limite("BULKHEAD_PRODUCTOS", productos),
+        ),
+        # lecturas async del catálogo (cache miss): limita corrutinas, no threads
+        "productos_async": dict(
+            max_workers=productos_async,
+            timeout=cfg.get("BULKHEAD_PRODUCTOS_TIMEOUT", default=30, as_type=int),
+            max_queue=cfg.get("BULKHEAD_PRODUCTOS_ASYNC_QUEUE", default=50, as_type=int),
+            max_wait=cfg.get("BULKHEAD_PRODUCTOS_MAX_WAIT", default=1.0, as_type=float),
+            **rango_limite("BULKHEAD_PRODUCTOS_ASYNC", productos_async),
+        ),
+        "clientes": dict(
+            max_workers=clientes,
+            timeout=cfg.get("BULKHEAD_CLIENTES_TIMEOUT", default=30, as_type=int),
+            max_queue=cfg.get("BULKHEAD_CLIENTES_QUEUE", default=10, as_type=int),
+            max_wait=cfg.get("BULKHEAD_CLIENTES_MAX_WAIT", default=1.0, as_type=float),
+            **rango_limite("BULKHEAD_CLIENTES", clientes),
+        ),
+        "ordenes": dict(
+            max_workers=ordenes,
+            timeout=cfg.get("BULKHEAD_ORDENES_TIMEOUT", default=45, as_type=int),
+            max_queue=cfg.get("BULKHEAD_ORDENES_QUEUE", default=10, as_type=int),
+            max_wait=cfg.get("BULKHEAD_ORDENES_MAX_WAIT", default=1.0, as_type=float),
+            **rango_limite("BULKHEAD_ORDENES", ordenes),
+        ),
+        "proveedores": dict(
+            max_workers=proveedores,
+            timeout=cfg.get("BULKHEAD_PROVEEDORES_TIMEOUT", default=30, as_type=int),
+            max_queue=cfg.get("BULKHEAD_PROVEEDORES_QUEUE", default=10, as_type=int),
+            max_wait=cfg.get("BULKHEAD_PROVEEDORES_MAX_WAIT", default=1.0, as_type=float),
+            **rango_limite("BULKHEAD_PROVEEDORES", proveedores),
+        ),
+    }
+
+
+# el modo y el algoritmo del límite se eligen al crear el bulkhead (no se
+# cambian en caliente). Con BULKHEAD_<NOMBRE>_LIMITE=aimd|gradiente el tamaño
+# pasa a ser el límite inicial
+MODOS_BULKHEADS = {
+    # las escrituras corren en el thread del handler: sin saltar a otro pool
+    "productos": cfg.get("BULKHEAD_PRODUCTOS_MODO", default="semaforo"),
+    "productos_async": "async",
+}
+
+for nombre, config in config_bulkheads().items():
+    prefijo = PREFIJOS_BULKHEADS[nombre]
+    bulkhead_manager.create_bulkhead(
+        nombre,
+        max_workers=config["max_workers"],
+        timeout=config["timeout"],
+        max_queue=config["max_queue"],
+        max_wait=config["max_wait"],
+        modo=MODOS_BULKHEADS.get(nombre, "thread"),
+        limite=crear_limite(
+            cfg.get(f"{prefijo}_LIMITE", default="fijo"),
+            config["max_workers"],
+            minimo=config["limite_min"],
+            maximo=config["limite_max"],
+            latencia_objetivo=cfg.get(f"{prefijo}_LATENCIA_OBJETIVO", default=0.5, as_type=float),
+        ),
+    )
+
+
+# caches en memoria (antes de importar los servicios que las usan)
+cache_manager = GestorCaches()
+cache_manager.crear_cache(
     "productos",
-    max_workers=cfg.get("BULKHEAD_PRODUCTOS_WORKERS", default=5, as_type=int),
-    timeout=cfg.get("BULKHEAD_PRODUCTOS_TIMEOUT", default=30, as_type=int),
+    max_entradas=cfg.get("CACHE_PRODUCTOS_MAX", default=1000, as_type=int),
+    ttl=cfg.get("CACHE_PRODUCTOS_TTL", default=30, as_type=int),
 )
-bulkhead_manager.create_bulkhead(
+cache_manager.crear_cache(
     "clientes",
-    max_workers=cfg.get("BULKHEAD_CLIENTES_WORKERS", default=5, as_type=int),
-    timeout=cfg.get("BULKHEAD_CLIENTES_TIMEOUT", default=30, as_type=int),
+    max_entradas=cfg.get("CACHE_CLIENTES_MAX", default=1000, as_type=int),
+    ttl=cfg.get("CACHE_CLIENTES_TTL", default=30, as_type=int),
 )
-bulkhead_manager.create_bulkhead(
-    "ordenes",
-    max_workers=cfg.get("BULKHEAD_ORDENES_WORKERS", default=3, as_type=int),
-    timeout=cfg.get("BULKHEAD_ORDENES_TIMEOUT", default=45, as_type=int),
-)
-bulkhead_manager.create_bulkhead(
+cache_manager.crear_cache(
     "proveedores",
-    max_workers=cfg.get("BULKHEAD_PROVEEDORES_WORKERS", default=4, as_type=int),
-    timeout=cfg.get("BULKHEAD_PROVEEDORES_TIMEOUT", default=30, as_type=int),
+    max_entradas=cfg.get("CACHE_PROVEEDORES_MAX", default=500, as_type=int),
+    ttl=cfg.get("CACHE_PROVEEDORES_TTL", default=60, as_type=int),
 )
 
 
 print("\n--- Inicializando Circuit Breakers ---")
 circuit_breaker_manager = GestorCircuitBreakers()
-circuit_breaker_manager.crear_circuit_breaker(
-    "servicio_pagos",
-    max_fallos=cfg.get("CB_PAGOS_MAX_FALLOS", default=3, as_type=int),
-    timeout_abierto=cfg.get("CB_PAGOS_TIMEOUT_ABIERTO", default=60, as_type=int),
-    timeout_semi_abierto=cfg.get("CB_PAGOS_TIMEOUT_SEMI", default=30, as_type=int),
-)
+
+
+# el modo se elige al crear el circuit breaker: "consecutivos" o "ventana"
+MODOS_CIRCUIT_BREAKERS = {
+    "servicio_pagos": cfg.get("CB_PAGOS_MODO", default="consecutivos"),
+}
+
+
+def opciones_ventana(prefijo: str) -> dict:
+    """Umbrales del modo ventana (tasas en %)"""
+    return dict(
+        tasa_fallos=cfg.get(f"{prefijo}_TASA_FALLOS", default=50, as_type=float),
+        tasa_lentas=cfg.get(f"{prefijo}_TASA_LENTAS", default=100, as_type=float),
+        minimo_llamadas=cfg.get(f"{prefijo}_MIN_LLAMADAS", default=20, as_type=int),
+        tipo_ventana=cfg.get(f"{prefijo}_VENTANA_TIPO", default="conteo"),
+        tamano_ventana=cfg.get(f"{prefijo}_VENTANA", default=100, as_type=int),
+    )
+
+
+def config_circuit_breakers() -> dict:
+    """Umbrales de cada circuit breaker; se releen cuando cambia alguna clave CB_*"""
+    pagos = dict(
+        max_fallos=cfg.get("CB_PAGOS_MAX_FALLOS", default=3, as_type=int),
+        timeout_abierto=cfg.get("CB_PAGOS_TIMEOUT_ABIERTO", default=60, as_type=int),
+        timeout_semi_abierto=cfg.get("CB_PAGOS_TIMEOUT_SEMI", default=30, as_type=int),
+        # en semi-abierto solo pasan estas pruebas a la vez; cada reapertura
+        # seguida multiplica el tiempo abierto por el backoff, hasta el maximo
+        max_pruebas=cfg.get("CB_PAGOS_MAX_PRUEBAS", default=1, as_type=int),
+        factor_backoff=cfg.get("CB_PAGOS_BACKOFF", default=2.0, as_type=float),
+        timeout_abierto_max=cfg.get("CB_PAGOS_TIMEOUT_ABIERTO_MAX", default=600, as_type=int),
+        # plazo de cada llamada al proveedor de pagos (0 = sin limite) y desde
+        # cuantos segundos una llamada cuenta como lenta
+        timeout_llamada=cfg.get("CB_PAGOS_TIMEOUT_LLAMADA", default=10, as_type=float),
+        umbral_lenta=cfg.get("CB_PAGOS_UMBRAL_LENTA", default=5, as_type=float),
+    )
+    if MODOS_CIRCUIT_BREAKERS["servicio_pagos"] == "ventana":
+        pagos.update(opciones_ventana("CB_PAGOS"))
+    return {"servicio_pagos": pagos}
+
+
+for nombre, config in config_circuit_breakers().items():
+    circuit_breaker_manager.crear_circuit_breaker(nombre, modo=MODOS_CIRCUIT_BREAKERS[nombre], **config)
 print("--- Circuit Breakers inicializados ---\n")
 
+# Reintentos: por fuera del circuit breaker, cada intento pasa por el circuit breaker
+print("--- Inicializando Reintentos ---")
+retry_manager = GestorReintentos()
+
+
+def config_reintentos() -> dict:
+    """Backoff y presupuesto de cada dependencia; se releen cuando cambia alguna clave RETRY_*"""
+    return {
+        "servicio_pagos": dict(
+            max_intentos=cfg.get("RETRY_PAGOS_MAX_INTENTOS", default=3, as_type=int),
+            espera_base=cfg.get("RETRY_PAGOS_ESPERA_BASE", default=0.1, as_type=float),
+            espera_max=cfg.get("RETRY_PAGOS_ESPERA_MAX", default=2.0, as_type=float),
+            # reintentos como % de las llamadas, mas un minimo por segundo
+            porcentaje_presupuesto=cfg.get("RETRY_PAGOS_PRESUPUESTO", default=10.0, as_type=float),
+            minimo_por_segundo=cfg.get("RETRY_PAGOS_MIN_POR_SEGUNDO", default=1.0, as_type=float),
+        ),
+    }
+
+
+# solo los fallos transitorios del proveedor; con el circuito abierto no se
+# insiste, y un timeout no se reintenta porque el pago pudo haberse procesado
+for nombre, config in config_reintentos().items():
+    retry_manager.crear_politica(
+        nombre,
+        reintentables=(ErrorProcesamiento,),
+        no_reintentables=(CircuitBreakerError, LlamadaTimeoutError),
+        **config
+    )
+print("--- Reintentos inicializados ---\n")
+
 # Inicializar el Gatekeeper
 print("--- Inicializando Gatekeeper ---")
 gatekeeper_manager = GestorGatekeeper()
@@ -55,19 +234,68 @@ print("--- Gatekeeper inicializado ---\n")
 # Endpoint para monitorear el estado de los bulkheads
 @app.get("/bulkhead/stats")
 def get_bulkhead_stats():
-    """Retorna estadísticas de todos los bulkheads del sistema"""
-    return bulkhead_manager.get_all_stats()
+    """Retorna estadísticas de todos los bulkheads del sistema y del pool de conexiones"""
+    stats = bulkhead_manager.get_all_stats()
+    # el pool de BD se muestra junto a los bulkheads para poder dimensionarlo
+    # contra la cantidad de workers de cada uno
+    stats["db_pool"] = db_pool.get_stats()
+    stats["db_pool_async"] = async_db.get_pool_stats()
+    return stats
+
+
+@app.get("/cache/stats")
+def get_cache_stats():
+    """Hits, misses y evictions de las caches en memoria"""
+    stats = cache_manager.obtener_todas_estadisticas()
+    stats["bus_invalidacion"] = get_bus().get_stats()
+    return stats
+
+
+@app.get("/outbox/stats")
+def get_outbox_stats():
+    """Estadísticas del relay que publica los eventos de ordenes"""
+    return get_relay().get_stats()
 
 
 @app.get("/circuit-breaker/stats")
 def get_circuit_breaker_stats():
     return circuit_breaker_manager.obtener_todas_estadisticas()
 
+
+@app.get("/retry/stats")
+def get_retry_stats():
+    return retry_manager.obtener_todas_estadisticas()
+
+
+@app.get("/config/stats")
+def get_config_stats():
+    """Estado del watcher que aplica en caliente los cambios de ConfigStore"""
+    return get_watcher().get_stats()
+
+
+def recargar_bulkheads(cambios: dict):
+    """Aplica a todos los bulkheads la configuración actual (la llama el watcher de ConfigStore)"""
+    for nombre, config in config_bulkheads().items():
+        bulkhead_manager.reconfigure_bulkhead(nombre, **config)
+
+
+def recargar_circuit_breakers(cambios: dict):
+    for nombre, config in config_circuit_breakers().items():
+        circuit_breaker_manager.reconfigurar_circuit_breaker(nombre, **config)
+
+
+def recargar_reintentos(cambios: dict):
+    for nombre, config in config_reintentos().items():
+        retry_manager.reconfigurar_politica(nombre, **config)
+
 # Ahora importamos y registramos los routers (después de crear los recursos)
 from presentacion.product_api import router as producto_router
 from presentacion.client_api import router as cliente_router
 from presentacion.order_api import router as orden_router
 from presentacion.proveedor_api import router as proveedor_router
+from logica.product_service import invalidar_cache_productos
+from logica.client_service import invalidar_cache_clientes
+from logica.proveedor_service import invalidar_cache_proveedores
 
 
 # Registrar routers
@@ -78,6 +306,34 @@ app.include_router(orden_router)
 app.include_router(proveedor_router)
 
 
+@app.on_event("startup")
+async def startup_event():
+    # el pool async se crea dentro del event loop de uvicorn
+    await async_db.get_pool()
+    if cfg.get("OUTBOX_RELAY_ENABLED", default=True, as_type=bool):
+        get_relay().start()
+    if cfg.get("CACHE_INVALIDATION_ENABLED", default=True, as_type=bool):
+        # las escrituras de otros workers/réplicas llegan por LISTEN/NOTIFY
+        bus = get_bus()
+        bus.suscribir("productos", invalidar_cache_productos)
+        bus.suscribir("clientes", invalidar_cache_clientes)
+        bus.suscribir("proveedores", invalidar_cache_proveedores)
+        bus.start()
+    if cfg.get("CONFIG_WATCH_ENABLED", default=True, as_type=bool):
+        # cambios en Consul de BULKHEAD_* / CB_* / RETRY_* se aplican sin reiniciar
+        watcher = get_watcher()
+        watcher.watch("BULKHEAD_", recargar_bulkheads)
+        watcher.watch("CB_", recargar_circuit_breakers)
+        watcher.watch("RETRY_", recargar_reintentos)
+        watcher.start()
+
+
 @app.on_event("shutdown")
-def shutdown_event():
-    bulkhead_manager.shutdown_all()
\ No newline at end of file
+async def shutdown_event():
+    get_watcher().stop()
+    bulkhead_manager.shutdown_all()
+    get_relay().stop()
+    get_bus().stop()
+    close_publisher()
+    db_pool.closeall()
+    await async_db.close_pool()
\ No newline at end of file
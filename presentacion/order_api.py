@@ -1,7 +1,12 @@
-from fastapi import APIRouter, HTTPException, status
+import json
+from typing import List, Optional
+from fastapi import APIRouter, Body, HTTPException, Query, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 from logica.order_service import OrdenService
 from logica.client_service import ClienteService
-from patrones.queue import publish_order
+from patrones.outbox import get_relay
+from persistencia.reserva_stock import ErrorStockInsuficiente, estadisticas as estadisticas_reserva
 
 router = APIRouter()
 service = OrdenService()
@@ -16,23 +21,103 @@ def crear_orden(orden_data: dict):
     if not client_service.obtenerCliente(client_id):
         raise HTTPException(status_code=404, detail="Cliente no encontrado")
 
-    order = service.crearOrden(orden_data)
-
     try:
-        publish_order(order_id=order["id"], payload={"client_id": order["client_id"]})
-    except Exception as e:
-        # No dejamos que falle la creación por un fallo de la cola; loguea/alerta aquí.
-        print(f"[WARN] fallo al publicar orden {order['id']} en la cola: {e}")
+        order = service.crearOrden(orden_data)
+    except ErrorStockInsuficiente as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
+    # el evento ya quedo en el outbox junto con la orden; el relay lo publica
+    get_relay().despertar()
     return order
 
+@router.post("/ordenes/bulk")
+def crear_ordenes_bulk(ordenes: List[dict] = Body(...)):
+    """
+    Crea muchas ordenes en una sola llamada (importacion de marketplaces).
+
+    Body esperado: array de ordenes con el mismo formato que POST /ordenes.
+    Retorna el resultado de cada orden, en el mismo orden recibido.
+    Los eventos de las ordenes creadas se publican desde el outbox.
+    """
+    resultados = [None] * len(ordenes)
+
+    # validar formato y clientes (todos los client_id en una sola consulta)
+    existentes = client_service.clientesExistentes(
+        {o["client_id"] for o in ordenes if isinstance(o, dict) and isinstance(o.get("client_id"), int)}
+    )
+    validas = []
+    for i, orden in enumerate(ordenes):
+        error = _validar_orden(orden, existentes)
+        if error:
+            resultados[i] = {"ok": False, "error": error}
+        else:
+            validas.append(i)
+
+    creadas = service.crearOrdenesBulk([ordenes[i] for i in validas])
+    for i, resultado in zip(validas, creadas):
+        resultados[i] = resultado
+
+    exitosas = sum(1 for r in resultados if r["ok"])
+    if exitosas:
+        get_relay().despertar()
+
+    return {
+        "total": len(ordenes),
+        "exitosas": exitosas,
+        "fallidas": len(ordenes) - exitosas,
+        "resultados": [dict(r, index=i) for i, r in enumerate(resultados)],
+    }
+
+
+def _validar_orden(orden, clientes_existentes):
+    """Retorna un mensaje de error si la orden no es valida, o None"""
+    if not isinstance(orden, dict):
+        return "Orden con formato invalido"
+    client_id = orden.get("client_id")
+    if not client_id:
+        return "Falta client_id en la orden"
+    if client_id not in clientes_existentes:
+        return "Cliente no encontrado"
+    items = orden.get("items")
+    if not isinstance(items, list):
+        return "Falta items en la orden"
+    for item in items:
+        if not isinstance(item, dict) or not isinstance(item.get("product_id"), int) \
+                or not isinstance(item.get("quantity"), int) or item["quantity"] <= 0:
+            return "Item invalido: se requiere product_id y quantity > 0"
+    return None
+
+
 @router.get("/ordenes/{orden_id}")
-def obtener_orden(orden_id: int):
-    result = service.obtenerOrden(orden_id)
+async def obtener_orden(orden_id: int):
+    result = await service.obtenerOrdenAsync(orden_id)
     if not result:
         raise HTTPException(status_code=404, detail="Orden no encontrada")
     return result
 
 @router.get("/ordenes")
-def listar_ordenes():
-    return service.listarOrdenes()
\ No newline at end of file
+async def listar_ordenes(after_id: int = 0, limit: Optional[int] = Query(None, ge=1)):
+    """
+    Lista las ordenes con sus items como un array JSON en streaming.
+    Paginado por keyset: `after_id` = ultimo id recibido, `limit` = maximo a devolver.
+    """
+    async def generar():
+        yield "["
+        primero = True
+        async for orden in service.iterarOrdenesAsync(after_id, limit):
+            yield ("" if primero else ",") + json.dumps(jsonable_encoder(orden))
+            primero = False
+        yield "]"
+
+    return StreamingResponse(generar(), media_type="application/json")
+
+
+@router.get("/ordenes/reservas/estadisticas")
+def obtener_estadisticas_reservas():
+    """
+    Estadisticas de reserva de stock: reservas por segundo, rechazos por
+    falta de stock, y conflictos/reintentos en productos hot.
+    """
+    return estadisticas_reserva.obtener_estadisticas()
@@ -1,21 +1,67 @@
-from fastapi import APIRouter, HTTPException, Header
+import asyncio
+from fastapi import APIRouter, HTTPException, Header, Response, Query
 from typing import Optional
-from logica.product_service import ProductoService
+from logica.product_service import ProductoService, clave_pagina
 from concurrent.futures import TimeoutError
+from patrones.bulkhead import BulkheadFullException
 from patrones.gatekeeper import validar_autenticacion, validar_admin, ErrorAutenticacion, ErrorAutorizacion
+from presentacion.etag import etag, coincide, no_modificado
+from persistencia.product_repo import PRODUCTOS_PAGE_SIZE, PRODUCTOS_MAX_PAGE_SIZE, BUSQUEDA_MAX_RESULTADOS
 
 router = APIRouter()
 service = ProductoService()
 
 @router.get("/productos")
-def listar_productos():
+async def listar_productos(
+    response: Response,
+    limit: int = Query(PRODUCTOS_PAGE_SIZE, ge=1, le=PRODUCTOS_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    sort: str = "id",
+    min_price: Optional[float] = Query(None, ge=0),
+    max_price: Optional[float] = Query(None, ge=0),
+    min_stock: Optional[int] = Query(None, ge=0),
+    max_stock: Optional[int] = Query(None, ge=0),
+    q: Optional[str] = Query(None, min_length=1, max_length=100),
+    if_none_match: Optional[str] = Header(None),
+):
     """
-    Lista todos los productos.
-    Protegido por Bulkhead - si el servicio se sobrecarga, fallará aisladamente.
+    Lista los productos de a páginas (keyset), con filtros y orden.
+    Async - no ocupa un thread mientras espera a Postgres.
+
+    Query params:
+        limit: tamaño de página
+        cursor: el "siguiente" de la página anterior
+        sort: id, -id, price, -price, name, -name
+        min_price, max_price, min_stock, max_stock: rangos
+        q: prefijo del nombre (sin distinguir mayúsculas)
+
+    Respuesta:
+    {
+        "productos": [...],
+        "siguiente": "<cursor>" o null si es la última página
+    }
+
+    Responde con ETag; si el header If-None-Match coincide con la versión
+    actual del catálogo retorna 304 sin cuerpo.
     """
+    filtros = {
+        "min_price": min_price, "max_price": max_price,
+        "min_stock": min_stock, "max_stock": max_stock, "q": q,
+    }
+    variante = clave_pagina(filtros, sort, cursor, limit)
     try:
-        return service.listarProductos()
-    except TimeoutError:
+        if if_none_match:
+            actual = etag("productos", await service.versionProductosAsync(), variante)
+            if coincide(if_none_match, actual):
+                return no_modificado(actual)
+        resultado = await service.listarProductosPaginaAsync(filtros, sort, cursor, limit)
+        response.headers["ETag"] = etag("productos", resultado["version"], variante)
+        return {"productos": resultado["productos"], "siguiente": resultado["siguiente"]}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except BulkheadFullException as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except (TimeoutError, asyncio.TimeoutError):
         raise HTTPException(
             status_code=500,
             detail="Servicio de productos temporalmente no disponible (timeout)"
@@ -26,20 +72,70 @@ def listar_productos():
             detail="Servicio de productos temporalmente no disponible"
         )
 
+@router.get("/productos/search")
+async def buscar_productos(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(20, ge=1, le=BUSQUEDA_MAX_RESULTADOS),
+):
+    """
+    Busca productos por nombre para el buscador de la tienda.
+    Tolera prefijos ("zapa") y errores de tipeo ("zapatila"); los resultados
+    vienen ordenados por relevancia (campo "relevancia").
+    PUBLICO - No requiere autenticacion.
+    """
+    try:
+        return await service.buscarProductosAsync(q, limit)
+    except BulkheadFullException as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except (TimeoutError, asyncio.TimeoutError):
+        raise HTTPException(
+            status_code=500,
+            detail="Servicio de productos temporalmente no disponible (timeout)"
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail="Servicio temporalmente no disponible")
+
+@router.get("/productos/changes")
+async def cambios_productos(since: int = Query(0, ge=0)):
+    """
+    Productos modificados y eliminados después de la versión `since`.
+    El cliente guarda la "version" de la respuesta y la manda en el próximo pedido.
+
+    Respuesta:
+    {
+        "version": 42,
+        "productos": [...],
+        "eliminados": [3, 7]
+    }
+    """
+    try:
+        return await service.cambiosProductosAsync(since)
+    except BulkheadFullException as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except (TimeoutError, asyncio.TimeoutError):
+        raise HTTPException(
+            status_code=500,
+            detail="Servicio de productos temporalmente no disponible (timeout)"
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail="Servicio temporalmente no disponible")
+
 @router.get("/productos/{producto_id}")
-def obtener_producto(producto_id: int):
+async def obtener_producto(producto_id: int):
     """
     Obtiene un producto especifico.
     PUBLICO - No requiere autenticacion.
     """
     try:
-        result = service.obtenerProducto(producto_id)
+        result = await service.obtenerProductoAsync(producto_id)
         if not result:
             raise HTTPException(status_code=404, detail="Producto no encontrado")
         return result
     except HTTPException:
         raise  # Re-lanzar HTTPExceptions
-    except TimeoutError:
+    except BulkheadFullException as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except (TimeoutError, asyncio.TimeoutError):
         raise HTTPException(
             status_code=500,
             detail="Servicio de productos temporalmente no disponible (timeout)"
@@ -63,6 +159,8 @@ def agregar_producto(producto_data: dict, authorization: Optional[str] = Header(
         return service.agregarProducto(producto_data)
     except ErrorAutenticacion as e:
         raise HTTPException(status_code=401, detail=str(e))
+    except BulkheadFullException as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
     except TimeoutError:
         raise HTTPException(status_code=500, detail="Servicio temporalmente no disponible (timeout)")
     except Exception as e:
@@ -86,6 +184,8 @@ def actualizar_producto(producto_id: int, producto_data: dict, authorization: Op
         raise HTTPException(status_code=401, detail=str(e))
     except ErrorAutorizacion as e:
         raise HTTPException(status_code=403, detail=str(e))
+    except BulkheadFullException as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
     except TimeoutError:
         raise HTTPException(status_code=500, detail="Servicio temporalmente no disponible (timeout)")
     except Exception as e:
@@ -109,7 +209,43 @@ def eliminar_producto(producto_id: int, authorization: Optional[str] = Header(No
         raise HTTPException(status_code=401, detail=str(e))
     except ErrorAutorizacion as e:
         raise HTTPException(status_code=403, detail=str(e))
+    except BulkheadFullException as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
     except TimeoutError:
         raise HTTPException(status_code=500, detail="Servicio temporalmente no disponible (timeout)")
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.put("/productos/{producto_id}/hot")
+def marcar_producto_hot(producto_id: int, config: dict, authorization: Optional[str] = Header(None)):
+    """
+    Activa o desactiva el modo "hot" de un producto (ventas flash): su stock
+    se reparte en buckets para que muchas compras concurrentes no compitan
+    por la misma fila.
+    REQUIERE SER ADMIN.
+
+    Body:
+    {
+        "hot": true,
+        "buckets": 8  (opcional)
+    }
+    """
+    try:
+        validar_admin(authorization)
+
+        result = service.marcarProductoHot(producto_id, bool(config.get("hot", True)), config.get("buckets"))
+        if not result:
+            raise HTTPException(status_code=404, detail="Producto no encontrado")
+        return result
+    except HTTPException:
+        raise
+    except ErrorAutenticacion as e:
+        raise HTTPException(status_code=401, detail=str(e))
+    except ErrorAutorizacion as e:
+        raise HTTPException(status_code=403, detail=str(e))
+    except BulkheadFullException as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except TimeoutError:
+        raise HTTPException(status_code=500, detail="Servicio temporalmente no disponible (timeout)")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,28 +1,36 @@
-from fastapi import APIRouter, HTTPException
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Header, Response
 from logica.proveedor_service import ProveedorService
+from presentacion.etag import etag, coincide, no_modificado
 
 router = APIRouter()
 service = ProveedorService()
 
 @router.get("/proveedores")
-def listar_proveedores():
-    return service.listarProveedores()
+async def listar_proveedores(response: Response, if_none_match: Optional[str] = Header(None)):
+    if if_none_match:
+        actual = etag("proveedores", await service.versionProveedoresAsync())
+        if coincide(if_none_match, actual):
+            return no_modificado(actual)
+    resultado = await service.listarProveedoresVersionadoAsync()
+    response.headers["ETag"] = etag("proveedores", resultado["version"])
+    return resultado["proveedores"]
 
 @router.get("/proveedores/{proveedor_id}")
-def obtener_proveedor(proveedor_id: int):
-    result = service.obtenerProveedor(proveedor_id)
+async def obtener_proveedor(proveedor_id: int):
+    result = await service.obtenerProveedorAsync(proveedor_id)
     if not result:
         raise HTTPException(status_code=404, detail="Proveedor no encontrado")
     return result
 
 @router.post("/proveedores")
-def agregar_proveedor(proveedor_data: dict):
-    return service.agregarProveedor(proveedor_data)
+async def agregar_proveedor(proveedor_data: dict):
+    return await service.agregarProveedorAsync(proveedor_data)
 
 @router.put("/proveedores/{proveedor_id}")
-def actualizar_proveedor(proveedor_id: int, proveedor_data: dict):
-    return service.actualizarProveedor(proveedor_id, proveedor_data)
+async def actualizar_proveedor(proveedor_id: int, proveedor_data: dict):
+    return await service.actualizarProveedorAsync(proveedor_id, proveedor_data)
 
 @router.delete("/proveedores/{proveedor_id}")
-def eliminar_proveedor(proveedor_id: int):
-    return service.eliminarProveedor(proveedor_id)
\ No newline at end of file
+async def eliminar_proveedor(proveedor_id: int):
+    return await service.eliminarProveedorAsync(proveedor_id)
\ No newline at end of file